@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+资源管理模块
+在整个进程内缓存游戏图片，每张图片只从磁盘加载和解码一次，
+并转换为显示窗口的像素格式，所有精灵共享同一个Surface
+存在与图片一致的图集文件（见atlas模块）时，图片直接取自mmap映射的图集，不再逐个解码PNG
+"""
+
+import pygame
+import os
+import atlas
+
+# 获取项目根目录
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMAGE_DIR = os.path.join(BASE_DIR, 'image')
+
+# 不含透明像素的图片，使用convert()转换，其余图片使用convert_alpha()
+OPAQUE_IMAGES = {'background', 'brick', 'iron', 'home', 'home1', 'ice', 'TankWar'}
+
+# 图集文件，由python atlas.py生成
+ATLAS_PATH = os.path.join(IMAGE_DIR, atlas.BUNDLE_DIRNAME, atlas.BUNDLE_NAME)
+
+# 已加载的图片，键为图片名（不含扩展名）
+_images = {}
+# 已转换为显示像素格式的图片名
+_converted = set()
+# 坦克动画帧表和平铺图片，键为图片名或(图片名, 大小)，值为(原图, 帧表或平铺图片)
+_frames = {}
+# 已加载的图集：None表示还没有尝试加载，False表示不使用图集
+_atlas = None
+
+# 移动方向(dir_x, dir_y)对应的帧表行号，与坦克图片中各方向的排列顺序一致
+DIRECTION_INDEX = {(0, -1): 0, (0, 1): 1, (-1, 0): 2, (1, 0): 3}
+
+def load_image(name):
+    """
+    按名称获取图片
+    第一次获取时从image目录加载，之后直接返回缓存的Surface
+    如果加载时还没有创建显示窗口，则在窗口创建后第一次获取时再进行转换
+
+    参数:
+        name: 图片名，例如'brick'
+
+    返回:
+        pygame.Surface: 共享的图片对象，调用者不应修改它
+    """
+    image = _images.get(name)
+    if image is not None and name in _converted:
+        return image
+    convert = pygame.display.get_surface() is not None
+    bundle = _load_atlas()
+    if bundle and name in bundle.index:
+        image = bundle.image(name, convert)
+    else:
+        if image is None:
+            image = pygame.image.load(os.path.join(IMAGE_DIR, name + '.png'))
+        if convert:
+            if name in OPAQUE_IMAGES:
+                image = image.convert()
+            else:
+                image = image.convert_alpha()
+    _images[name] = image
+    if convert:
+        _converted.add(name)
+    return image
+
+def _load_atlas():
+    """
+    第一次获取图片时加载图集，图集不存在或已经过期时不使用图集
+
+    返回:
+        atlas.Atlas: 图集，不使用图集时返回False
+    """
+    global _atlas
+    if _atlas is None:
+        _atlas = atlas.load(ATLAS_PATH, IMAGE_DIR) or False
+    return _atlas
+
+def use_atlas(enabled=True):
+    """
+    设置是否使用图集，之后需要调用clear()使已加载的图片重新加载
+
+    参数:
+        enabled: 为True时重新尝试加载图集，为False时逐个加载PNG
+    """
+    global _atlas
+    _atlas = None if enabled else False
+
+def load_frames(name):
+    """
+    按名称获取坦克图片的动画帧表
+    坦克图片每行对应一个方向（上、下、左、右），每行两帧48x48的动画，
+    帧表在图片第一次加载时切分好，之后移动坦克只需要切换下标
+
+    参数:
+        name: 坦克图片名，例如'tank_T1_0'
+
+    返回:
+        tuple: 帧表，frames[方向][动画帧]，方向下标见DIRECTION_INDEX
+    """
+    sheet = load_image(name)
+    cached = _frames.get(name)
+    if cached is None or cached[0] is not sheet:
+        frames = tuple(
+            (sheet.subsurface((0, row * 48), (48, 48)),
+             sheet.subsurface((48, row * 48), (48, 48)))
+            for row in range(4))
+        cached = _frames[name] = (sheet, frames)
+    return cached[1]
+
+def load_tiled(name, size):
+    """
+    按名称获取平铺到指定大小的图片
+    小于格子的地形图片（例如12x12的河流、冰面、树林）平铺成一整个格子，
+    平铺后的图片与原图一起缓存，原图大小正好时直接返回原图
+
+    参数:
+        name: 图片名，例如'river1'
+        size: 目标大小(宽, 高)
+
+    返回:
+        pygame.Surface: 共享的图片对象，调用者不应修改它
+    """
+    image = load_image(name)
+    if image.get_size() == tuple(size):
+        return image
+    key = (name, tuple(size))
+    cached = _frames.get(key)
+    if cached is None or cached[0] is not image:
+        tiled = pygame.Surface(size, image.get_flags(), image)
+        for y in range(0, size[1], image.get_height()):
+            for x in range(0, size[0], image.get_width()):
+                tiled.blit(image, (x, y))
+        cached = _frames[key] = (image, tiled)
+    return cached[1]
+
+def clear():
+    """
+    清空图片缓存
+    在显示模式改变后调用，使图片按新的像素格式重新加载
+    """
+    _images.clear()
+    _converted.clear()
+    _frames.clear()
+    if _atlas:
+        _atlas.clear()
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+图集模块
+把image目录中的所有图片打包成图集，解码后的像素直接保存到一个二进制文件中，
+游戏启动时用mmap映射这个文件，每张图集只需一次转换，
+各图片是图集的子Surface，不再逐个读取和解码PNG
+
+不透明的图片和带透明像素的图片分别打包成两张图集，
+分别用convert()和convert_alpha()转换，与逐个加载时的像素格式一致
+
+文件格式（小端）:
+    文件头    魔数、版本、图集数、图片数、源文件签名（文件名、修改时间和大小的SHA-256）
+    图集表    每张图集的宽、高、每像素字节数（3为RGB，4为RGBA）和像素数据的偏移
+    索引      每张图片的名称、所在图集和矩形
+    像素数据  各图集按行存储的像素
+
+用法:
+    python atlas.py               重新生成图集文件
+    python atlas.py --benchmark   生成后比较逐个加载PNG和加载图集的时间
+"""
+
+import os
+import mmap
+import time
+import struct
+import hashlib
+import argparse
+import pygame
+
+# 图集文件所在的子目录名，位于图片目录中
+BUNDLE_DIRNAME = '__atlas__'
+BUNDLE_NAME = 'atlas.bin'
+
+MAGIC = b'TWAT'
+VERSION = 1
+HEADER = struct.Struct('<4sHHI32s')
+SHEET = struct.Struct('<HHBQ')
+ENTRY = struct.Struct('<BBHHHH')
+
+# 图集的宽度，比它宽的图片单独占一行
+SHEET_WIDTH = 1024
+# 图片之间留出的间隔，避免缩放或平铺时采样到相邻图片
+PADDING = 1
+
+# 不打包的图片（说明文档使用的截图）
+EXCLUDED = {'tankWarSreenshot'}
+
+def sources(image_dir):
+    """
+    列出需要打包的图片
+
+    参数:
+        image_dir: 图片目录
+
+    返回:
+        list: 按名称排序的(图片名, 文件路径)
+    """
+    result = []
+    for filename in sorted(os.listdir(image_dir)):
+        name, ext = os.path.splitext(filename)
+        if ext.lower() == '.png' and name not in EXCLUDED:
+            result.append((name, os.path.join(image_dir, filename)))
+    return result
+
+def signature(image_dir):
+    """
+    计算源文件的签名，任何图片增删、修改后签名都会改变
+
+    参数:
+        image_dir: 图片目录
+
+    返回:
+        bytes: 32字节的SHA-256
+    """
+    digest = hashlib.sha256()
+    for name, path in sources(image_dir):
+        stat = os.stat(path)
+        digest.update(('%s:%d:%d;' % (name, stat.st_mtime_ns, stat.st_size)).encode('utf-8'))
+    return digest.digest()
+
+def pack(sizes, width=SHEET_WIDTH):
+    """
+    按行（shelf）排列矩形：从高到低依次放入当前行，放不下时另起一行
+
+    参数:
+        sizes: 图片名 -> (宽, 高)
+        width: 图集宽度
+
+    返回:
+        tuple: (图集宽, 图集高, 图片名 -> (x, y))
+    """
+    width = max([width] + [size[0] for size in sizes.values()])
+    positions = {}
+    x = y = row_height = 0
+    for name in sorted(sizes, key=lambda name: (-sizes[name][1], -sizes[name][0], name)):
+        w, h = sizes[name]
+        if x + w > width:
+            x, y, row_height = 0, y + row_height + PADDING, 0
+        positions[name] = (x, y)
+        x += w + PADDING
+        row_height = max(row_height, h)
+    return width, y + row_height, positions
+
+def _pixels(image, opaque):
+    """
+    获取图片解码后的像素
+    带颜色键的图片转换为RGBA，颜色键对应的像素完全透明，与convert_alpha()的结果一致
+
+    参数:
+        image: pygame.image.load()加载的图片
+        opaque: 是否按不透明图片保存
+
+    返回:
+        pygame.Surface: RGB或RGBA格式的图片
+    """
+    if opaque:
+        return image
+    if image.get_flags() & pygame.SRCALPHA:
+        return image
+    surface = pygame.Surface(image.get_size(), pygame.SRCALPHA, 32)
+    surface.fill((0, 0, 0, 0))
+    surface.blit(image, (0, 0))
+    return surface
+
+def build(image_dir, path, opaque_images=()):
+    """
+    生成图集文件
+
+    参数:
+        image_dir: 图片目录
+        path: 图集文件路径
+        opaque_images: 不透明图片的名称，打包到RGB图集中
+
+    返回:
+        dict: 图片名 -> (图集编号, x, y, 宽, 高)
+    """
+    images = {name: pygame.image.load(filename) for name, filename in sources(image_dir)}
+    groups = [sorted(name for name in images if name in opaque_images),
+              sorted(name for name in images if name not in opaque_images)]
+    sheets = []
+    index = {}
+    for number, names in enumerate(groups):
+        opaque = number == 0
+        width, height, positions = pack({name: images[name].get_size() for name in names})
+        sheet = pygame.Surface((width, max(height, 1)), 0 if opaque else pygame.SRCALPHA, 24 if opaque else 32)
+        for name in names:
+            sheet.blit(_pixels(images[name], opaque), positions[name],
+                       special_flags=0 if opaque else pygame.BLEND_RGBA_MAX)
+            index[name] = (number, positions[name][0], positions[name][1]) + images[name].get_size()
+        sheets.append((sheet, 'RGB' if opaque else 'RGBA'))
+
+    # 索引中每项是名称长度、图集编号和矩形，名称紧随其后
+    entries = []
+    for name in sorted(index):
+        encoded = name.encode('utf-8')
+        entries.append(ENTRY.pack(len(encoded), *index[name]) + encoded)
+    entries = b''.join(entries)
+
+    # 计算像素数据的偏移，按页对齐便于mmap
+    offset = HEADER.size + SHEET.size * len(sheets) + len(entries)
+    data = []
+    table = []
+    for sheet, fmt in sheets:
+        offset = (offset + mmap.PAGESIZE - 1) // mmap.PAGESIZE * mmap.PAGESIZE
+        pixels = pygame.image.tobytes(sheet, fmt)
+        table.append(SHEET.pack(sheet.get_width(), sheet.get_height(), len(fmt), offset))
+        data.append((offset, pixels))
+        offset += len(pixels)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = '%s.%d.tmp' % (path, os.getpid())
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(sheets), len(index), signature(image_dir)))
+        f.write(b''.join(table))
+        f.write(entries)
+        for offset, pixels in data:
+            f.seek(offset)
+            f.write(pixels)
+    os.replace(temp_path, path)
+    return index
+
+class Atlas():
+    """
+    已加载的图集
+    像素数据直接引用mmap映射的文件，第一次需要转换时每张图集整体转换一次
+    """
+    def __init__(self, data, sheets, index):
+        """
+        参数:
+            data: 映射图集文件的mmap对象
+            sheets: 每张图集的(未转换的Surface, 是否不透明)
+            index: 图片名 -> (图集编号, pygame.Rect)
+        """
+        self.data = data
+        self.sheets = sheets
+        self.index = index
+        self.converted = {}  # 图集编号 -> 转换为显示像素格式的Surface
+
+    def image(self, name, convert=False):
+        """
+        获取图集中的一张图片
+
+        参数:
+            name: 图片名
+            convert: 是否返回转换为显示像素格式的图片，需要已经创建显示窗口
+
+        返回:
+            pygame.Surface: 图集的子Surface
+        """
+        number, rect = self.index[name]
+        sheet, opaque = self.sheets[number]
+        if convert:
+            converted = self.converted.get(number)
+            if converted is None:
+                converted = self.converted[number] = sheet.convert() if opaque else sheet.convert_alpha()
+            sheet = converted
+        return sheet.subsurface(rect)
+
+    def clear(self):
+        """
+        丢弃转换后的图集，在显示模式改变后调用
+        """
+        self.converted.clear()
+
+def load(path, image_dir=None):
+    """
+    用mmap加载图集文件
+
+    参数:
+        path: 图集文件路径
+        image_dir: 图片目录，指定时检查图集是否与图片一致
+
+    返回:
+        Atlas: 图集，文件不存在、格式不对或已经过期时返回None
+    """
+    try:
+        f = open(path, 'rb')
+    except OSError:
+        return None
+    with f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+    if len(data) < HEADER.size:
+        return None
+    magic, version, sheet_count, entry_count, digest = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION \
+            or (image_dir is not None and digest != signature(image_dir)):
+        data.close()
+        return None
+    view = memoryview(data)
+    position = HEADER.size
+    sheets = []
+    for number in range(sheet_count):
+        width, height, depth, offset = SHEET.unpack_from(data, position)
+        position += SHEET.size
+        size = width * height * depth
+        pixels = view[offset:offset + size]
+        sheets.append((pygame.image.frombuffer(pixels, (width, height), 'RGB' if depth == 3 else 'RGBA'),
+                       depth == 3))
+    index = {}
+    for number in range(entry_count):
+        length, sheet, x, y, w, h = ENTRY.unpack_from(data, position)
+        position += ENTRY.size
+        name = bytes(view[position:position + length]).decode('utf-8')
+        position += length
+        index[name] = (sheet, pygame.Rect(x, y, w, h))
+    return Atlas(data, sheets, index)
+
+def main(argv=None):
+    """
+    图集命令行入口
+
+    参数:
+        argv: 参数列表，默认使用sys.argv
+    """
+    import assets
+    parser = argparse.ArgumentParser(description='生成坦克大战的图集')
+    parser.add_argument('--benchmark', action='store_true', help='比较逐个加载PNG和加载图集的时间')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    index = build(assets.IMAGE_DIR, assets.ATLAS_PATH, assets.OPAQUE_IMAGES)
+    print('已生成%s: %d张图片, %d字节, 用时%.1fms' % (
+        assets.ATLAS_PATH, len(index), os.path.getsize(assets.ATLAS_PATH),
+        (time.perf_counter() - start) * 1000))
+    if not args.benchmark:
+        return
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.display.init()
+    pygame.display.set_mode((630, 630))
+    for use_atlas in (False, True):
+        assets.clear()
+        assets.use_atlas(use_atlas)
+        start = time.perf_counter()
+        for name in index:
+            assets.load_image(name)
+        print('%s: 加载并转换%d张图片用时%.1fms' % (
+            '图集' if use_atlas else '逐个加载PNG', len(index), (time.perf_counter() - start) * 1000))
+
+if __name__ == "__main__":
+    main()
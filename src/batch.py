@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+批量对局模块
+用进程池在所有CPU核心上并行运行无界面对局，用于统计不同随机数种子下的游戏结果
+每局使用一个随机数种子，种子按块分配给各个工作进程，互不重叠；
+每局结束后只把少量统计数据传回主进程，主进程边接收边累加，不保存每局的结果
+
+用法:
+    python batch.py --matches 1000                  运行1000局并打印汇总表
+    python batch.py --matches 200 --start-seed 5000 --workers 4 --policy idle
+"""
+
+import os
+import time
+import random
+import argparse
+import multiprocessing
+import world
+
+# 玩家1可以按住的方向键
+P1_DIRECTIONS = (world.P1_UP, world.P1_DOWN, world.P1_LEFT, world.P1_RIGHT)
+P2_DIRECTIONS = (world.P2_UP, world.P2_DOWN, world.P2_LEFT, world.P2_RIGHT)
+
+# 敌方坦克和道具类型的名称，用于汇总表
+ENEMY_KINDS = {1: '普通', 2: '快速', 3: '重型', 4: '装甲'}
+FOOD_KINDS = {1: '炸弹', 2: '定时', 3: '子弹增强', 4: '铁墙', 5: '护盾', 6: '升级', 7: '生命'}
+
+class RandomBot():
+    """
+    随机操作的玩家
+    按住一个随机方向持续随机帧数，并经常开火
+    随机数生成器由对局的种子派生，同一个种子的对局完全可以重现
+    """
+    def __init__(self, seed, players=1):
+        """
+        初始化随机玩家
+
+        参数:
+            seed: 对局的随机数种子
+            players: 玩家人数
+        """
+        self.random = random.Random(seed ^ 0x5EED)
+        self.players = players
+        self.held = [0] * players   # 每个玩家当前按住的方向键
+        self.remaining = [0] * players  # 每个玩家还要按住的帧数
+
+    def __call__(self, gameWorld):
+        """
+        生成本帧的输入位掩码
+
+        参数:
+            gameWorld: 游戏世界对象
+
+        返回:
+            int: 输入位掩码
+        """
+        inputs = 0
+        for player, (directions, fire) in enumerate(((P1_DIRECTIONS, world.P1_FIRE),
+                                                     (P2_DIRECTIONS, world.P2_FIRE))[:self.players]):
+            if self.remaining[player] <= 0:
+                self.held[player] = self.random.choice(directions)
+                self.remaining[player] = self.random.randint(10, 90)
+            self.remaining[player] -= 1
+            inputs |= self.held[player]
+            if self.random.random() < 0.3:
+                inputs |= fire
+        return inputs
+
+def idle_bot(seed, players=1):
+    """
+    不做任何操作的玩家，用于观察只有敌方坦克行动时基地能坚持多久
+
+    返回:
+        function: 总是返回0的输入函数
+    """
+    return lambda gameWorld: 0
+
+POLICIES = {'random': RandomBot, 'idle': idle_bot}
+
+# 工作进程中的对局参数，由_init_worker()设置
+_options = None
+
+def _init_worker(options):
+    """
+    工作进程初始化：创建无界面的显示窗口并保存对局参数
+
+    参数:
+        options: (玩家人数, 敌方坦克上限, 最大帧数, 玩家策略名, 敌方坦克移动方式)
+    """
+    global _options
+    world.init_headless()
+    _options = options
+
+def run_match(seed, players=1, max_enemies=4, max_ticks=36000, policy='random',
+              enemy_ai=world.ENEMY_AI_RANDOM):
+    """
+    运行一局无界面对局
+
+    参数:
+        seed: 随机数种子
+        players: 玩家人数
+        max_enemies: 敌方坦克上限
+        max_ticks: 最大帧数，基地坚持到这一帧即结束对局
+        policy: 玩家策略名，见POLICIES
+        enemy_ai: 敌方坦克的移动方式（world.ENEMY_AI_*）
+
+    返回:
+        tuple: (种子, 帧数, 基地是否存活, 各类型消灭数, 各类型出现数, 红色坦克出现数, 各类型道具拾取数)
+    """
+    gameWorld = world.World(players, max_enemies, seed, fixed_timestep=True, enemy_ai=enemy_ai)
+    bot = POLICIES[policy](seed, players)
+    step = gameWorld.step
+    while not gameWorld.game_over and gameWorld.tick < max_ticks:
+        step(bot(gameWorld))
+    return (seed, gameWorld.tick, gameWorld.homeSurvive, tuple(gameWorld.kills),
+            tuple(gameWorld.spawned), gameWorld.redSpawned, tuple(gameWorld.pickups))
+
+def _run_match(seed):
+    """
+    工作进程中运行一局，对局参数来自_init_worker()
+    """
+    return run_match(seed, *_options)
+
+class Summary():
+    """
+    对局结果汇总
+    只保存累计值，内存占用与对局数无关
+    """
+    def __init__(self):
+        self.matches = 0
+        self.survived = 0       # 基地坚持到最大帧数的对局数
+        self.total_ticks = 0
+        self.min_ticks = None   # 基地被摧毁的对局中最短的存活时间
+        self.max_ticks = None
+        self.destroyed_ticks = 0  # 基地被摧毁的对局的存活时间之和
+        self.kills = [0] * 5
+        self.spawned = [0] * 5
+        self.redSpawned = 0
+        self.pickups = [0] * 8
+
+    def add(self, result):
+        """
+        累加一局的结果
+
+        参数:
+            result: run_match()的返回值
+        """
+        seed, ticks, survived, kills, spawned, redSpawned, pickups = result
+        self.matches += 1
+        self.total_ticks += ticks
+        if survived:
+            self.survived += 1
+        else:
+            self.destroyed_ticks += ticks
+            self.min_ticks = ticks if self.min_ticks is None else min(self.min_ticks, ticks)
+            self.max_ticks = ticks if self.max_ticks is None else max(self.max_ticks, ticks)
+        for kind in range(5):
+            self.kills[kind] += kills[kind]
+            self.spawned[kind] += spawned[kind]
+        self.redSpawned += redSpawned
+        for kind in range(8):
+            self.pickups[kind] += pickups[kind]
+
+    def format(self):
+        """
+        生成汇总表
+
+        返回:
+            str: 多行文本
+        """
+        seconds = lambda ticks: ticks / world.TICKS_PER_SECOND
+        matches = self.matches or 1
+        destroyed = self.matches - self.survived
+        lines = []
+        lines.append('对局数: %d, 基地坚持到结束: %d (%.1f%%), 基地被摧毁: %d' % (
+            self.matches, self.survived, 100.0 * self.survived / matches, destroyed))
+        lines.append('平均对局时长: %.1f秒' % seconds(self.total_ticks / matches))
+        if destroyed:
+            lines.append('基地存活时间: 平均%.1f秒, 最短%.1f秒, 最长%.1f秒' % (
+                seconds(self.destroyed_ticks / destroyed), seconds(self.min_ticks), seconds(self.max_ticks)))
+        lines.append('')
+        lines.append('%-6s %10s %10s %8s %10s' % ('敌方坦克', '出现', '消灭', '消灭率', '每局消灭'))
+        for kind, name in ENEMY_KINDS.items():
+            spawned, kills = self.spawned[kind], self.kills[kind]
+            lines.append('%-8s %10d %10d %7.1f%% %10.2f' % (
+                name, spawned, kills, 100.0 * kills / spawned if spawned else 0, kills / matches))
+        lines.append('红色坦克出现: %d' % self.redSpawned)
+        lines.append('')
+        lines.append('%-6s %10s %10s' % ('道具', '拾取', '每局拾取'))
+        for kind, name in FOOD_KINDS.items():
+            lines.append('%-8s %10d %10.2f' % (name, self.pickups[kind], self.pickups[kind] / matches))
+        return '\n'.join(lines)
+
+def run_batch(matches, start_seed=0, workers=None, players=1, max_enemies=4,
+              max_ticks=36000, policy='random', enemy_ai=world.ENEMY_AI_RANDOM,
+              chunksize=None, progress=None):
+    """
+    在进程池中运行一批对局并汇总结果
+    种子为start_seed到start_seed+matches-1，每次按块分配给一个工作进程，
+    结果按完成顺序返回并立即累加
+
+    参数:
+        matches: 对局数
+        start_seed: 第一局的种子
+        workers: 工作进程数，默认为CPU核心数
+        players: 玩家人数
+        max_enemies: 敌方坦克上限
+        max_ticks: 每局最大帧数
+        policy: 玩家策略名
+        enemy_ai: 敌方坦克的移动方式
+        chunksize: 每次分配给工作进程的种子数，默认按进程数自动计算
+        progress: 每完成一局时调用的函数，参数为(已完成局数, 对局结果)
+
+    返回:
+        Summary: 汇总结果
+    """
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, min(64, matches // (workers * 8)))
+    summary = Summary()
+    options = (players, max_enemies, max_ticks, policy, enemy_ai)
+    with multiprocessing.Pool(workers, _init_worker, (options,)) as pool:
+        for result in pool.imap_unordered(_run_match, range(start_seed, start_seed + matches), chunksize):
+            summary.add(result)
+            if progress is not None:
+                progress(summary.matches, result)
+        # SDL会接管SIGTERM，Pool退出时的terminate()无法结束工作进程，需要让它们正常退出
+        pool.close()
+        pool.join()
+    return summary
+
+def main(argv=None):
+    """
+    批量对局命令行入口
+
+    参数:
+        argv: 参数列表，默认使用sys.argv
+    """
+    parser = argparse.ArgumentParser(description='坦克大战批量对局')
+    parser.add_argument('--matches', type=int, default=100, help='对局数')
+    parser.add_argument('--start-seed', type=int, default=0, help='第一局的随机数种子')
+    parser.add_argument('--workers', type=int, default=None, help='工作进程数，默认为CPU核心数')
+    parser.add_argument('--max-ticks', type=int, default=36000, help='每局最大帧数')
+    parser.add_argument('--players', type=int, choices=(1, 2), default=1, help='玩家人数')
+    parser.add_argument('--max-enemies', type=int, default=4, help='敌方坦克上限')
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='random', help='玩家策略')
+    parser.add_argument('--flow', action='store_true', help='敌方坦克沿流场朝基地前进')
+    parser.add_argument('--chunksize', type=int, default=None, help='每次分配给工作进程的种子数')
+    args = parser.parse_args(argv)
+
+    def progress(done, result):
+        if done % 10 == 0 or done == args.matches:
+            print('\r已完成 %d/%d' % (done, args.matches), end='', flush=True)
+
+    start = time.perf_counter()
+    summary = run_batch(args.matches, args.start_seed, args.workers, args.players,
+                        args.max_enemies, args.max_ticks, args.policy,
+                        world.ENEMY_AI_FLOW if args.flow else world.ENEMY_AI_RANDOM,
+                        args.chunksize, progress)
+    elapsed = time.perf_counter() - start
+    print()
+    print(summary.format())
+    print('')
+    print('用时: %.2f秒, 共%d帧 (%.0f帧/秒)' % (
+        elapsed, summary.total_ticks, summary.total_ticks / elapsed if elapsed else 0))
+
+if __name__ == "__main__":
+    main()
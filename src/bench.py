@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+性能测试模块
+在无界面环境下运行固定种子的场景，测量游戏逻辑每秒能推进的帧数和每帧耗时，
+渲染在SDL的dummy显示驱动下单独测量
+结果可以保存为JSON作为基准，之后的运行与基准比较，变慢超过阈值时报告性能退化
+
+场景:
+    stock       默认地图，4辆敌方坦克，随机操作的玩家
+    enemies     52x52的大地图，场上最多40辆敌方坦克
+    bullets     敌方子弹每帧都冷却完毕，场上子弹尽可能多
+    reset       反复调用World.reset()重新开始
+    render      默认地图大小（630x630）的窗口，整屏刷新的渲染
+    render-dirty 同样大小的窗口，脏矩形刷新的渲染
+
+用法:
+    python bench.py                               运行所有场景并打印结果
+    python bench.py --save baseline.json          保存为基准
+    python bench.py --compare baseline.json       与基准比较，退化时返回1
+    python bench.py --scenario stock --scenario reset --repeat 5
+"""
+
+import sys
+import json
+import time
+import platform
+import argparse
+import pygame
+import world
+import batch
+import renderer
+
+# 结果文件的格式版本
+VERSION = 1
+
+# 默认的退化阈值：每秒帧数比基准低10%以上
+DEFAULT_THRESHOLD = 0.10
+
+def _percentile(values, fraction):
+    """
+    计算已排序数据的分位数
+    """
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def _measure(step, ticks):
+    """
+    调用step()指定次数，记录每次的耗时
+    step()返回数值时以返回值作为本次的耗时，用于只测量其中一部分的场景
+
+    参数:
+        step: 每次调用的函数
+        ticks: 调用次数
+
+    返回:
+        dict: 每秒次数和每次耗时的p50/p95/p99（毫秒）
+    """
+    clock = time.perf_counter
+    times = []
+    append = times.append
+    for tick in range(ticks):
+        before = clock()
+        spent = step()
+        append(clock() - before if spent is None else spent)
+    elapsed = sum(times)
+    times.sort()
+    return {
+        'ticks_per_sec': ticks / elapsed,
+        'p50_ms': _percentile(times, 0.50) * 1000,
+        'p95_ms': _percentile(times, 0.95) * 1000,
+        'p99_ms': _percentile(times, 0.99) * 1000,
+    }
+
+def _play(gameWorld, seed, events=None):
+    """
+    生成推进一局对局的函数，游戏结束后以下一个种子重新开始
+
+    参数:
+        gameWorld: 游戏世界对象
+        seed: 第一局的种子
+        events: 返回本帧定时事件的函数，参数为帧数；为None时使用固定步长模式的定时事件
+
+    返回:
+        function: 每次调用推进一帧
+    """
+    state = {'seed': seed, 'bot': batch.RandomBot(seed, gameWorld.players)}
+    def step():
+        if gameWorld.game_over:
+            state['seed'] += 1
+            gameWorld.reset(state['seed'])
+            state['bot'] = batch.RandomBot(state['seed'], gameWorld.players)
+        inputs = state['bot'](gameWorld)
+        if events is None:
+            gameWorld.step(inputs)
+        else:
+            gameWorld.step(inputs, events(gameWorld.tick))
+    return step
+
+def scenario_stock(seed):
+    """
+    默认地图和默认的敌方坦克数
+    """
+    return _play(world.World(1, 4, seed, fixed_timestep=True), seed)
+
+def scenario_enemies(seed):
+    """
+    大地图上的大量敌方坦克
+    """
+    return _play(world.World(1, 40, seed, fixed_timestep=True, level='arena52x52'), seed)
+
+def scenario_bullets(seed):
+    """
+    敌方子弹每帧都冷却完毕，坦克每帧都生成
+    """
+    rapid = [world.EVENT_SPAWN, world.EVENT_ENEMY_RELOAD, world.EVENT_PLAYER_RELOAD]
+    gameWorld = world.World(2, 12, seed, fixed_timestep=False, level='arena52x52')
+    return _play(gameWorld, seed, lambda tick: rapid)
+
+def scenario_reset(seed):
+    """
+    反复重新开始对局
+    """
+    gameWorld = world.World(1, 4, seed, fixed_timestep=True)
+    state = [seed]
+    def step():
+        state[0] += 1
+        gameWorld.reset(state[0])
+    return step
+
+def _render(seed, dirty):
+    """
+    推进对局并测量绘制和刷新一帧的时间，游戏逻辑的时间不计入
+    窗口与地图一样大，与游戏中相同，不按卷轴方式绘制
+    """
+    gameWorld = world.World(2, 4, seed, fixed_timestep=True)
+    screen = pygame.display.set_mode(gameWorld.bgMap.size)
+    gameRenderer = renderer.Renderer(screen, dirty)
+    if gameRenderer.scrolling(gameWorld):
+        raise AssertionError('渲染测试的窗口%s比地图%s小' % (screen.get_size(), gameWorld.bgMap.size))
+    advance = _play(gameWorld, seed)
+    clock = time.perf_counter
+    def step():
+        advance()
+        before = clock()
+        gameRenderer.draw(gameWorld)
+        gameRenderer.present()
+        return clock() - before
+    return step
+
+def scenario_render(seed):
+    """
+    整屏刷新的渲染
+    """
+    return _render(seed, False)
+
+def scenario_render_dirty(seed):
+    """
+    脏矩形刷新的渲染
+    """
+    return _render(seed, True)
+
+# 场景名 -> (创建函数, 默认帧数)
+SCENARIOS = {
+    'stock': (scenario_stock, 20000),
+    'enemies': (scenario_enemies, 5000),
+    'bullets': (scenario_bullets, 5000),
+    'reset': (scenario_reset, 500),
+    'render': (scenario_render, 2000),
+    'render-dirty': (scenario_render_dirty, 2000),
+}
+
+def run_scenario(name, seed=0, repeat=3, ticks=None):
+    """
+    运行一个场景，重复若干次取最快的一次
+    每次重复使用相同的种子，结果只受运行速度影响
+
+    参数:
+        name: 场景名，见SCENARIOS
+        seed: 随机数种子
+        repeat: 重复次数
+        ticks: 每次运行的帧数，默认使用场景的默认值
+
+    返回:
+        dict: 每秒帧数和每帧耗时的p50/p95/p99（毫秒）
+    """
+    create, default_ticks = SCENARIOS[name]
+    ticks = ticks or default_ticks
+    best = None
+    for run in range(repeat):
+        result = _measure(create(seed), ticks)
+        if best is None or result['ticks_per_sec'] > best['ticks_per_sec']:
+            best = result
+    best['ticks'] = ticks
+    return best
+
+def run(names=None, seed=0, repeat=3, ticks=None, progress=None):
+    """
+    运行一组场景
+
+    参数:
+        names: 场景名列表，默认运行所有场景
+        seed: 随机数种子
+        repeat: 每个场景的重复次数
+        ticks: 每次运行的帧数，默认使用各场景的默认值
+        progress: 每完成一个场景时调用的函数，参数为(场景名, 结果)
+
+    返回:
+        dict: 可以保存为JSON的结果，包括运行环境和各场景的结果
+    """
+    world.init_headless()
+    results = {}
+    for name in names or SCENARIOS:
+        results[name] = run_scenario(name, seed, repeat, ticks)
+        if progress is not None:
+            progress(name, results[name])
+    return {
+        'version': VERSION,
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'machine': platform.machine(),
+        'seed': seed,
+        'scenarios': results,
+    }
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    与基准比较每秒帧数
+
+    参数:
+        current: run()的结果
+        baseline: 作为基准的run()结果
+        threshold: 允许变慢的比例
+
+    返回:
+        list: 每个两边都有的场景一项(场景名, 基准值, 当前值, 变化比例, 是否退化)
+    """
+    rows = []
+    for name, result in current['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if base is None:
+            continue
+        change = result['ticks_per_sec'] / base['ticks_per_sec'] - 1
+        rows.append((name, base['ticks_per_sec'], result['ticks_per_sec'], change, change < -threshold))
+    return rows
+
+def main(argv=None):
+    """
+    性能测试命令行入口
+
+    参数:
+        argv: 参数列表，默认使用sys.argv
+
+    返回:
+        int: 退出码，与基准比较发现退化时为1
+    """
+    parser = argparse.ArgumentParser(description='坦克大战性能测试')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='要运行的场景，可以指定多次，默认运行所有场景')
+    parser.add_argument('--seed', type=int, default=0, help='随机数种子')
+    parser.add_argument('--repeat', type=int, default=3, help='每个场景的重复次数，取最快的一次')
+    parser.add_argument('--ticks', type=int, default=None, help='每次运行的帧数，默认使用各场景的默认值')
+    parser.add_argument('--save', metavar='PATH', help='把结果保存为JSON')
+    parser.add_argument('--compare', metavar='PATH', help='与保存的基准比较')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='每秒帧数比基准低多少比例时视为退化，默认%(default)s')
+    args = parser.parse_args(argv)
+
+    def progress(name, result):
+        print('%-14s %10.0f 帧/秒  p50 %7.3fms  p95 %7.3fms  p99 %7.3fms' % (
+            name, result['ticks_per_sec'], result['p50_ms'], result['p95_ms'], result['p99_ms']))
+
+    current = run(args.scenario, args.seed, args.repeat, args.ticks, progress)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+    if not args.compare:
+        return 0
+    with open(args.compare) as f:
+        baseline = json.load(f)
+    print('')
+    print('%-14s %10s %10s %8s' % ('场景', '基准', '当前', '变化'))
+    regressed = False
+    for name, base, value, change, worse in compare(current, baseline, args.threshold):
+        print('%-14s %10.0f %10.0f %+7.1f%%%s' % (name, base, value, change * 100, '  退化' if worse else ''))
+        regressed = regressed or worse
+    return 1 if regressed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,11 +5,10 @@
 """
 
 import pygame
-import os
+import assets
 
-# 获取项目根目录
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-IMAGE_DIR = os.path.join(BASE_DIR, 'image')
+# 默认地图（26x26个格子）中子弹可以飞行的区域
+DEFAULT_BOUNDS = pygame.Rect(3, 3, 26 * 24, 26 * 24)
 
 class Bullet(pygame.sprite.Sprite):
     """
@@ -19,16 +18,21 @@ class Bullet(pygame.sprite.Sprite):
     def __init__(self):
         """
         初始化子弹对象
-        加载子弹图片，设置基本属性
+        获取子弹图片，设置基本属性
         """
         pygame.sprite.Sprite.__init__(self)
         
-        # 加载四个方向的子弹图片
-        self.bullet_up = pygame.image.load(os.path.join(IMAGE_DIR, 'bullet_up.png'))
-        self.bullet_down = pygame.image.load(os.path.join(IMAGE_DIR, 'bullet_down.png'))
-        self.bullet_left = pygame.image.load(os.path.join(IMAGE_DIR, 'bullet_left.png'))
-        self.bullet_right = pygame.image.load(os.path.join(IMAGE_DIR, 'bullet_right.png'))
+        # 获取四个方向的子弹图片（共享缓存）
+        self.bullet_up = assets.load_image('bullet_up')
+        self.bullet_down = assets.load_image('bullet_down')
+        self.bullet_left = assets.load_image('bullet_left')
+        self.bullet_right = assets.load_image('bullet_right')
+        self.reset()
 
+    def reset(self):
+        """
+        把子弹重置为新创建时的状态，用于对象池复用子弹对象
+        """
         # 子弹的基本属性
         self.dir_x, self.dir_y = 0, 0  # 子弹的移动方向
         self.speed = 6  # 子弹的移动速度
@@ -58,23 +62,48 @@ class Bullet(pygame.sprite.Sprite):
         elif self.dir_x == 1 and self.dir_y == 0:
             self.bullet = self.bullet_right
     
-    def move(self):
+    def get_state(self):
+        """
+        获取子弹的状态，用于保存和恢复游戏
+        
+        返回:
+            tuple: (left, top, dir_x, dir_y, speed, life, strong)
+        """
+        return (self.rect.left, self.rect.top, self.dir_x, self.dir_y,
+                self.speed, self.life, self.strong)
+    
+    def set_state(self, state):
+        """
+        恢复get_state()返回的子弹状态
+        
+        参数:
+            state: 子弹状态
+        """
+        left, top, dir_x, dir_y, self.speed, life, strong = state
+        self.rect.left, self.rect.top = left, top
+        self.changeImage(dir_x, dir_y)
+        self.life, self.strong = bool(life), bool(strong)
+    
+    def move(self, bounds=DEFAULT_BOUNDS):
         """
         移动子弹并处理边界碰撞
         当子弹碰到边界时，子弹消失
+
+        参数:
+            bounds: 子弹可以飞行的区域，通常是地图的wall.Map.rect
         """
         # 根据方向和速度移动子弹
         self.rect = self.rect.move(self.speed * self.dir_x,
                                    self.speed * self.dir_y)
                 
         # 检查是否碰到边界
-        if self.rect.top < 3:  # 上边界
+        if self.rect.top < bounds.top:  # 上边界
             self.life = False
-        if self.rect.bottom > 630 - 3:  # 下边界
+        if self.rect.bottom > bounds.bottom:  # 下边界
             self.life = False
-        if self.rect.left < 3:  # 左边界
+        if self.rect.left < bounds.left:  # 左边界
             self.life = False
-        if self.rect.right > 630 - 3:  # 右边界
+        if self.rect.right > bounds.right:  # 右边界
             self.life = False
         
         # 检查是否碰到 brickGroup
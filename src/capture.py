@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+"""
+录制模块
+把每一帧画面交给写入线程保存为视频或图片序列，主循环只做一次内存复制
+
+主线程通过Surface.get_buffer()直接读取窗口的像素内存，复制到预先分配的缓冲区中，
+再通过有界队列交给写入线程；像素格式转换、编码和写文件都在写入线程中完成
+缓冲区用完时（写入跟不上）按策略处理：
+    drop   丢弃这一帧，主循环不等待；视频流中用下一帧补上丢弃的帧，时长不变，
+           图片序列按帧号命名，丢弃的帧号空缺
+    block  等待写入线程空出缓冲区，主循环会变慢，但不丢帧
+
+输出格式:
+    raw  连续的RGB24原始像素，可以用
+         ffmpeg -f rawvideo -pixel_format rgb24 -video_size 630x630 -framerate 60 -i 文件 输出.mp4
+         转换为常见的视频格式
+    y4m  YUV4MPEG2视频（4:2:0，需要NumPy），可以直接用播放器或ffmpeg打开
+    png  PNG图片序列，路径中的%d按帧号替换，例如frames/%05d.png
+
+用法:
+    capture = FrameCapture('match.y4m', screen)
+    ...每帧绘制并刷新窗口后...
+    capture.capture(screen)
+    ...
+    capture.close()
+    print(capture.format())
+"""
+
+import os
+import zlib
+import time
+import queue
+import struct
+import threading
+import pygame
+
+try:
+    import numpy as np
+except ImportError:  # 只有y4m格式需要NumPy
+    np = None
+
+FORMAT_RAW = 'raw'
+FORMAT_Y4M = 'y4m'
+FORMAT_PNG = 'png'
+FORMATS = (FORMAT_RAW, FORMAT_Y4M, FORMAT_PNG)
+
+POLICY_DROP = 'drop'
+POLICY_BLOCK = 'block'
+POLICIES = (POLICY_DROP, POLICY_BLOCK)
+
+# 默认的缓冲区数，即最多有多少帧等待写入
+DEFAULT_QUEUE_SIZE = 8
+
+# PNG的zlib压缩级别，画面大部分是纯色，低级别已经能压缩得很小
+PNG_COMPRESSION = 1
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+def guess_format(path):
+    """
+    根据文件名判断输出格式
+
+    参数:
+        path: 输出路径
+
+    返回:
+        str: 输出格式（FORMAT_*），.y4m为y4m，.png或包含%的路径为png，其他为raw
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.y4m':
+        return FORMAT_Y4M
+    if extension == '.png' or '%' in path:
+        return FORMAT_PNG
+    return FORMAT_RAW
+
+def png_pattern(path):
+    """
+    生成PNG图片序列的文件名模板
+
+    参数:
+        path: 输出路径，包含%时直接使用，目录时在其中按帧号命名，
+              否则在扩展名前插入帧号
+
+    返回:
+        str: 包含一个%d的文件名模板
+    """
+    if '%' in path:
+        return path
+    if os.path.isdir(path) or path.endswith(os.sep):
+        return os.path.join(path, 'frame%05d.png')
+    root, extension = os.path.splitext(path)
+    return '%s%%05d%s' % (root, extension or '.png')
+
+def _png_chunk(tag, data):
+    """
+    生成一个PNG数据块：长度、类型、数据、CRC
+    """
+    return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(data, zlib.crc32(tag)))
+
+def encode_png(rgb, size, level=PNG_COMPRESSION):
+    """
+    把RGB24像素编码为PNG
+    pygame.image.save()在编码期间不释放GIL，会拖慢主线程；
+    这里的压缩由zlib完成，压缩大块数据时释放GIL，适合在写入线程中调用
+
+    参数:
+        rgb: 按行存储的RGB像素
+        size: (宽, 高)
+        level: zlib压缩级别
+
+    返回:
+        bytes: PNG文件的内容
+    """
+    width, height = size
+    stride = width * 3
+    pixels = memoryview(rgb)
+    # 每行前加一个字节的过滤类型（0，不过滤）
+    rows = []
+    for y in range(height):
+        rows.append(b'\x00')
+        rows.append(pixels[y * stride:(y + 1) * stride])
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return b''.join((PNG_SIGNATURE, _png_chunk(b'IHDR', header),
+                     _png_chunk(b'IDAT', zlib.compress(b''.join(rows), level)), _png_chunk(b'IEND', b'')))
+
+def pixel_layout(surface):
+    """
+    判断Surface的像素内存能否直接复制后在其他线程中读取
+
+    参数:
+        surface: 要录制的Surface
+
+    返回:
+        str: pygame.image.frombuffer()使用的格式（'BGRA'或'RGBA'），
+             像素格式或行宽不支持直接读取时返回None
+    """
+    if surface.get_bytesize() != 4 or surface.get_pitch() != surface.get_width() * 4:
+        return None
+    shifts = surface.get_shifts()[:3]
+    if shifts == (16, 8, 0):
+        return 'BGRA'
+    if shifts == (0, 8, 16):
+        return 'RGBA'
+    return None
+
+class FrameCapture():
+    """
+    录制类
+    主线程调用capture()，写入线程把帧写入文件，close()等待所有帧写完
+    """
+    def __init__(self, path, surface, fmt=None, fps=60, queue_size=DEFAULT_QUEUE_SIZE, policy=POLICY_DROP):
+        """
+        创建输出文件并启动写入线程
+
+        参数:
+            path: 输出路径
+            surface: 要录制的Surface（通常是窗口），用于确定大小和像素格式
+            fmt: 输出格式（FORMAT_*），默认根据文件名判断
+            fps: 视频的帧率
+            queue_size: 缓冲区数
+            policy: 缓冲区用完时的处理方式（POLICY_*）
+        """
+        self.fmt = fmt or guess_format(path)
+        if self.fmt not in FORMATS:
+            raise ValueError('不支持的录制格式: %s' % self.fmt)
+        if policy not in POLICIES:
+            raise ValueError('不支持的缓冲策略: %s' % policy)
+        if self.fmt == FORMAT_Y4M and np is None:
+            raise ValueError('y4m格式需要安装NumPy')
+        self.path = path
+        self.size = surface.get_size()
+        self.fps = fps
+        self.policy = policy
+        # 能直接读取像素内存时复制原始像素，否则在主线程中转换为RGB
+        self.layout = pixel_layout(surface)
+        frame_bytes = self.size[0] * self.size[1] * (4 if self.layout else 3)
+
+        self.file = None
+        if self.fmt == FORMAT_PNG:
+            self.pattern = png_pattern(path)
+            directory = os.path.dirname(self.pattern)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        else:
+            self.file = open(path, 'wb')
+            if self.fmt == FORMAT_Y4M:
+                self.chroma = 'C420jpeg' if not (self.size[0] % 2 or self.size[1] % 2) else 'C444'
+                self.file.write(('YUV4MPEG2 W%d H%d F%d:1 Ip A1:1 %s\n' % (
+                    self.size[0], self.size[1], fps, self.chroma)).encode('ascii'))
+
+        self.free = queue.Queue()  # 空闲的缓冲区
+        for number in range(queue_size):
+            self.free.put(bytearray(frame_bytes))
+        self.pending = queue.Queue()  # 等待写入的(帧号, 缓冲区, 写入次数)，缓冲区为None表示结束
+        self.error = None  # 写入线程遇到的错误
+        self.last_data = None  # 写入线程最后写入视频流的一帧
+
+        # 统计
+        self.frames = 0         # capture()的调用次数，即帧号
+        self.queued = 0         # 交给写入线程的帧数
+        self.dropped = 0        # 丢弃的帧数
+        self.unreported = 0     # 上一个交给写入线程的帧之后丢弃的帧数
+        self.written = 0        # 写入的帧数（视频流中包括补上的帧）
+        self.capture_times = [] # 主线程每帧的耗时（秒）
+        self.blocked_time = 0.0 # 主线程等待缓冲区的总时间
+        self.write_time = 0.0   # 写入线程的总耗时
+
+        self.writer = threading.Thread(target=self._write_loop, name='capture', daemon=True)
+        self.writer.start()
+
+    def capture(self, surface):
+        """
+        录制一帧，在画面绘制完成后调用
+
+        参数:
+            surface: 要录制的Surface，大小和像素格式与创建时相同
+
+        返回:
+            bool: 这一帧是否交给了写入线程
+        """
+        start = time.perf_counter()
+        self.frames += 1
+        if self.error is not None:
+            self.dropped += 1
+            self.capture_times.append(time.perf_counter() - start)
+            return False
+        if self.policy == POLICY_DROP:
+            try:
+                buffer = self.free.get_nowait()
+            except queue.Empty:
+                self.dropped += 1
+                self.unreported += 1
+                self.capture_times.append(time.perf_counter() - start)
+                return False
+        else:
+            buffer = self.free.get()
+            self.blocked_time += time.perf_counter() - start
+
+        if self.layout is not None:
+            # 直接读取窗口的像素内存，复制到缓冲区中，中间不产生任何Python对象
+            pixels = surface.get_buffer()
+            buffer[:] = pixels
+            del pixels  # 释放对Surface的锁定
+        else:
+            buffer[:] = pygame.image.tobytes(surface, 'RGB')
+        self.pending.put((self.frames, buffer, 1 + self.unreported))
+        self.unreported = 0
+        self.queued += 1
+        self.capture_times.append(time.perf_counter() - start)
+        return True
+
+    def _write_loop(self):
+        """
+        写入线程：依次写入等待的帧，写完后把缓冲区放回空闲队列
+        """
+        while True:
+            number, buffer, repeat = self.pending.get()
+            if buffer is None:
+                # 结束：视频流中用最后一帧补上最后丢弃的帧
+                if repeat and self.last_data is not None and self.error is None:
+                    try:
+                        for count in range(repeat):
+                            self.file.write(self.last_data)
+                        self.written += repeat
+                    except OSError as e:
+                        self.error = e
+                break
+            start = time.perf_counter()
+            try:
+                if self.error is None:
+                    self._write_frame(number, buffer, repeat)
+            except (OSError, pygame.error) as e:
+                self.error = e
+            self.write_time += time.perf_counter() - start
+            self.free.put(buffer)
+
+    def _surface(self, buffer):
+        """
+        把缓冲区包装为Surface，不复制像素
+        """
+        return pygame.image.frombuffer(buffer, self.size, self.layout or 'RGB')
+
+    def _write_frame(self, number, buffer, repeat):
+        """
+        写入一帧
+
+        参数:
+            number: 帧号，从1开始
+            buffer: 像素数据
+            repeat: 视频流中写入的次数，包括补上前面丢弃的帧
+        """
+        if self.fmt != FORMAT_Y4M:
+            rgb = buffer if self.layout is None else pygame.image.tobytes(self._surface(buffer), 'RGB')
+        if self.fmt == FORMAT_PNG:
+            with open(self.pattern % number, 'wb') as f:
+                f.write(encode_png(rgb, self.size))
+            self.written += 1
+            return
+        if self.fmt == FORMAT_RAW:
+            data = rgb
+        else:
+            data = b'FRAME\n' + self._yuv(buffer)
+        for count in range(repeat):
+            self.file.write(data)
+        self.written += repeat
+        self.last_data = data
+
+    def _yuv(self, buffer):
+        """
+        把像素转换为YUV平面（JPEG的全范围BT.601系数），4:2:0时色度取2x2像素的平均值
+
+        参数:
+            buffer: 像素数据
+
+        返回:
+            bytes: Y、U、V三个平面
+        """
+        width, height = self.size
+        pixels = np.frombuffer(buffer, dtype=np.uint8).reshape(height, width, 4 if self.layout else 3)
+        order = {'BGRA': (2, 1, 0), 'RGBA': (0, 1, 2), None: (0, 1, 2)}[self.layout]
+        r, g, b = (pixels[:, :, channel].astype(np.int32) for channel in order)
+        y = (77 * r + 150 * g + 29 * b + 128) >> 8
+        if self.chroma == 'C420jpeg':
+            r, g, b = ((c[0::2, 0::2] + c[1::2, 0::2] + c[0::2, 1::2] + c[1::2, 1::2] + 2) >> 2
+                       for c in (r, g, b))
+        u = ((-43 * r - 85 * g + 128 * b + 128) >> 8) + 128
+        v = ((128 * r - 107 * g - 21 * b + 128) >> 8) + 128
+        return b''.join(np.clip(plane, 0, 255).astype(np.uint8).tobytes() for plane in (y, u, v))
+
+    def close(self):
+        """
+        等待所有帧写完并关闭文件，之后不能再调用capture()
+        """
+        if self.writer.is_alive():
+            self.pending.put((None, None, self.unreported))
+            self.unreported = 0
+            self.writer.join()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def format(self):
+        """
+        生成录制统计
+
+        返回:
+            str: 帧数、丢弃数和每帧的耗时
+        """
+        times = sorted(self.capture_times)
+        count = max(len(times), 1)
+        line = '录制(%s, %s): 捕获%d帧, 写入%d帧, 丢弃%d帧, 主线程每帧平均%.3fms (p95 %.3fms, 最大%.3fms), ' \
+               '等待缓冲区共%.1fms, 写入线程每帧平均%.3fms' % (
+                   self.fmt, self.policy, self.frames, self.written, self.dropped,
+                   sum(times) / count * 1000, times[min(len(times) - 1, int(0.95 * len(times)))] * 1000 if times else 0,
+                   times[-1] * 1000 if times else 0, self.blocked_time * 1000,
+                   self.write_time / max(self.queued, 1) * 1000)
+        if self.error is not None:
+            line += ', 写入失败: %s' % self.error
+        return line
@@ -11,19 +11,16 @@
 
 import pygame
 import random
-import os
+import assets
 import bulletClass
-
-# 获取项目根目录
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-IMAGE_DIR = os.path.join(BASE_DIR, 'image')
+import wall
 
 class EnemyTank(pygame.sprite.Sprite):
     """
     敌方坦克类
     继承自pygame的Sprite类，用于处理敌方坦克的显示和移动
     """
-    def __init__(self, x=None, kind=None, isred=None):
+    def __init__(self, x=None, kind=None, isred=None, rng=None, bullet=None):
         """
         初始化敌方坦克对象
         
@@ -31,27 +28,36 @@ class EnemyTank(pygame.sprite.Sprite):
             x: 坦克的出生位置（1-3）
             kind: 坦克类型（1-4）
             isred: 是否携带道具
+            rng: 随机数生成器，默认使用全局的random模块
+            bullet: 坦克使用的子弹对象，默认创建新的子弹
         """
         pygame.sprite.Sprite.__init__(self)
+        self.reset(x, kind, isred, rng, bullet)
+
+    def reset(self, x=None, kind=None, isred=None, rng=None, bullet=None):
+        """
+        把坦克重置为新创建时的状态，用于对象池复用坦克对象
+        参数与构造函数相同
+        """
+        self.random = rng if rng is not None else random
 
         # 坦克动画相关属性
         self.flash = False  # 是否在出生动画中
         self.times = 90     # 动画计时器
 
         # 设置坦克类型
-        self.kind = kind if kind else random.choice([1, 2, 3, 4])
+        self.kind = kind if kind else self.random.choice([1, 2, 3, 4])
 
-        # 根据类型加载坦克图片
+        # 根据类型获取坦克图片
         self._load_tank_images()
 
         # 设置坦克属性
-        self.isred = isred if isred is not None else random.choice((True, False, False, False, False))
+        self.isred = isred if isred is not None else self.random.choice((True, False, False, False, False))
         self.tank = self.enemy_x_3 if self.isred else self.enemy_x_0
-        self.x = (x if x else random.choice([1, 2, 3])) - 1
+        self.x = (x if x else self.random.choice([1, 2, 3])) - 1
 
-        # 设置坦克移动图片
-        self.tank_R0 = self.tank.subsurface((0, 48), (48, 48))
-        self.tank_R1 = self.tank.subsurface((48, 48), (48, 48))
+        # 设置坦克移动图片（初始向下）
+        self.direction = 1
         self.rect = self.tank_R0.get_rect()
         self.rect.left, self.rect.top = 3 + self.x * 12 * 24, 3
 
@@ -60,29 +66,69 @@ class EnemyTank(pygame.sprite.Sprite):
         self.dir_x, self.dir_y = 0, 1  # 初始向下移动
         self.life = 3 if self.kind == 3 else 1  # 重型坦克有3条命
         self.bulletNotCooling = True  # 子弹冷却状态
-        self.bullet = bulletClass.Bullet()  # 创建子弹对象
+        self.bullet = bullet if bullet is not None else bulletClass.Bullet()  # 子弹对象
         self.dirChange = False  # 方向是否改变
 
     def _load_tank_images(self):
         """
-        根据坦克类型加载对应的图片
+        根据坦克类型获取对应的动画帧表（共享缓存）
         """
         if self.kind == 1:
-            self.enemy_x_0 = pygame.image.load(os.path.join(IMAGE_DIR, 'enemy_1_0.png')).convert_alpha()
-            self.enemy_x_3 = pygame.image.load(os.path.join(IMAGE_DIR, 'enemy_1_3.png')).convert_alpha()
+            self.enemy_x_0 = assets.load_frames('enemy_1_0')
+            self.enemy_x_3 = assets.load_frames('enemy_1_3')
         elif self.kind == 2:
-            self.enemy_x_0 = pygame.image.load(os.path.join(IMAGE_DIR, 'enemy_2_0.png')).convert_alpha()
-            self.enemy_x_3 = pygame.image.load(os.path.join(IMAGE_DIR, 'enemy_2_3.png')).convert_alpha()
+            self.enemy_x_0 = assets.load_frames('enemy_2_0')
+            self.enemy_x_3 = assets.load_frames('enemy_2_3')
         elif self.kind == 3:
-            self.enemy_x_0 = pygame.image.load(os.path.join(IMAGE_DIR, 'enemy_3_1.png')).convert_alpha()
-            self.enemy_x_3 = pygame.image.load(os.path.join(IMAGE_DIR, 'enemy_3_0.png')).convert_alpha()
+            self.enemy_x_0 = assets.load_frames('enemy_3_1')
+            self.enemy_x_3 = assets.load_frames('enemy_3_0')
         elif self.kind == 4:
-            self.enemy_x_0 = pygame.image.load(os.path.join(IMAGE_DIR, 'enemy_4_0.png')).convert_alpha()
-            self.enemy_x_3 = pygame.image.load(os.path.join(IMAGE_DIR, 'enemy_4_3.png')).convert_alpha()
+            self.enemy_x_0 = assets.load_frames('enemy_4_0')
+            self.enemy_x_3 = assets.load_frames('enemy_4_3')
+        
+        # 获取重型坦克的特殊帧表
+        self.enemy_3_0 = assets.load_frames('enemy_3_0')
+        self.enemy_3_2 = assets.load_frames('enemy_3_2')
+
+    @property
+    def tank_R0(self):
+        """
+        当前方向的第一帧坦克图片
+        """
+        return self.tank[self.direction][0]
+
+    @property
+    def tank_R1(self):
+        """
+        当前方向的第二帧坦克图片
+        """
+        return self.tank[self.direction][1]
+
+    def get_state(self):
+        """
+        获取坦克的状态，用于保存和恢复游戏
+        出生位置、类型和是否携带道具需要在创建坦克时传入，见EnemyTank(x + 1, kind, isred)
         
-        # 加载重型坦克的特殊图片
-        self.enemy_3_0 = pygame.image.load(os.path.join(IMAGE_DIR, 'enemy_3_0.png')).convert_alpha()
-        self.enemy_3_2 = pygame.image.load(os.path.join(IMAGE_DIR, 'enemy_3_2.png')).convert_alpha()
+        返回:
+            tuple: (x, kind, isred, left, top, dir_x, dir_y, direction, speed, life,
+                    flash, times, bulletNotCooling, frames)，frames为当前帧表的编号
+        """
+        frames = (self.enemy_x_0, self.enemy_x_3, self.enemy_3_0, self.enemy_3_2).index(self.tank)
+        return (self.x, self.kind, self.isred, self.rect.left, self.rect.top,
+                self.dir_x, self.dir_y, self.direction, self.speed, self.life,
+                self.flash, self.times, self.bulletNotCooling, frames)
+
+    def set_state(self, state):
+        """
+        恢复get_state()返回的坦克状态
+
+        参数:
+            state: 坦克状态
+        """
+        (x, kind, isred, self.rect.left, self.rect.top, self.dir_x, self.dir_y,
+         self.direction, self.speed, self.life, flash, self.times, bulletNotCooling, frames) = state
+        self.flash, self.bulletNotCooling = bool(flash), bool(bulletNotCooling)
+        self.tank = (self.enemy_x_0, self.enemy_x_3, self.enemy_3_0, self.enemy_3_2)[frames]
 
     def shoot(self):
         """
@@ -106,73 +152,95 @@ class EnemyTank(pygame.sprite.Sprite):
             self.bullet.rect.left = self.rect.right + 1
             self.bullet.rect.top = self.rect.top + 20
 
-    def move(self, tankGroup, brickGroup, ironGroup):
+    def move(self, tankGroup, bgMap, flowField=None, steps=1):
         """
         移动坦克并处理碰撞
         
         参数:
-            tankGroup: 坦克组
-            brickGroup: 砖块组
-            ironGroup: 铁块组
+            tankGroup: 坦克组（spatial.SpatialGroup），检测时排除自身
+            bgMap: 地图对象
+            flowField: 流场（flowfield.FlowField），指定后坦克沿流场朝基地前进，
+                       否则只在碰撞时随机改变方向
+            steps: 一次移动的帧数，降低更新频率的远处坦克一次移动多帧的距离
         """
         # 移动坦克
-        self.rect = self.rect.move(self.speed * self.dir_x, self.speed * self.dir_y)
+        distance = self.speed * steps
+        self.rect = self.rect.move(distance * self.dir_x, distance * self.dir_y)
         
         # 更新坦克图片
         self._update_tank_image()
+
+        # 沿移动方向走到（或越过）格子边界时按流场选择方向
+        if flowField is not None:
+            if self.dir_x:
+                offset = (self.rect.left - wall.BORDER) * self.dir_x
+            else:
+                offset = (self.rect.top - wall.BORDER) * self.dir_y
+            if offset % wall.TILE_SIZE < distance:
+                direction = flowField.direction(self.rect)
+                if direction is not None:
+                    self.dir_x, self.dir_y = direction
         
         # 处理碰撞
-        self._handle_collision(tankGroup, brickGroup, ironGroup)
+        self._handle_collision(tankGroup, bgMap, flowField, distance)
 
     def _update_tank_image(self):
         """
-        根据移动方向更新坦克图片
+        根据移动方向切换帧表下标
         """
-        if self.dir_x == 0 and self.dir_y == -1:  # 向上
-            self.tank_R0 = self.tank.subsurface((0, 0), (48, 48))
-            self.tank_R1 = self.tank.subsurface((48, 0), (48, 48))
-        elif self.dir_x == 0 and self.dir_y == 1:  # 向下
-            self.tank_R0 = self.tank.subsurface((0, 48), (48, 48))
-            self.tank_R1 = self.tank.subsurface((48, 48), (48, 48))
-        elif self.dir_x == -1 and self.dir_y == 0:  # 向左
-            self.tank_R0 = self.tank.subsurface((0, 96), (48, 48))
-            self.tank_R1 = self.tank.subsurface((48, 96), (48, 48))
-        elif self.dir_x == 1 and self.dir_y == 0:  # 向右
-            self.tank_R0 = self.tank.subsurface((0, 144), (48, 48))
-            self.tank_R1 = self.tank.subsurface((48, 144), (48, 48))
+        self.direction = assets.DIRECTION_INDEX[(self.dir_x, self.dir_y)]
 
-    def _handle_collision(self, tankGroup, brickGroup, ironGroup):
+    def _handle_collision(self, tankGroup, bgMap, flowField=None, distance=None):
         """
         处理坦克的碰撞
         
         参数:
-            tankGroup: 坦克组
-            brickGroup: 砖块组
-            ironGroup: 铁块组
+            tankGroup: 坦克组（spatial.SpatialGroup），检测时排除自身
+            bgMap: 地图对象
+            flowField: 流场，撞到墙壁时按流场选择方向
+            distance: 本次移动的距离，默认为坦克的速度
         """
+        if distance is None:
+            distance = self.speed
+        bounds = bgMap.rect
+
         # 处理地图边界碰撞
-        if self.rect.top < 3:  # 上边界
-            self.rect = self.rect.move(0, self.speed)
+        if self.rect.top < bounds.top:  # 上边界
+            self.rect = self.rect.move(0, distance)
             self._change_direction()
-        elif self.rect.bottom > 630 - 3:  # 下边界
-            self.rect = self.rect.move(0, -self.speed)
+        elif self.rect.bottom > bounds.bottom:  # 下边界
+            self.rect = self.rect.move(0, -distance)
             self._change_direction()
-        elif self.rect.left < 3:  # 左边界
-            self.rect = self.rect.move(self.speed, 0)
+        elif self.rect.left < bounds.left:  # 左边界
+            self.rect = self.rect.move(distance, 0)
             self._change_direction()
-        elif self.rect.right > 630 - 3:  # 右边界
-            self.rect = self.rect.move(-self.speed, 0)
+        elif self.rect.right > bounds.right:  # 右边界
+            self.rect = self.rect.move(-distance, 0)
             self._change_direction()
             
         # 处理与其他物体的碰撞
-        if pygame.sprite.spritecollide(self, brickGroup, False, None) \
-            or pygame.sprite.spritecollide(self, ironGroup, False, None) \
-            or pygame.sprite.spritecollide(self, tankGroup, False, None):
-            self.rect = self.rect.move(-self.speed * self.dir_x, -self.speed * self.dir_y)
+        if bgMap.collide(self.rect):
+            self.rect = self.rect.move(-distance * self.dir_x, -distance * self.dir_y)
+            self._change_direction(flowField)
+        elif tankGroup.collide(self.rect, self):
+            self.rect = self.rect.move(-distance * self.dir_x, -distance * self.dir_y)
             self._change_direction()
 
-    def _change_direction(self):
+    def _change_direction(self, flowField=None):
         """
-        随机改变坦克的移动方向
+        改变坦克的移动方向
+        没有流场时随机选择方向；有流场时按流场选择，
+        流场指向挡路的砖块则停下等子弹把它打掉，偶尔随机换向以免卡在打不掉的墙角
+
+        参数:
+            flowField: 流场
         """
-        self.dir_x, self.dir_y = random.choice(([0,1],[0,-1],[1,0],[-1,0]))
+        if flowField is not None:
+            direction = flowField.direction(self.rect)
+            if direction is not None:
+                if direction != (self.dir_x, self.dir_y):
+                    self.dir_x, self.dir_y = direction
+                    return
+                if self.random.random() >= 1 / 30:
+                    return
+        self.dir_x, self.dir_y = self.random.choice(([0,1],[0,-1],[1,0],[-1,0]))
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+流场寻路模块
+所有敌方坦克共用一张到基地的距离表，每辆坦克只需比较所在位置四个相邻位置的距离
+就能决定移动方向，决策的代价与坦克数量无关
+
+坦克占2x2个格子，距离表按坦克左上角所在的格子记录，共(宽-1)x(高-1)个位置：
+1. 2x2范围内有铁块或河流的位置不能通过
+2. 有砖块的位置可以通过，但需要先把砖块打掉，代价为1 + BRICK_COST
+3. 其余位置代价为1
+距离表从基地出发按代价做广度优先搜索（分桶的Dijkstra算法），
+砖块被打掉时只从受影响的位置向外更新，放置砖块或铁块使代价增加时重新计算整张表
+"""
+
+import wall
+
+# 打掉砖块的额外代价
+BRICK_COST = 3
+
+# 不可到达的距离
+INFINITY = 1 << 30
+
+# 移动方向，顺序即距离相同时的优先级
+DIRECTIONS = ((0, 1), (-1, 0), (1, 0), (0, -1))
+
+class FlowField():
+    """
+    流场类
+    保存地图上每个位置到基地的距离，并通过update()跟随地图的变化
+    """
+    def __init__(self, bgMap, goal=None):
+        """
+        根据地图计算流场
+
+        参数:
+            bgMap: 地图对象（wall.Map）
+            goal: 目标位置（坦克左上角所在的格子），默认为地图的基地bgMap.home
+        """
+        self.goal = goal if goal is not None else bgMap.home
+        self.bgMap = None
+        self.cursor = 0  # 已处理到的地图变化位置（bgMap.change_count）
+        self.rebuilds = 0  # 重新计算整张表的次数
+        self._rebuild(bgMap)
+
+    def _cost(self, index):
+        """
+        计算进入一个位置的代价
+
+        参数:
+            index: 位置下标
+
+        返回:
+            int: 代价，不能通过时为INFINITY
+        """
+        y, x = divmod(index, self.width)
+        grid = self.bgMap.grid
+        cell = y * self.bgMap.width + x
+        kinds = (grid[cell], grid[cell + 1], grid[cell + self.bgMap.width], grid[cell + self.bgMap.width + 1])
+        if wall.IRON in kinds or wall.RIVER in kinds:
+            return INFINITY
+        if wall.BRICK in kinds:
+            return 1 + BRICK_COST
+        return 1
+
+    def _rebuild(self, bgMap):
+        """
+        重新计算整张距离表
+
+        参数:
+            bgMap: 地图对象
+        """
+        self.bgMap = bgMap
+        self.cursor = bgMap.change_count
+        self.width = bgMap.width - 1
+        self.height = bgMap.height - 1
+        size = self.width * self.height
+        self.costs = [self._cost(index) for index in range(size)]
+        # 每个位置的相邻位置下标
+        width, height = self.width, self.height
+        self.neighbours = []
+        for index in range(size):
+            y, x = divmod(index, width)
+            self.neighbours.append(tuple(
+                (y + dy) * width + x + dx for dx, dy in DIRECTIONS
+                if 0 <= x + dx < width and 0 <= y + dy < height))
+        self.distances = [INFINITY] * size
+        goal = self.goal[1] * width + self.goal[0]
+        self.distances[goal] = 0
+        self._propagate([goal])
+        self.rebuilds += 1
+
+    def _propagate(self, seeds):
+        """
+        从距离已经减小的位置出发，向外更新相邻位置的距离
+        代价都是小整数，按距离分桶处理，每个位置出桶时距离已经确定
+
+        参数:
+            seeds: 距离已经更新的位置下标
+        """
+        distances = self.distances
+        costs = self.costs
+        neighbours = self.neighbours
+        buckets = {}
+        for index in seeds:
+            buckets.setdefault(distances[index], []).append(index)
+        # 新加入的位置距离总是大于当前的桶，按距离从小到大逐个取桶即可
+        distance = min(buckets) if buckets else 0
+        while buckets:
+            bucket = buckets.pop(distance, ())
+            for index in bucket:
+                if distances[index] != distance:
+                    continue  # 已经以更短的距离处理过
+                # 从相邻位置进入本位置，需要付出本位置的代价
+                cost = costs[index]
+                if cost == INFINITY:
+                    continue
+                nearer = distance + cost
+                for other in neighbours[index]:
+                    if nearer < distances[other]:
+                        distances[other] = nearer
+                        buckets.setdefault(nearer, []).append(other)
+            distance += 1
+
+    def update(self, bgMap):
+        """
+        跟随地图的变化更新距离表
+        只重新计算变化的格子所在位置的代价，代价都没有改变时（例如放置的格子与原来相同）不做任何事；
+        代价只减小时（格子变为空地）只需从这些位置向外更新，有代价增加时重新计算整张表
+
+        参数:
+            bgMap: 当前的地图对象
+        """
+        changes = bgMap.changes_since(self.cursor) if bgMap is self.bgMap else None
+        if changes is None:
+            self._rebuild(bgMap)
+            return
+        if not changes:
+            return
+        self.cursor = bgMap.change_count
+        positions = set()
+        for cell in changes:
+            # 包含该格子的2x2位置
+            y, x = divmod(cell, bgMap.width)
+            for py in (y - 1, y):
+                for px in (x - 1, x):
+                    if 0 <= px < self.width and 0 <= py < self.height:
+                        positions.add(py * self.width + px)
+
+        costs = self.costs
+        changed = []
+        for index in positions:
+            cost = self._cost(index)
+            if cost > costs[index]:
+                self._rebuild(bgMap)
+                return
+            if cost != costs[index]:
+                changed.append((index, cost))
+
+        distances = self.distances
+        seeds = []
+        for index, cost in changed:
+            costs[index] = cost
+            nearer = distances[index] + cost
+            for other in self.neighbours[index]:
+                if nearer < distances[other]:
+                    distances[other] = nearer
+                    seeds.append(other)
+        if seeds:
+            self._propagate(seeds)
+
+    def position(self, rect):
+        """
+        获取坦克所在的位置下标，坦克不在格子上时取最近的格子
+
+        参数:
+            rect: 坦克的矩形
+
+        返回:
+            int: 位置下标
+        """
+        x = min(max((rect.left - wall.BORDER + wall.TILE_SIZE // 2) // wall.TILE_SIZE, 0), self.width - 1)
+        y = min(max((rect.top - wall.BORDER + wall.TILE_SIZE // 2) // wall.TILE_SIZE, 0), self.height - 1)
+        return y * self.width + x
+
+    def direction(self, rect):
+        """
+        获取坦克朝基地前进的方向
+
+        参数:
+            rect: 坦克的矩形
+
+        返回:
+            tuple: 移动方向(dir_x, dir_y)，无法到达基地或已经在基地时返回None
+        """
+        index = self.position(rect)
+        distances = self.distances
+        costs = self.costs
+        if distances[index] in (0, INFINITY):
+            return None
+        # 前往相邻位置的总距离为该位置的距离加上进入它的代价
+        best = INFINITY
+        result = None
+        width = self.width
+        y, x = divmod(index, width)
+        for dx, dy in DIRECTIONS:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < width and 0 <= ny < self.height:
+                other = ny * width + nx
+                if costs[other] != INFINITY and distances[other] + costs[other] < best:
+                    best = distances[other] + costs[other]
+                    result = (dx, dy)
+        return result
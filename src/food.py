@@ -14,40 +14,49 @@
 
 import pygame
 import random
-import os
-
-# 获取项目根目录
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-IMAGE_DIR = os.path.join(BASE_DIR, 'image')
+import assets
 
 class Food(pygame.sprite.Sprite):
     """
     食物/道具类
     继承自pygame的Sprite类，用于处理游戏中的各种道具
     """
-    def __init__(self):
+    def __init__(self, rng=None):
         """
         初始化道具对象
-        加载所有道具图片，随机选择一种道具类型
+        获取所有道具图片，随机选择一种道具类型
+        
+        参数:
+            rng: 随机数生成器，默认使用全局的random模块
         """
         pygame.sprite.Sprite.__init__(self)
         
-        # 加载所有道具图片
-        self.food_boom = pygame.image.load(os.path.join(IMAGE_DIR, 'food_boom.png')).convert_alpha()
-        self.food_clock = pygame.image.load(os.path.join(IMAGE_DIR, 'food_clock.png')).convert_alpha()
-        self.food_gun = pygame.image.load(os.path.join(IMAGE_DIR, 'food_gun.png')).convert_alpha()
-        self.food_iron = pygame.image.load(os.path.join(IMAGE_DIR, 'food_iron.png')).convert_alpha()
-        self.food_protect = pygame.image.load(os.path.join(IMAGE_DIR, 'food_protect.png')).convert_alpha()
-        self.food_star = pygame.image.load(os.path.join(IMAGE_DIR, 'food_star.png')).convert_alpha()
-        self.food_tank = pygame.image.load(os.path.join(IMAGE_DIR, 'food_tank.png')).convert_alpha()
+        # 获取所有道具图片（共享缓存）
+        self.food_boom = assets.load_image('food_boom')
+        self.food_clock = assets.load_image('food_clock')
+        self.food_gun = assets.load_image('food_gun')
+        self.food_iron = assets.load_image('food_iron')
+        self.food_protect = assets.load_image('food_protect')
+        self.food_star = assets.load_image('food_star')
+        self.food_tank = assets.load_image('food_tank')
+        self.reset(rng)
+
+    def reset(self, rng=None):
+        """
+        把道具重置为新创建时的状态，用于对象池复用道具对象
+
+        参数:
+            rng: 随机数生成器，默认使用全局的random模块
+        """
+        self.random = rng if rng is not None else random
 
         # 随机选择道具类型
-        self.kind = random.choice([1, 2, 3, 4, 5, 6, 7])
+        self.kind = self.random.choice([1, 2, 3, 4, 5, 6, 7])
         self._update_image()
         
         # 设置道具位置和状态
         self.rect = self.image.get_rect()
-        self.rect.left = self.rect.top = random.randint(100, 500)
+        self.rect.left = self.rect.top = self.random.randint(100, 500)
         self.life = False
         
     def _update_image(self):
@@ -69,13 +78,33 @@ class Food(pygame.sprite.Sprite):
         elif self.kind == 7:
             self.image = self.food_tank
         
+    def get_state(self):
+        """
+        获取道具的状态，用于保存和恢复游戏
+        
+        返回:
+            tuple: (kind, left, top, life)
+        """
+        return (self.kind, self.rect.left, self.rect.top, self.life)
+        
+    def set_state(self, state):
+        """
+        恢复get_state()返回的道具状态
+        
+        参数:
+            state: 道具状态
+        """
+        self.kind, self.rect.left, self.rect.top, life = state
+        self.life = bool(life)
+        self._update_image()
+        
     def change(self):
         """
         改变道具类型和位置
         随机选择新的道具类型，更新图片，并随机设置新的位置
         """
-        self.kind = random.choice([1, 2, 3, 4, 5, 6, 7])
+        self.kind = self.random.choice([1, 2, 3, 4, 5, 6, 7])
         self._update_image()
-        self.rect.left = self.rect.top = random.randint(100, 500)
+        self.rect.left = self.rect.top = self.random.randint(100, 500)
         self.life = True
 
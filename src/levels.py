@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+关卡模块
+从maps目录加载文本格式的地图文件，每个字符对应一个格子：
+    .  空地    B  砖块    I  铁块
+    W  河流    S  冰面    T  树林
+以#开头的行是注释，所有行的长度必须相同
+
+文本地图第一次加载时编译为二进制缓存（地图目录下的__mapcache__/名称.bin）：
+文件头记录源文件的修改时间、大小和SHA-256，之后是格子类型表。
+加载时用mmap映射缓存文件，修改时间和大小都没变时直接使用；
+修改时间变了但内容的哈希没变时只更新文件头，否则重新编译
+同一进程内再次加载时，源文件没有变化就直接复用已读出的格子表
+
+名为arena宽x高（例如arena200x200）的关卡不对应地图文件，
+而是把默认关卡平铺成指定大小的大地图，用于测试大地图的性能
+"""
+
+import os
+import re
+import mmap
+import struct
+import hashlib
+import assets
+import wall
+
+MAP_DIR = os.path.join(assets.BASE_DIR, 'maps')
+# 二进制缓存所在的子目录名，位于地图文件所在的目录中
+CACHE_DIRNAME = '__mapcache__'
+
+# 默认关卡
+DEFAULT_LEVEL = 'level1'
+
+# 平铺生成的大地图的关卡名
+ARENA_NAME = re.compile(r'^arena(\d+)x(\d+)$')
+
+# 地图字符对应的格子类型
+TILE_CHARS = {
+    '.': wall.EMPTY,
+    'B': wall.BRICK,
+    'I': wall.IRON,
+    'W': wall.RIVER,
+    'S': wall.ICE,
+    'T': wall.TREE,
+}
+
+# 缓存文件头：魔数、版本、宽、高、源文件修改时间（纳秒）、源文件大小、源文件SHA-256
+CACHE_HEADER = struct.Struct('<4sHHHqq32s')
+CACHE_MAGIC = b'TWMP'
+CACHE_VERSION = 1
+
+# 本进程已加载的地图，键为源文件路径，值为(修改时间, 大小, 宽, 高, 格子表)
+_loaded = {}
+
+def map_path(name):
+    """
+    获取关卡名对应的地图文件路径
+
+    参数:
+        name: 关卡名（maps目录中不含扩展名的文件名），或地图文件路径
+
+    返回:
+        str: 地图文件路径
+    """
+    if os.sep in name or name.endswith('.txt'):
+        return name
+    return os.path.join(MAP_DIR, name + '.txt')
+
+def parse(text, path='<string>'):
+    """
+    解析文本格式的地图
+
+    参数:
+        text: 地图文本
+        path: 文件路径，用于错误信息
+
+    返回:
+        tuple: (宽, 高, 格子表bytes)
+    """
+    rows = []
+    width = None
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.rstrip()
+        if not line or line.startswith('#'):
+            continue
+        if width is None:
+            width = len(line)
+        elif len(line) != width:
+            raise ValueError('%s:%d: 行的长度为%d，应为%d' % (path, number, len(line), width))
+        try:
+            rows.append(bytes(TILE_CHARS[char] for char in line))
+        except KeyError as e:
+            raise ValueError('%s:%d: 未知的地图字符%r' % (path, number, e.args[0]))
+    if not rows:
+        raise ValueError('%s: 地图为空' % path)
+    return width, len(rows), b''.join(rows)
+
+def _write_cache(cache_path, stat, digest, width, height, grid):
+    """
+    写入二进制缓存
+    先写入临时文件再替换，避免其他进程读到写了一半的缓存
+    """
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    temp_path = '%s.%d.tmp' % (cache_path, os.getpid())
+    with open(temp_path, 'wb') as f:
+        f.write(CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, width, height,
+                                  stat.st_mtime_ns, stat.st_size, digest))
+        f.write(grid)
+    os.replace(temp_path, cache_path)
+
+def _read_cache(cache_path, stat, source):
+    """
+    用mmap读取二进制缓存
+
+    参数:
+        cache_path: 缓存文件路径
+        stat: 源文件的os.stat()结果
+        source: 读取源文件内容的函数，修改时间不一致时用来比较哈希
+
+    返回:
+        tuple: (宽, 高, 格子表bytes)，缓存不存在或已失效时返回None
+    """
+    try:
+        f = open(cache_path, 'rb')
+    except OSError:
+        return None
+    with f:
+        if os.fstat(f.fileno()).st_size < CACHE_HEADER.size:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic, version, width, height, mtime, size, digest = CACHE_HEADER.unpack_from(data)
+            if magic != CACHE_MAGIC or version != CACHE_VERSION \
+                    or len(data) != CACHE_HEADER.size + width * height:
+                return None
+            stale = mtime != stat.st_mtime_ns or size != stat.st_size
+            if stale and (size != stat.st_size or hashlib.sha256(source()).digest() != digest):
+                return None
+            grid = data[CACHE_HEADER.size:]
+    if stale:
+        # 只是修改时间变了（例如重新检出），内容不变时更新文件头即可
+        try:
+            with open(cache_path, 'r+b') as f:
+                f.write(CACHE_HEADER.pack(magic, version, width, height, stat.st_mtime_ns, stat.st_size, digest))
+        except OSError:
+            pass  # 缓存目录只读时下次仍然通过哈希确认内容没有变化
+    return width, height, grid
+
+def load_grid(name=DEFAULT_LEVEL):
+    """
+    加载关卡的格子表
+    优先使用本进程已加载的结果，其次使用二进制缓存，都失效时解析文本并重新生成缓存
+
+    参数:
+        name: 关卡名或地图文件路径
+
+    返回:
+        tuple: (宽, 高, 格子表bytes)
+    """
+    match = ARENA_NAME.match(name)
+    if match:
+        return arena(int(match.group(1)), int(match.group(2)))
+    path = map_path(name)
+    stat = os.stat(path)
+    loaded = _loaded.get(path)
+    if loaded is not None and loaded[:2] == (stat.st_mtime_ns, stat.st_size):
+        return loaded[2:]
+
+    content = []
+    def source():
+        if not content:
+            with open(path, 'rb') as f:
+                content.append(f.read())
+        return content[0]
+
+    directory, filename = os.path.split(path)
+    cache_path = os.path.join(directory, CACHE_DIRNAME, os.path.splitext(filename)[0] + '.bin')
+    result = _read_cache(cache_path, stat, source)
+    if result is None:
+        data = source()
+        result = parse(data.decode('utf-8'), path)
+        try:
+            _write_cache(cache_path, stat, hashlib.sha256(data).digest(), *result)
+        except OSError:
+            pass  # 缓存只用于加速，目录不可写时直接使用解析结果
+    _loaded[path] = (stat.st_mtime_ns, stat.st_size) + result
+    return result
+
+def arena(width, height, pattern=DEFAULT_LEVEL):
+    """
+    把关卡平铺成指定大小的地图
+    平铺后清空基地、我方坦克和敌方坦克出生位置所在的格子，并在基地周围放上砖墙
+
+    参数:
+        width: 地图宽度（格子数）
+        height: 地图高度（格子数）
+        pattern: 用于平铺的关卡
+
+    返回:
+        tuple: (宽, 高, 格子表bytes)
+    """
+    key = ('arena', width, height, pattern)
+    loaded = _loaded.get(key)
+    if loaded is not None:
+        return loaded
+    if width < 8 or height < 4:
+        raise ValueError('地图太小: %d x %d' % (width, height))
+    pattern_width, pattern_height, pattern_grid = load_grid(pattern)
+    rows = [pattern_grid[y * pattern_width:(y + 1) * pattern_width] for y in range(pattern_height)]
+    repeat = width // pattern_width + 1
+    grid = bytearray(b''.join((rows[y % pattern_height] * repeat)[:width] for y in range(height)))
+
+    bgMap = wall.Map(width, height, grid)
+    home_x, home_y = bgMap.home
+    clear = [(home_x, home_y, 2, 2)]
+    for number in (1, 2):
+        x, y = bgMap.player_start(number)
+        clear.append(((x - wall.BORDER) // wall.TILE_SIZE, (y - wall.BORDER) // wall.TILE_SIZE, 2, 2))
+    for index in range(3):
+        x, y = bgMap.enemy_start(index)
+        clear.append(((x - wall.BORDER) // wall.TILE_SIZE, (y - wall.BORDER) // wall.TILE_SIZE, 2, 2))
+    for left, top, w, h in clear:
+        for y in range(top, top + h):
+            grid[y * width + left:y * width + left + w] = bytes(w)
+    for x, y in bgMap.home_wall():
+        grid[y * width + x] = wall.BRICK
+    result = _loaded[key] = (width, height, bytes(grid))
+    return result
+
+def load_map(name=DEFAULT_LEVEL):
+    """
+    按关卡创建地图对象
+
+    参数:
+        name: 关卡名或地图文件路径
+
+    返回:
+        wall.Map: 新的地图对象
+    """
+    width, height, grid = load_grid(name)
+    return wall.Map(width, height, grid)
+
+def clear():
+    """
+    清空本进程内已加载的地图
+    """
+    _loaded.clear()
@@ -10,22 +10,8 @@
 """
 
 import pygame
+import assets
 import bulletClass
-import os
-
-# 获取项目根目录
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
-# 定义资源目录
-IMAGE_DIR = os.path.join(BASE_DIR, 'image')
-
-# 坦克图片路径
-tank_T1_0 = os.path.join(IMAGE_DIR, 'tank_T1_0.png')
-tank_T1_1 = os.path.join(IMAGE_DIR, 'tank_T1_1.png')
-tank_T1_2 = os.path.join(IMAGE_DIR, 'tank_T1_2.png')
-tank_T2_0 = os.path.join(IMAGE_DIR, 'tank_T2_0.png')
-tank_T2_1 = os.path.join(IMAGE_DIR, 'tank_T2_1.png')
-tank_T2_2 = os.path.join(IMAGE_DIR, 'tank_T2_2.png')
 
 class MyTank(pygame.sprite.Sprite):
     """
@@ -45,22 +31,21 @@ class MyTank(pygame.sprite.Sprite):
         self.life = True  # 坦克是否存活
         self.level = 0    # 坦克等级
         
-        # 根据玩家编号加载对应的坦克图片
+        # 根据玩家编号获取对应的坦克动画帧表（共享缓存）
         if playerNumber == 1:
-            self.tank_L0_image = pygame.image.load(tank_T1_0).convert_alpha()
-            self.tank_L1_image = pygame.image.load(tank_T1_1).convert_alpha()
-            self.tank_L2_image = pygame.image.load(tank_T1_2).convert_alpha()
+            self.tank_L0_frames = assets.load_frames('tank_T1_0')
+            self.tank_L1_frames = assets.load_frames('tank_T1_1')
+            self.tank_L2_frames = assets.load_frames('tank_T1_2')
         if playerNumber == 2:
-            self.tank_L0_image = pygame.image.load(tank_T2_0).convert_alpha()
-            self.tank_L1_image = pygame.image.load(tank_T2_1).convert_alpha()
-            self.tank_L2_image = pygame.image.load(tank_T2_2).convert_alpha()
+            self.tank_L0_frames = assets.load_frames('tank_T2_0')
+            self.tank_L1_frames = assets.load_frames('tank_T2_1')
+            self.tank_L2_frames = assets.load_frames('tank_T2_2')
         
-        # 设置初始坦克图片
-        self.tank = self.tank_L0_image
+        # 设置初始坦克帧表
+        self.tank = self.tank_L0_frames
         
-        # 设置坦克移动图片
-        self.tank_R0 = self.tank.subsurface((0, 0),(48, 48))
-        self.tank_R1 = self.tank.subsurface((48, 0),(48, 48))
+        # 设置坦克移动图片（初始向上）
+        self.direction = 0
         self.rect = self.tank_R0.get_rect()
         
         # 设置坦克初始位置
@@ -76,6 +61,42 @@ class MyTank(pygame.sprite.Sprite):
         self.bulletNotCooling = True  # 子弹冷却状态
         self.bullet = bulletClass.Bullet()  # 创建子弹对象
     
+    @property
+    def tank_R0(self):
+        """
+        当前方向的第一帧坦克图片
+        """
+        return self.tank[self.direction][0]
+
+    @property
+    def tank_R1(self):
+        """
+        当前方向的第二帧坦克图片
+        """
+        return self.tank[self.direction][1]
+
+    def get_state(self):
+        """
+        获取坦克的状态，用于保存和恢复游戏
+        
+        返回:
+            tuple: (left, top, level, direction, dir_x, dir_y, speed, life, bulletNotCooling)
+        """
+        return (self.rect.left, self.rect.top, self.level, self.direction,
+                self.dir_x, self.dir_y, self.speed, self.life, self.bulletNotCooling)
+    
+    def set_state(self, state):
+        """
+        恢复get_state()返回的坦克状态，坦克帧表由等级决定
+        
+        参数:
+            state: 坦克状态
+        """
+        (self.rect.left, self.rect.top, self.level, self.direction,
+         self.dir_x, self.dir_y, self.speed, self.life, bulletNotCooling) = state
+        self.bulletNotCooling = bool(bulletNotCooling)
+        self.tank = (self.tank_L0_frames, self.tank_L1_frames, self.tank_L2_frames)[min(self.level, 2)]
+    
     def shoot(self):
         """
         发射子弹
@@ -118,13 +139,13 @@ class MyTank(pygame.sprite.Sprite):
         if self.level < 2:
             self.level += 1
         if self.level == 0:
-            self.tank = self.tank_L0_image
+            self.tank = self.tank_L0_frames
         if self.level == 1:
-            self.tank = self.tank_L1_image
+            self.tank = self.tank_L1_frames
         if self.level == 2:
-            self.tank = self.tank_L2_image
+            self.tank = self.tank_L2_frames
         if self.level == 3:
-            self.tank = self.tank_L2_image
+            self.tank = self.tank_L2_frames
             
     def levelDown(self):
         """
@@ -134,130 +155,118 @@ class MyTank(pygame.sprite.Sprite):
         if self.level > 0:
             self.level -= 1
         if self.level == 0:
-            self.tank = self.tank_L0_image
+            self.tank = self.tank_L0_frames
             self.bullet.speed = 6
             self.bullet.strong = False
         if self.level == 1:
-            self.tank = self.tank_L1_image
+            self.tank = self.tank_L1_frames
         if self.level == 2:
-            self.tank = self.tank_L2_image
+            self.tank = self.tank_L2_frames
         
-    def moveUp(self, tankGroup, brickGroup, ironGroup):
+    def moveUp(self, tankGroup, bgMap):
         """
         向上移动坦克
         
         参数:
-            tankGroup: 坦克组
-            brickGroup: 砖块组
-            ironGroup: 铁块组
+            tankGroup: 坦克组（spatial.SpatialGroup），检测时排除自身
+            bgMap: 地图对象
             
         返回:
             bool: 是否发生碰撞
         """
         self.rect = self.rect.move(self.speed * 0, self.speed * -1)
-        self.tank_R0 = self.tank.subsurface((0, 0),(48, 48))
-        self.tank_R1 = self.tank.subsurface((48, 0),(48, 48))
+        self.direction = 0
         self.dir_x, self.dir_y = 0, -1
         
         # 检查碰撞
-        if self.rect.top < 3:  # 上边界
+        if self.rect.top < bgMap.rect.top:  # 上边界
             self.rect = self.rect.move(self.speed * 0, self.speed * 1)
             return True
-        if pygame.sprite.spritecollide(self, brickGroup, False, None) \
-            or pygame.sprite.spritecollide(self, ironGroup, False, None):  # 与砖块或铁块碰撞
+        if bgMap.collide(self.rect):  # 与砖块或铁块碰撞
             self.rect = self.rect.move(self.speed * 0, self.speed * 1)
             return True
-        if pygame.sprite.spritecollide(self, tankGroup, False, None):  # 与其他坦克碰撞
+        if tankGroup.collide(self.rect, self):  # 与其他坦克碰撞
             self.rect = self.rect.move(self.speed * 0, self.speed * 1)
             return True
         return False
 
-    def moveDown(self, tankGroup, brickGroup, ironGroup):
+    def moveDown(self, tankGroup, bgMap):
         """
         向下移动坦克
         
         参数:
-            tankGroup: 坦克组
-            brickGroup: 砖块组
-            ironGroup: 铁块组
+            tankGroup: 坦克组（spatial.SpatialGroup），检测时排除自身
+            bgMap: 地图对象
             
         返回:
             bool: 是否发生碰撞
         """
         self.rect = self.rect.move(self.speed * 0, self.speed * 1)
-        self.tank_R0 = self.tank.subsurface((0, 48),(48, 48))
-        self.tank_R1 = self.tank.subsurface((48, 48),(48, 48))
+        self.direction = 1
         self.dir_x, self.dir_y = 0, 1
         
         # 检查碰撞
-        if self.rect.bottom > 630 - 3:  # 下边界
+        if self.rect.bottom > bgMap.rect.bottom:  # 下边界
             self.rect = self.rect.move(self.speed * 0, self.speed * -1)
             return True
-        if pygame.sprite.spritecollide(self, brickGroup, False, None) \
-            or pygame.sprite.spritecollide(self, ironGroup, False, None):  # 与砖块或铁块碰撞
+        if bgMap.collide(self.rect):  # 与砖块或铁块碰撞
             self.rect = self.rect.move(self.speed * 0, self.speed * -1)
             return True
-        if pygame.sprite.spritecollide(self, tankGroup, False, None):  # 与其他坦克碰撞
+        if tankGroup.collide(self.rect, self):  # 与其他坦克碰撞
             self.rect = self.rect.move(self.speed * 0, self.speed * -1)
             return True
         return False
 
-    def moveLeft(self, tankGroup, brickGroup, ironGroup):
+    def moveLeft(self, tankGroup, bgMap):
         """
         向左移动坦克
         
         参数:
-            tankGroup: 坦克组
-            brickGroup: 砖块组
-            ironGroup: 铁块组
+            tankGroup: 坦克组（spatial.SpatialGroup），检测时排除自身
+            bgMap: 地图对象
             
         返回:
             bool: 是否发生碰撞
         """
         self.rect = self.rect.move(self.speed * -1, self.speed * 0)
-        self.tank_R0 = self.tank.subsurface((0, 96),(48, 48))
-        self.tank_R1 = self.tank.subsurface((48, 96),(48, 48))
+        self.direction = 2
         self.dir_x, self.dir_y = -1, 0
         
         # 检查碰撞
-        if self.rect.left < 3:  # 左边界
+        if self.rect.left < bgMap.rect.left:  # 左边界
             self.rect = self.rect.move(self.speed * 1, self.speed * 0)
             return True
-        if pygame.sprite.spritecollide(self, brickGroup, False, None) \
-            or pygame.sprite.spritecollide(self, ironGroup, False, None):  # 与砖块或铁块碰撞
+        if bgMap.collide(self.rect):  # 与砖块或铁块碰撞
             self.rect = self.rect.move(self.speed * 1, self.speed * 0)
             return True
-        if pygame.sprite.spritecollide(self, tankGroup, False, None):  # 与其他坦克碰撞
+        if tankGroup.collide(self.rect, self):  # 与其他坦克碰撞
             self.rect = self.rect.move(self.speed * 1, self.speed * 0)
             return True
         return False
 
-    def moveRight(self, tankGroup, brickGroup, ironGroup):
+    def moveRight(self, tankGroup, bgMap):
         """
         向右移动坦克
         
         参数:
-            tankGroup: 坦克组
-            brickGroup: 砖块组
-            ironGroup: 铁块组
+            tankGroup: 坦克组（spatial.SpatialGroup），检测时排除自身
+            bgMap: 地图对象
             
         返回:
             bool: 是否发生碰撞
         """
         self.rect = self.rect.move(self.speed * 1, self.speed * 0)
-        self.tank_R0 = self.tank.subsurface((0, 144),(48, 48))
-        self.tank_R1 = self.tank.subsurface((48, 144),(48, 48))
+        self.direction = 3
         self.dir_x, self.dir_y = 1, 0
         
         # 检查碰撞
-        if self.rect.right > 630 - 3:  # 右边界
+        if self.rect.right > bgMap.rect.right:  # 右边界
             self.rect = self.rect.move(self.speed * -1, self.speed * 0)
             return True
-        if pygame.sprite.spritecollide(self, brickGroup, False, None) \
-            or pygame.sprite.spritecollide(self, ironGroup, False, None):  # 与砖块或铁块碰撞
+        if bgMap.collide(self.rect):  # 与砖块或铁块碰撞
             self.rect = self.rect.move(self.speed * -1, self.speed * 0)
             return True
-        if pygame.sprite.spritecollide(self, tankGroup, False, None):  # 与其他坦克碰撞
+        if tankGroup.collide(self.rect, self):  # 与其他坦克碰撞
             self.rect = self.rect.move(self.speed * -1, self.speed * 0)
             return True
         return False
\ No newline at end of file
@@ -0,0 +1,800 @@
+# -*- coding: utf-8 -*-
+"""
+联网对战模块
+服务器运行无界面的游戏世界并负责全部模拟，客户端只发送输入位掩码并显示服务器发来的状态
+
+协议（TCP，小端）:
+    每条消息是消息头（消息长度、消息类型）加消息内容
+    HELLO     客户端 -> 服务器  魔数、版本
+    WELCOME   服务器 -> 客户端  分配的玩家编号、玩家人数、帧率、地图格子数、关卡名
+    INPUT     客户端 -> 服务器  已收到的最新快照编号、一号玩家格式的输入位掩码
+    SNAPSHOT  服务器 -> 客户端  快照编号、基准快照编号、标志、增量数据
+
+每帧服务器只发送当前状态与该客户端最近确认的状态之间的差异：
+变化的标量字段、被打掉的砖块、移动的坦克、新出现和消失的子弹等，
+客户端没有确认过任何状态或确认的状态已经太旧时，相对空状态发送完整快照
+增量数据由变长整数组成，较大时用zlib压缩
+
+用法:
+    python netplay.py serve --players 2            启动服务器，等待两个客户端连接后开始
+    python netplay.py join --host 127.0.0.1        连接服务器并显示游戏（WASD/方向键移动，J/小键盘0射击）
+    python netplay.py loopback --clients 2         在本机运行服务器和随机操作的客户端，
+                                                   检查客户端还原的状态并输出带宽统计
+"""
+
+import sys
+import zlib
+import time
+import random
+import struct
+import asyncio
+import argparse
+import collections
+import world
+import levels
+import batch
+
+MAGIC = b'TWNP'
+VERSION = 1
+DEFAULT_PORT = 15630
+
+# 消息头：消息内容的长度、消息类型
+FRAME = struct.Struct('<IB')
+MSG_HELLO = 1
+MSG_WELCOME = 2
+MSG_INPUT = 3
+MSG_SNAPSHOT = 4
+# 消息内容的长度上限，超过时视为协议错误
+MAX_MESSAGE = 1 << 20
+
+HELLO = struct.Struct('<4sH')
+# 玩家编号、玩家人数、帧率、地图格子数，之后是关卡名（1字节长度 + UTF-8）
+WELCOME = struct.Struct('<BBHI')
+# 已收到的最新快照编号（-1表示还没有收到）、输入位掩码
+INPUT = struct.Struct('<iI')
+# 快照编号、基准快照编号（-1表示相对空状态）、标志
+SNAPSHOT = struct.Struct('<IiB')
+FLAG_ZLIB = 1
+
+# 增量数据超过这个长度时尝试压缩
+COMPRESS_MIN = 96
+# 服务器保留最近多少帧的状态作为增量的基准
+HISTORY = 120
+# 客户端的发送缓冲区超过这个字节数时跳过本帧，下一帧发送累积的增量
+MAX_BUFFERED = 64 * 1024
+
+# 状态元组的字段数
+TANK_FIELDS = 9     # myTank.MyTank.get_state()
+ENEMY_FIELDS = 14   # enemyTank.EnemyTank.get_state()
+BULLET_FIELDS = 7   # bulletClass.Bullet.get_state()
+
+# 客户端总是按一号玩家的位掩码发送输入，服务器转换为该客户端控制的玩家
+P1_BITS = world.P1_UP | world.P1_DOWN | world.P1_LEFT | world.P1_RIGHT | world.P1_FIRE
+P1_COMMANDS = world.CMD_P1_LEVEL_UP | world.CMD_P1_LEVEL_DOWN | world.CMD_P1_LEVEL_MAX | world.CMD_P1_SPEED
+P2_BITS = P1_BITS << 5
+P2_COMMANDS = P1_COMMANDS << 6
+HOME_COMMANDS = world.CMD_BRICK_HOME | world.CMD_IRON_HOME
+COMMAND_BITS = P1_COMMANDS | P2_COMMANDS | HOME_COMMANDS
+
+def player_inputs(player, inputs):
+    """
+    把客户端发来的一号玩家格式的输入转换为指定玩家的输入
+
+    参数:
+        player: 玩家编号（1或2）
+        inputs: 一号玩家格式的输入位掩码
+
+    返回:
+        int: World.step()使用的输入位掩码
+    """
+    if player == 1:
+        return inputs & (P1_BITS | P1_COMMANDS | HOME_COMMANDS)
+    return ((inputs & P1_BITS) << 5) | ((inputs & P1_COMMANDS) << 6) | (inputs & HOME_COMMANDS)
+
+def local_inputs(inputs):
+    """
+    把本机键盘的输入（两个玩家的按键都可以使用）合并为一号玩家格式的输入
+
+    参数:
+        inputs: main.read_inputs()和main.COMMAND_KEYS得到的输入位掩码
+
+    返回:
+        int: 一号玩家格式的输入位掩码
+    """
+    return (inputs & (P1_BITS | P1_COMMANDS | HOME_COMMANDS)) \
+        | ((inputs & P2_BITS) >> 5) | ((inputs & P2_COMMANDS) >> 6)
+
+def empty_state(grid_size):
+    """
+    空状态，完整快照相对它编码
+
+    参数:
+        grid_size: 地图格子数
+
+    返回:
+        tuple: (标量字段, 地图, 道具, 我方坦克, 敌方坦克, 无主子弹)
+    """
+    return ((0,) * len(world.STATE_FIELDS), bytes(grid_size), (0, 0, 0, 0), (), {}, ())
+
+def to_snapshot(state):
+    """
+    把联网状态转换为World.restore()可以使用的快照
+    敌方坦克按编号排序，即按出现的先后顺序
+
+    参数:
+        state: 联网状态
+
+    返回:
+        dict: 游戏状态，不包含随机数生成器的状态
+    """
+    fields, grid, prop, players, enemies, orphans = state
+    split = TANK_FIELDS
+    return {
+        'fields': fields,
+        'map': grid,
+        'prop': prop,
+        'players': [(player[:split], player[split:]) for player in players],
+        'enemies': [(enemies[key][:ENEMY_FIELDS], enemies[key][ENEMY_FIELDS:-1], enemies[key][-1])
+                    for key in sorted(enemies)],
+        'orphans': list(orphans),
+        'random': None,
+    }
+
+def _put(out, value):
+    """
+    写入一个变长整数（zigzag编码，每字节7位）
+    """
+    value = value * 2 if value >= 0 else -value * 2 - 1
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+class _Reader():
+    """
+    按顺序读取变长整数
+    """
+    def __init__(self, data):
+        self.data = data
+        self.position = 0
+
+    def get(self):
+        """
+        读取一个变长整数
+        """
+        data = self.data
+        value = shift = 0
+        while True:
+            byte = data[self.position]
+            self.position += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        return value >> 1 if not value & 1 else -(value >> 1) - 1
+
+def _put_tuple(out, old, new):
+    """
+    写入元组的变化：变化字段的位掩码，之后是这些字段的新值
+    """
+    mask = 0
+    values = []
+    for number, (before, after) in enumerate(zip(old, new)):
+        if before != after:
+            mask |= 1 << number
+            values.append(after)
+    _put(out, mask)
+    for value in values:
+        _put(out, value)
+
+def _get_tuple(reader, old):
+    """
+    读取_put_tuple()写入的变化，返回新的元组
+    """
+    result = list(old)
+    mask = reader.get()
+    number = 0
+    while mask:
+        if mask & 1:
+            result[number] = reader.get()
+        mask >>= 1
+        number += 1
+    return tuple(result)
+
+def encode_delta(base, state):
+    """
+    编码两个联网状态之间的差异
+
+    参数:
+        base: 客户端已有的状态
+        state: 当前状态
+
+    返回:
+        bytearray: 增量数据
+    """
+    base_fields, base_grid, base_prop, base_players, base_enemies, base_orphans = base
+    fields, grid, prop, players, enemies, orphans = state
+    out = bytearray()
+    _put_tuple(out, base_fields, fields)
+
+    # 地图：变化的格子，下标按与上一个的间隔写入
+    changed = [] if grid == base_grid else \
+        [index for index, (before, after) in enumerate(zip(base_grid, grid)) if before != after]
+    _put(out, len(changed))
+    previous = 0
+    for index in changed:
+        _put(out, index - previous)
+        _put(out, grid[index])
+        previous = index
+
+    _put_tuple(out, base_prop, prop)
+
+    _put(out, len(players))
+    for number, player in enumerate(players):
+        _put_tuple(out, base_players[number] if number < len(base_players) else (0,) * len(player), player)
+
+    # 敌方坦克：消失的编号，之后是新出现或变化的坦克
+    removed = sorted(key for key in base_enemies if key not in enemies)
+    _put(out, len(removed))
+    previous = 0
+    for key in removed:
+        _put(out, key - previous)
+        previous = key
+    updated = [key for key in sorted(enemies) if base_enemies.get(key) != enemies[key]]
+    _put(out, len(updated))
+    previous = 0
+    for key in updated:
+        _put(out, key - previous)
+        _put_tuple(out, base_enemies.get(key) or (0,) * len(enemies[key]), enemies[key])
+        previous = key
+
+    # 无主子弹很少出现，有变化时全部重新发送，0表示没有变化
+    if orphans == base_orphans:
+        _put(out, 0)
+    else:
+        _put(out, len(orphans) + 1)
+        for bullet in orphans:
+            _put_tuple(out, (0,) * BULLET_FIELDS, bullet)
+    return out
+
+def apply_delta(base, data):
+    """
+    把encode_delta()的增量数据应用到基准状态上
+
+    参数:
+        base: 基准状态
+        data: 增量数据
+
+    返回:
+        tuple: 新的联网状态
+    """
+    base_fields, base_grid, base_prop, base_players, base_enemies, base_orphans = base
+    reader = _Reader(data)
+    fields = _get_tuple(reader, base_fields)
+
+    count = reader.get()
+    grid = base_grid
+    if count:
+        grid = bytearray(base_grid)
+        index = 0
+        for number in range(count):
+            index += reader.get()
+            grid[index] = reader.get()
+        grid = bytes(grid)
+
+    prop = _get_tuple(reader, base_prop)
+
+    players = []
+    for number in range(reader.get()):
+        size = TANK_FIELDS + BULLET_FIELDS
+        players.append(_get_tuple(reader, base_players[number] if number < len(base_players) else (0,) * size))
+    players = tuple(players)
+
+    enemies = dict(base_enemies)
+    key = 0
+    for number in range(reader.get()):
+        key += reader.get()
+        del enemies[key]
+    key = 0
+    for number in range(reader.get()):
+        key += reader.get()
+        enemies[key] = _get_tuple(reader, enemies.get(key) or (0,) * (ENEMY_FIELDS + BULLET_FIELDS + 1))
+
+    count = reader.get()
+    orphans = base_orphans
+    if count:
+        orphans = tuple(_get_tuple(reader, (0,) * BULLET_FIELDS) for number in range(count - 1))
+    if reader.position != len(data):
+        raise ValueError('增量数据长度不正确')
+    return (fields, grid, prop, players, enemies, orphans)
+
+def _message(kind, payload):
+    """
+    生成一条消息
+    """
+    return FRAME.pack(len(payload), kind) + payload
+
+async def _read_message(reader):
+    """
+    读取一条消息
+
+    返回:
+        tuple: (消息类型, 消息内容)
+    """
+    length, kind = FRAME.unpack(await reader.readexactly(FRAME.size))
+    if length > MAX_MESSAGE:
+        raise ValueError('消息太长: %d字节' % length)
+    return kind, await reader.readexactly(length)
+
+class _Connection():
+    """
+    服务器端的一个客户端连接
+    """
+    def __init__(self, player, writer):
+        self.player = player
+        self.writer = writer
+        self.ack = -1         # 客户端确认的最新快照编号
+        self.held = 0         # 按住的按键
+        self.commands = 0     # 上一帧之后收到的单次命令，使用后清除
+        self.snapshots = 0    # 发送的快照数
+        self.full = 0         # 其中完整快照的数量
+        self.skipped = 0      # 发送缓冲区满时跳过的帧数
+        self.bytes = 0        # 发送的字节数（含消息头）
+        self.max_bytes = 0    # 单帧发送的最大字节数
+
+class Server():
+    """
+    游戏服务器
+    所有玩家连接后以固定帧率推进游戏世界，每帧把各客户端需要的增量发送出去
+    """
+    def __init__(self, players=2, seed=None, level=levels.DEFAULT_LEVEL, max_enemies=4,
+                 enemy_ai=world.ENEMY_AI_RANDOM, tick_rate=world.TICKS_PER_SECOND):
+        """
+        参数:
+            players: 玩家人数，也是开始前需要等待的客户端数
+            seed: 随机数种子，默认随机选择
+            level: 关卡名
+            max_enemies: 场上敌方坦克的数量上限
+            enemy_ai: 敌方坦克的移动方式（world.ENEMY_AI_*）
+            tick_rate: 每秒推进的帧数，为0时不限速
+        """
+        if seed is None:
+            seed = random.randrange(2 ** 31)
+        self.world = world.World(players, max_enemies, seed, fixed_timestep=True,
+                                 enemy_ai=enemy_ai, level=level)
+        self.tick_rate = tick_rate
+        self.clients = {}  # 玩家编号 -> _Connection
+        self.finished = []  # 已断开的连接，保留用于统计
+        self.handlers = set()  # 各连接的处理任务
+        self.history = collections.OrderedDict()  # 快照编号 -> 联网状态
+        self.seq = -1
+        self.keys = {}     # 敌方坦克对象 -> 编号
+        self.next_key = 1
+        self.port = None
+        self.listening = asyncio.Event()  # 开始监听后设置
+        self.ready = asyncio.Event()      # 所有玩家连接后设置
+        # 带宽统计
+        self.ticks = 0
+        self.total_bytes = 0
+        self.tick_bytes = collections.deque(maxlen=3600)  # 最近各帧发送给所有客户端的字节数
+        self.encode_time = 0.0
+
+    def capture(self):
+        """
+        获取当前的联网状态
+        敌方坦克用编号区分，坦克对象被对象池复用后得到新的编号
+
+        返回:
+            tuple: (标量字段, 地图, 道具, 我方坦克, 敌方坦克, 无主子弹)
+        """
+        gameWorld = self.world
+        keys = {}
+        enemies = {}
+        owned = set()
+        for each in gameWorld.allEnemyGroup:
+            key = self.keys.get(each)
+            if key is None:
+                key = self.next_key
+                self.next_key += 1
+            keys[each] = key
+            enemies[key] = tuple(map(int, each.get_state() + each.bullet.get_state())) \
+                + (int(gameWorld.enemyBulletGroup.has(each.bullet)),)
+            owned.add(each.bullet)
+        self.keys = keys
+        players = tuple(tuple(map(int, tank.get_state() + tank.bullet.get_state()))
+                        for tank in (gameWorld.myTank_T1, gameWorld.myTank_T2) if tank is not None)
+        orphans = tuple(sorted(tuple(map(int, each.get_state()))
+                               for each in gameWorld.enemyBulletGroup if each not in owned))
+        return (tuple(int(getattr(gameWorld, name)) for name in world.STATE_FIELDS),
+                gameWorld.bgMap.get_state(), tuple(map(int, gameWorld.prop.get_state())),
+                players, enemies, orphans)
+
+    async def serve(self, host='127.0.0.1', port=DEFAULT_PORT, ticks=None):
+        """
+        接受连接并运行游戏，直到推进了指定帧数或游戏结束后所有客户端断开
+
+        参数:
+            host: 监听地址
+            port: 监听端口，为0时由系统分配
+            ticks: 推进的帧数，默认一直运行
+        """
+        server = await asyncio.start_server(self._handle, host, port)
+        self.port = server.sockets[0].getsockname()[1]
+        self.listening.set()
+        async with server:
+            await self.ready.wait()
+            await self.run(ticks)
+        # 关闭连接后等待各连接的处理任务结束
+        for connection in list(self.clients.values()):
+            connection.writer.close()
+        await asyncio.gather(*self.handlers, return_exceptions=True)
+
+    async def run(self, ticks=None):
+        """
+        按帧率推进游戏世界
+
+        参数:
+            ticks: 推进的帧数，默认一直运行
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while ticks is None or self.ticks < ticks:
+            if not self.clients and self.world.game_over:
+                break
+            self.tick()
+            if self.tick_rate:
+                deadline += 1.0 / self.tick_rate
+                await asyncio.sleep(max(0.0, deadline - loop.time()))
+            else:
+                await asyncio.sleep(0)
+
+    def tick(self):
+        """
+        用各客户端的输入推进一帧，并向各客户端发送增量快照
+        """
+        inputs = 0
+        for connection in self.clients.values():
+            inputs |= player_inputs(connection.player, connection.held | connection.commands)
+            connection.commands = 0
+        if not self.world.game_over:
+            self.world.step(inputs)
+
+        self.seq += 1
+        state = self.capture()
+        self.history[self.seq] = state
+        while len(self.history) > HISTORY:
+            self.history.popitem(last=False)
+
+        start = time.perf_counter()
+        sent = 0
+        grid_size = len(state[1])
+        for connection in self.clients.values():
+            if connection.writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+                connection.skipped += 1
+                continue
+            base_seq = connection.ack if connection.ack in self.history else -1
+            if base_seq == -1:
+                base = empty_state(grid_size)
+                connection.full += 1
+            else:
+                base = self.history[base_seq]
+            data = encode_delta(base, state)
+            flags = 0
+            if len(data) >= COMPRESS_MIN:
+                compressed = zlib.compress(data)
+                if len(compressed) < len(data):
+                    data, flags = compressed, FLAG_ZLIB
+            message = _message(MSG_SNAPSHOT, SNAPSHOT.pack(self.seq, base_seq, flags) + bytes(data))
+            connection.writer.write(message)
+            connection.snapshots += 1
+            connection.bytes += len(message)
+            connection.max_bytes = max(connection.max_bytes, len(message))
+            sent += len(message)
+        self.encode_time += time.perf_counter() - start
+        self.ticks += 1
+        self.total_bytes += sent
+        self.tick_bytes.append(sent)
+
+    async def _handle(self, reader, writer):
+        """
+        处理一个客户端连接：握手、分配玩家，然后接收输入直到断开
+        """
+        connection = None
+        task = asyncio.current_task()
+        self.handlers.add(task)
+        try:
+            kind, payload = await _read_message(reader)
+            if kind != MSG_HELLO or len(payload) != HELLO.size or HELLO.unpack(payload) != (MAGIC, VERSION):
+                return
+            free = [player for player in range(1, self.world.players + 1) if player not in self.clients]
+            if not free:
+                return
+            connection = _Connection(free[0], writer)
+            self.clients[connection.player] = connection
+            level = self.world.level.encode('utf-8')
+            writer.write(_message(MSG_WELCOME, WELCOME.pack(connection.player, self.world.players,
+                                                            self.tick_rate, len(self.world.bgMap.grid))
+                                  + bytes((len(level),)) + level))
+            if len(self.clients) == self.world.players:
+                self.ready.set()
+            while True:
+                kind, payload = await _read_message(reader)
+                if kind != MSG_INPUT or len(payload) != INPUT.size:
+                    return
+                ack, inputs = INPUT.unpack(payload)
+                if connection.ack < ack <= self.seq:
+                    connection.ack = ack
+                connection.held = inputs & ~COMMAND_BITS
+                connection.commands |= inputs & COMMAND_BITS
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            if connection is not None and self.clients.get(connection.player) is connection:
+                del self.clients[connection.player]
+                self.finished.append(connection)
+            writer.close()
+            self.handlers.discard(task)
+
+    def format(self):
+        """
+        生成带宽统计
+
+        返回:
+            list: 多行文字
+        """
+        connections = sorted(list(self.clients.values()) + self.finished,
+                             key=lambda connection: connection.player)
+        ticks = max(self.ticks, 1)
+        values = sorted(self.tick_bytes)
+        rate = self.tick_rate or world.TICKS_PER_SECOND
+        lines = ['帧数: %d, 共发送%d字节, 平均每帧%.1f字节 (p95 %d, 最大%d), 按每秒%d帧约%.1fkbit/s, 编码平均每帧%.3fms' % (
+            self.ticks, self.total_bytes, self.total_bytes / ticks,
+            values[min(len(values) - 1, int(0.95 * len(values)))] if values else 0,
+            values[-1] if values else 0, rate, self.total_bytes / ticks * rate * 8 / 1000,
+            self.encode_time / ticks * 1000)]
+        for connection in connections:
+            lines.append('玩家%d: 快照%d个 (完整%d个, 跳过%d帧), %d字节, 平均每个快照%.1f字节, 最大%d字节' % (
+                connection.player, connection.snapshots, connection.full, connection.skipped,
+                connection.bytes, connection.bytes / max(connection.snapshots, 1), connection.max_bytes))
+        return lines
+
+class Client():
+    """
+    游戏客户端
+    保存服务器可能用作基准的状态，收到快照后还原出当前状态并确认
+    """
+    def __init__(self):
+        self.reader = self.writer = None
+        self.player = 0
+        self.players = 0
+        self.tick_rate = 0
+        self.level = None
+        self.states = {}  # 快照编号 -> 联网状态
+        self.seq = -1     # 最新快照的编号
+        self.state = None
+        self.bytes = 0    # 收到的快照字节数（含消息头）
+        self.snapshots = 0
+
+    async def connect(self, host='127.0.0.1', port=DEFAULT_PORT):
+        """
+        连接服务器并完成握手
+
+        参数:
+            host: 服务器地址
+            port: 服务器端口
+        """
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.writer.write(_message(MSG_HELLO, HELLO.pack(MAGIC, VERSION)))
+        kind, payload = await _read_message(self.reader)
+        if kind != MSG_WELCOME:
+            raise ValueError('服务器拒绝连接')
+        self.player, self.players, self.tick_rate, grid_size = WELCOME.unpack_from(payload)
+        length = payload[WELCOME.size]
+        self.level = payload[WELCOME.size + 1:WELCOME.size + 1 + length].decode('utf-8')
+        self.empty = empty_state(grid_size)
+
+    async def receive(self):
+        """
+        接收并应用一个快照
+
+        返回:
+            int: 快照编号，服务器断开时返回None
+        """
+        try:
+            kind, payload = await _read_message(self.reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return None
+        if kind != MSG_SNAPSHOT:
+            raise ValueError('未知的消息类型: %d' % kind)
+        seq, base, flags = SNAPSHOT.unpack_from(payload)
+        data = payload[SNAPSHOT.size:]
+        if flags & FLAG_ZLIB:
+            data = zlib.decompress(data)
+        if base == -1:
+            base_state = self.empty
+        elif base in self.states:
+            base_state = self.states[base]
+        else:
+            raise ValueError('缺少基准快照: %d' % base)
+        self.state = apply_delta(base_state, data)
+        self.seq = seq
+        # 服务器之后只会使用这次的基准或更新的快照
+        for old in [old for old in self.states if old < base]:
+            del self.states[old]
+        self.states[seq] = self.state
+        self.bytes += FRAME.size + len(payload)
+        self.snapshots += 1
+        return seq
+
+    def send_input(self, inputs):
+        """
+        发送输入并确认最新的快照
+
+        参数:
+            inputs: 一号玩家格式的输入位掩码
+        """
+        self.writer.write(_message(MSG_INPUT, INPUT.pack(self.seq, inputs)))
+
+    def close(self):
+        """
+        断开连接
+        """
+        if self.writer is not None:
+            self.writer.close()
+
+async def run_bot(client, seed, server=None):
+    """
+    随机操作的客户端，每收到一个快照发送一次输入
+    指定server时（同一进程中的服务器）检查还原的状态是否与服务器的状态相同
+
+    参数:
+        client: 已连接的客户端
+        seed: 随机操作的种子
+        server: 同一进程中的服务器
+
+    返回:
+        int: 与服务器状态不同的快照数
+    """
+    bot = batch.RandomBot(seed)
+    mismatches = 0
+    while True:
+        seq = await client.receive()
+        if seq is None:
+            break
+        if server is not None and server.history.get(seq, client.state) != client.state:
+            mismatches += 1
+        client.send_input(bot(None))
+    client.close()
+    return mismatches
+
+async def loopback(clients=2, ticks=600, seed=0, level=levels.DEFAULT_LEVEL, tick_rate=world.TICKS_PER_SECOND):
+    """
+    在本机运行服务器和随机操作的客户端
+
+    参数:
+        clients: 客户端数（1或2）
+        ticks: 推进的帧数
+        seed: 随机数种子
+        level: 关卡名
+        tick_rate: 每秒推进的帧数，为0时不限速
+
+    返回:
+        tuple: (服务器, 客户端列表, 各客户端与服务器状态不同的快照数)
+    """
+    server = Server(clients, seed, level, tick_rate=tick_rate)
+    serving = asyncio.ensure_future(server.serve('127.0.0.1', 0, ticks))
+    await server.listening.wait()
+    connected = []
+    for number in range(clients):
+        client = Client()
+        await client.connect('127.0.0.1', server.port)
+        connected.append(client)
+    mismatches = await asyncio.gather(*[run_bot(client, seed + number, server)
+                                        for number, client in enumerate(connected)])
+    await serving
+    return server, connected, mismatches
+
+async def play(host, port, dirty=False):
+    """
+    连接服务器并在窗口中显示游戏
+
+    参数:
+        host: 服务器地址
+        port: 服务器端口
+        dirty: 是否使用脏矩形刷新
+    """
+    import pygame
+    import renderer
+    import main as game
+    client = Client()
+    await client.connect(host, port)
+    pygame.display.init()
+    screen = pygame.display.set_mode((630, 630))
+    pygame.display.set_caption('坦克大战 - 玩家%d' % client.player)
+    displayWorld = world.World(client.players, level=client.level)
+    gameRenderer = renderer.Renderer(screen, dirty)
+
+    async def receive():
+        while await client.receive() is not None:
+            pass
+    receiving = asyncio.ensure_future(receive())
+    shown = -1
+    commands = 0
+    loop = asyncio.get_running_loop()
+    deadline = loop.time()
+    try:
+        while not receiving.done():
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return
+                if event.type == pygame.KEYDOWN:
+                    commands |= game.COMMAND_KEYS.get(event.key, 0)
+            client.send_input(local_inputs(commands | game.read_inputs(pygame.key.get_pressed())))
+            commands = 0
+            if client.seq != shown:
+                displayWorld.restore(to_snapshot(client.state))
+                shown = client.seq
+                gameRenderer.draw(displayWorld)
+                if displayWorld.game_over:
+                    gameRenderer.draw_game_over()
+                gameRenderer.present()
+            deadline += 1.0 / world.TICKS_PER_SECOND
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+    finally:
+        receiving.cancel()
+        client.close()
+        pygame.quit()
+
+def main(argv=None):
+    """
+    联网对战命令行入口
+
+    参数:
+        argv: 参数列表，默认使用sys.argv
+
+    返回:
+        int: 退出码，loopback发现状态不一致时为1
+    """
+    parser = argparse.ArgumentParser(description='坦克大战联网对战')
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help='启动服务器')
+    serve.add_argument('--host', default='127.0.0.1', help='监听地址')
+    serve.add_argument('--port', type=int, default=DEFAULT_PORT, help='监听端口')
+    serve.add_argument('--players', type=int, choices=(1, 2), default=2, help='玩家人数')
+    serve.add_argument('--seed', type=int, default=None, help='随机数种子')
+    serve.add_argument('--level', default=levels.DEFAULT_LEVEL, help='关卡名')
+    serve.add_argument('--ticks', type=int, default=None, help='推进的帧数，默认一直运行')
+    join = commands.add_parser('join', help='连接服务器并显示游戏')
+    join.add_argument('--host', default='127.0.0.1', help='服务器地址')
+    join.add_argument('--port', type=int, default=DEFAULT_PORT, help='服务器端口')
+    join.add_argument('--dirty', action='store_true', help='使用脏矩形刷新')
+    test = commands.add_parser('loopback', help='在本机运行服务器和随机操作的客户端')
+    test.add_argument('--clients', type=int, choices=(1, 2), default=2, help='客户端数')
+    test.add_argument('--ticks', type=int, default=600, help='推进的帧数')
+    test.add_argument('--seed', type=int, default=0, help='随机数种子')
+    test.add_argument('--level', default=levels.DEFAULT_LEVEL, help='关卡名')
+    test.add_argument('--rate', type=int, default=world.TICKS_PER_SECOND, help='每秒推进的帧数，为0时不限速')
+    args = parser.parse_args(argv)
+
+    if args.command == 'join':
+        asyncio.run(play(args.host, args.port, args.dirty))
+        return 0
+    world.init_headless()
+    if args.command == 'serve':
+        server = Server(args.players, args.seed, args.level)
+        print('等待%d个玩家连接 %s:%d' % (args.players, args.host, args.port))
+        try:
+            asyncio.run(server.serve(args.host, args.port, args.ticks))
+        except KeyboardInterrupt:
+            pass
+        print('\n'.join(server.format()))
+        return 0
+    server, clients, mismatches = asyncio.run(loopback(args.clients, args.ticks, args.seed, args.level, args.rate))
+    print('\n'.join(server.format()))
+    for client, count in zip(clients, mismatches):
+        print('客户端%d: 收到%d个快照, %d字节, 与服务器状态不同的快照%d个' % (
+            client.player, client.snapshots, client.bytes, count))
+    return 1 if any(mismatches) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+对象池模块
+回收不再使用的子弹、敌方坦克和道具对象，需要新对象时把回收的对象重置后交出，
+避免每次都重新创建精灵、子弹和查找图片
+
+放进池中的对象需要提供reset()方法，参数与构造函数相同，
+重置后的对象与用同样参数新创建的对象完全一致（包括对随机数生成器的调用）
+"""
+
+class Pool():
+    """
+    对象池类
+    acquire()优先复用池中的对象，池为空时才创建新对象；release()把对象放回池中
+    同时统计创建、复用的次数和同时使用的最大数量
+    """
+    def __init__(self, factory, name=None):
+        """
+        初始化对象池
+
+        参数:
+            factory: 创建新对象的类或函数
+            name: 对象池的名称，用于统计信息
+        """
+        self.factory = factory
+        self.name = name or factory.__name__
+        self.free = []          # 可以复用的对象
+        self.allocations = 0    # 创建的对象数
+        self.reuses = 0         # 复用的次数
+        self.releases = 0       # 放回的次数
+        self.in_use = 0         # 当前交出且没有放回的对象数
+        self.high_water = 0     # 同时交出的最大对象数
+
+    def acquire(self, *args, **kwargs):
+        """
+        获取一个对象
+
+        参数:
+            args, kwargs: 传给构造函数或reset()的参数
+
+        返回:
+            新创建或重置后的对象
+        """
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(*args, **kwargs)
+            self.reuses += 1
+        else:
+            obj = self.factory(*args, **kwargs)
+            self.allocations += 1
+        self.in_use += 1
+        if self.in_use > self.high_water:
+            self.high_water = self.in_use
+        return obj
+
+    def release(self, obj):
+        """
+        把不再使用的对象放回池中
+        调用者需要保证对象已经离开所有精灵组，并且不会再被使用
+
+        参数:
+            obj: acquire()获取的对象
+        """
+        self.free.append(obj)
+        self.releases += 1
+        self.in_use -= 1
+
+    def stats(self):
+        """
+        获取统计信息
+
+        返回:
+            dict: 创建数、复用数、放回数、使用中的数量、最大使用数量和池中的空闲对象数
+        """
+        return {
+            'allocations': self.allocations,
+            'reuses': self.reuses,
+            'releases': self.releases,
+            'in_use': self.in_use,
+            'high_water': self.high_water,
+            'free': len(self.free),
+        }
+
+    def format(self):
+        """
+        生成一行统计信息
+
+        返回:
+            str: 统计信息
+        """
+        return '%s: 创建%d, 复用%d, 使用中%d, 最多同时使用%d, 空闲%d' % (
+            self.name, self.allocations, self.reuses, self.in_use, self.high_water, len(self.free))
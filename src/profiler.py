@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+分阶段帧耗时统计模块
+把每一帧分成几个阶段计时：读取输入、我方坦克、敌方坦克、子弹碰撞、道具、绘制和刷新窗口，
+保留最近若干帧的耗时，计算p50/p95/p99，可以在画面上显示，也可以逐帧写入文件
+
+用法:
+    prof = Profiler(output='frames.csv')  # 扩展名为.jsonl时写入JSON lines
+    prof.begin()
+    ...读取输入...
+    prof.mark(PHASE_INPUT)
+    ...
+    prof.end()
+
+计时点只是一次perf_counter()和一次加法；没有创建Profiler时，
+World.step()在每个计时点只多一次属性判断
+"""
+
+import collections
+import json
+import time
+import pygame
+
+# 帧的各个阶段
+PHASE_INPUT   = 0  # 事件处理和读取键盘
+PHASE_PLAYERS = 1  # 定时事件、按键命令和我方坦克移动、射击
+PHASE_ENEMIES = 2  # 敌方坦克移动
+PHASE_BULLETS = 3  # 子弹移动和碰撞
+PHASE_FOOD    = 4  # 食物/道具
+PHASE_DRAW    = 5  # 绘制画面
+PHASE_FLIP    = 6  # 刷新到窗口
+PHASE_NAMES = ('input', 'players', 'enemies', 'bullets', 'food', 'draw', 'flip')
+
+# 画面上显示的统计每隔多少帧重新计算一次
+OVERLAY_INTERVAL = 30
+
+def percentile(values, fraction):
+    """
+    计算已排序数据的分位数（取最接近的排名，不插值）
+
+    参数:
+        values: 已排序的列表
+        fraction: 分位，例如0.95
+
+    返回:
+        float: 分位数，列表为空时返回0
+    """
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+class Profiler():
+    """
+    帧耗时统计类
+    begin()开始一帧，mark(phase)把距离上一个计时点的时间计入该阶段，end()结束一帧
+    同一阶段在一帧内可以多次计时，耗时累加
+    """
+    def __init__(self, window=300, output=None):
+        """
+        初始化统计
+
+        参数:
+            window: 计算分位数时使用的最近帧数
+            output: 逐帧写入耗时的文件路径，扩展名为.jsonl时写入JSON lines，否则写入CSV
+        """
+        self.window = window
+        self.samples = [collections.deque(maxlen=window) for name in PHASE_NAMES]
+        self.totals = collections.deque(maxlen=window)
+        self.current = [0.0] * len(PHASE_NAMES)  # 本帧各阶段的耗时（秒）
+        self.last = 0.0  # 上一个计时点
+        self.frames = 0
+        self.overlay = False  # 是否在画面上显示
+        self.font = None
+        self.lines = []       # 画面上显示的文字，每OVERLAY_INTERVAL帧更新一次
+        self.output = None
+        self.jsonl = False
+        if output:
+            self.output = open(output, 'w')
+            self.jsonl = output.endswith('.jsonl')
+            if not self.jsonl:
+                self.output.write('frame,total_ms,%s\n' % ','.join(name + '_ms' for name in PHASE_NAMES))
+
+    def begin(self):
+        """
+        开始一帧
+        """
+        self.last = time.perf_counter()
+        current = self.current
+        for phase in range(len(current)):
+            current[phase] = 0.0
+
+    def mark(self, phase):
+        """
+        结束一个阶段，把距离上一个计时点的时间计入该阶段
+
+        参数:
+            phase: 阶段（PHASE_*）
+        """
+        now = time.perf_counter()
+        self.current[phase] += now - self.last
+        self.last = now
+
+    def skip(self):
+        """
+        跳过距离上一个计时点的时间，不计入任何阶段（例如等待下一帧的时间）
+        """
+        self.last = time.perf_counter()
+
+    def end(self):
+        """
+        结束一帧，记录各阶段的耗时并写入文件
+        """
+        total = sum(self.current)
+        for samples, value in zip(self.samples, self.current):
+            samples.append(value)
+        self.totals.append(total)
+        self.frames += 1
+        if self.output is not None:
+            if self.jsonl:
+                record = {'frame': self.frames, 'total_ms': round(total * 1000, 4)}
+                for name, value in zip(PHASE_NAMES, self.current):
+                    record[name + '_ms'] = round(value * 1000, 4)
+                self.output.write(json.dumps(record) + '\n')
+            else:
+                self.output.write('%d,%.4f,%s\n' % (self.frames, total * 1000,
+                                  ','.join('%.4f' % (value * 1000) for value in self.current)))
+        if self.overlay and self.frames % OVERLAY_INTERVAL == 1:
+            self.lines = self.format()
+
+    def percentiles(self, phase=None):
+        """
+        计算最近若干帧的p50/p95/p99
+
+        参数:
+            phase: 阶段（PHASE_*），默认为整帧
+
+        返回:
+            tuple: (p50, p95, p99)，单位毫秒
+        """
+        values = sorted(self.totals if phase is None else self.samples[phase])
+        return tuple(percentile(values, fraction) * 1000 for fraction in (0.5, 0.95, 0.99))
+
+    def format(self):
+        """
+        生成统计表
+
+        返回:
+            list: 每个阶段一行文字
+        """
+        lines = ['%-8s %7s %7s %7s' % ('ms', 'p50', 'p95', 'p99')]
+        for phase, name in enumerate(PHASE_NAMES):
+            lines.append('%-8s %7.2f %7.2f %7.2f' % ((name,) + self.percentiles(phase)))
+        lines.append('%-8s %7.2f %7.2f %7.2f' % (('total',) + self.percentiles()))
+        return lines
+
+    def toggle_overlay(self):
+        """
+        切换画面上的统计显示
+        """
+        self.overlay = not self.overlay
+        self.lines = self.format() if self.overlay else []
+
+    def draw_overlay(self, screen):
+        """
+        在画面左上角绘制统计表
+
+        参数:
+            screen: 绘制目标
+
+        返回:
+            pygame.Rect: 绘制的区域，没有显示时返回None
+        """
+        if not self.overlay:
+            return None
+        if self.font is None:
+            self.font = pygame.font.Font(None, 20)
+        line_height = self.font.get_linesize()
+        rect = pygame.Rect(0, 0, 230, line_height * len(self.lines) + 8)
+        screen.fill((0, 0, 0), rect)
+        for number, line in enumerate(self.lines):
+            screen.blit(self.font.render(line, True, (255, 255, 0)), (6, 4 + number * line_height))
+        return rect
+
+    def close(self):
+        """
+        关闭输出文件
+        """
+        if self.output is not None:
+            self.output.close()
+            self.output = None
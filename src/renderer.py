@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+渲染模块
+负责将游戏世界（world.World）的状态绘制到屏幕上
+支持两种刷新方式：
+1. 整屏刷新：每帧重绘整个画面并调用pygame.display.flip()
+2. 脏矩形刷新：只擦除和重绘发生变化的区域，并调用pygame.display.update(rects)
+比窗口大的地图按卷轴方式绘制：视野跟随玩家一，地形按块合成，只绘制视野内的块和精灵，
+视野每帧都可能移动，因此总是整屏刷新
+"""
+
+import pygame
+import assets
+import terrain
+import wall
+
+class Renderer():
+    """
+    渲染器类
+    获取绘制所需的图片，并按帧绘制游戏画面
+    """
+    def __init__(self, screen, dirty=False):
+        """
+        初始化渲染器
+
+        参数:
+            screen: 游戏窗口的Surface
+            dirty: 是否使用脏矩形刷新
+        """
+        self.screen = screen
+        self.dirty = dirty
+
+        # 获取图片资源
+        self.background_image = assets.load_image('background')
+        self.home_image = assets.load_image('home')
+        self.home_destroyed_image = assets.load_image('home_destroyed')
+        appearance_image = assets.load_image('appear')
+        self.gameover_image = assets.load_image('gameover')
+
+        # 预先合成的地形图层
+        self.terrain = terrain.TerrainLayer(self.background_image)
+        # 大地图的分块地形，第一次绘制大地图时创建
+        self.chunked = None
+        # 视野左上角在地图上的像素坐标，地图不比窗口大时总是(0, 0)
+        self.camera = (0, 0)
+        self.view = self.screen.get_rect()
+
+        # 敌方坦克出现动画
+        self.appearance = []
+        self.appearance.append(appearance_image.subsurface((0, 0), (48, 48)))
+        self.appearance.append(appearance_image.subsurface((48, 0), (48, 48)))
+        self.appearance.append(appearance_image.subsurface((96, 0), (48, 48)))
+
+        # 脏矩形刷新的状态
+        self.rects = []            # 本帧需要更新到窗口的区域
+        self.sprite_rects = []     # 本帧绘制的精灵区域
+        self.last_rects = []       # 上一帧绘制的精灵区域，下一帧需要擦除
+        self.full_redraw = True    # 本帧是否需要更新整个窗口
+        self.home_state = None     # 上一帧绘制的基地状态
+        self.game_over_shown = False  # 游戏结束图片是否已经绘制
+
+        # 刷新统计
+        self.pixels = 0        # 上一帧推送到窗口的像素数
+        self.total_pixels = 0  # 累计推送的像素数
+        self.frames = 0        # 累计刷新的帧数
+
+    def _blit(self, image, pos):
+        """
+        绘制一个精灵并记录其区域
+
+        参数:
+            image: 精灵图片
+            pos: 绘制位置（地图上的坐标）
+        """
+        x, y = pos[0] - self.camera[0], pos[1] - self.camera[1]
+        if self.camera != (0, 0) and not self.view.colliderect((x, y), image.get_size()):
+            return  # 视野外的精灵
+        self.sprite_rects.append(self.screen.blit(image, (x, y)))
+
+    def _follow(self, world):
+        """
+        移动视野，使玩家一位于视野中央，视野不超出地图
+
+        参数:
+            world: 游戏世界对象
+        """
+        width, height = self.screen.get_size()
+        map_width, map_height = world.bgMap.size
+        center = world.myTank_T1.rect.center
+        self.camera = (min(max(center[0] - width // 2, 0), max(map_width - width, 0)),
+                       min(max(center[1] - height // 2, 0), max(map_height - height, 0)))
+
+    def _draw_scrolling(self, world):
+        """
+        按卷轴方式绘制大地图
+
+        参数:
+            world: 游戏世界对象
+        """
+        screen = self.screen
+        if self.chunked is None:
+            self.chunked = terrain.ChunkedTerrain(self.background_image)
+        self._follow(world)
+        camera = self.camera
+        self.chunked.draw(screen, world.bgMap, camera)
+        home = world.bgMap.home_rect
+        screen.blit(self.home_image if world.homeSurvive else self.home_destroyed_image,
+                    (home.left - camera[0], home.top - camera[1]))
+        self.home_state = world.homeSurvive
+        self._draw_sprites(world)
+        self.chunked.draw_overlay(screen, camera)
+        self.full_redraw = True
+        self.last_rects = []
+        self.sprite_rects = []
+
+    def scrolling(self, world):
+        """
+        地图是否比窗口大，需要按卷轴方式绘制
+
+        参数:
+            world: 游戏世界对象
+
+        返回:
+            bool: 是否按卷轴方式绘制
+        """
+        width, height = world.bgMap.size
+        return width > self.screen.get_width() or height > self.screen.get_height()
+
+    def draw(self, world):
+        """
+        绘制一帧游戏画面
+
+        参数:
+            world: 游戏世界对象
+        """
+        screen = self.screen
+        self.game_over_shown = False
+        if self.scrolling(world):
+            self._draw_scrolling(world)
+            return
+        self.camera = (0, 0)
+
+        # 绘制背景、砖块和铁块
+        if self.dirty and not self.full_redraw and world.bgMap is self.terrain.bgMap:
+            # 擦除上一帧的精灵，并重绘发生变化的格子
+            surface = self.terrain.surface
+            for rect in self.last_rects:
+                screen.blit(surface, rect, rect)
+            self.rects.extend(self.last_rects)
+            for index in self.terrain.update(world.bgMap):
+                y, x = divmod(index, world.bgMap.width)
+                rect = pygame.Rect(wall.BORDER + x * wall.TILE_SIZE, wall.BORDER + y * wall.TILE_SIZE,
+                                   wall.TILE_SIZE, wall.TILE_SIZE)
+                screen.blit(surface, rect, rect)
+                self.rects.append(rect)
+        else:
+            self.terrain.draw(screen, world.bgMap)
+            self.full_redraw = True
+
+        # 绘制基地
+        # 基地被擦除的部分已经包含在上面的区域中，只有状态改变时才需要额外更新
+        # 被摧毁的基地图片带有半透明像素，每帧先擦除原来的图片，避免反复叠加
+        home_pos = world.bgMap.home_rect.topleft
+        if self.dirty:
+            rect = pygame.Rect(home_pos, self.home_image.get_size())
+            screen.blit(self.terrain.surface, rect, rect)
+        if world.homeSurvive:
+            rect = screen.blit(self.home_image, home_pos)
+        else:
+            rect = screen.blit(self.home_destroyed_image, home_pos)
+        if world.homeSurvive != self.home_state:
+            self.home_state = world.homeSurvive
+            self.rects.append(rect)
+
+        self._draw_sprites(world)
+
+        # 树林覆盖在精灵上方，脏矩形刷新时只需重绘本帧更新的区域
+        if self.dirty and not self.full_redraw:
+            self.terrain.draw_overlay(screen, self.rects + self.sprite_rects)
+        else:
+            self.terrain.draw_overlay(screen)
+
+        # 本帧绘制的精灵在下一帧擦除
+        self.rects.extend(self.sprite_rects)
+        self.last_rects = self.sprite_rects
+        self.sprite_rects = []
+
+    def _draw_sprites(self, world):
+        """
+        绘制坦克、出现动画、子弹和食物/道具
+
+        参数:
+            world: 游戏世界对象
+        """
+        # 绘制我方坦克1
+        tank = world.myTank_T1
+        if world.switch_R1_R2_image and world.running_T1:
+            self._blit(tank.tank_R0, (tank.rect.left, tank.rect.top))
+        else:
+            self._blit(tank.tank_R1, (tank.rect.left, tank.rect.top))
+
+        # 绘制我方坦克2（仅在双人模式下）
+        tank = world.myTank_T2
+        if tank is not None:
+            if world.switch_R1_R2_image and world.running_T2:
+                self._blit(tank.tank_R0, (tank.rect.left, tank.rect.top))
+            else:
+                self._blit(tank.tank_R1, (tank.rect.left, tank.rect.top))
+
+        # 绘制敌方坦克
+        for each in world.allEnemyGroup:
+            if each.flash:
+                if world.switch_R1_R2_image:
+                    self._blit(each.tank_R0, (each.rect.left, each.rect.top))
+                else:
+                    self._blit(each.tank_R1, (each.rect.left, each.rect.top))
+            elif each.times > 0:
+                # 播放出现动画，每10帧切换一张图片
+                image = self.appearance[2 - (each.times - 1) // 10 % 3]
+                self._blit(image, each.rect.topleft)
+
+        # 绘制我方子弹
+        if world.myTank_T1.bullet.life:
+            self._blit(world.myTank_T1.bullet.bullet, world.myTank_T1.bullet.rect)
+        if world.myTank_T2 is not None and world.myTank_T2.bullet.life:
+            self._blit(world.myTank_T2.bullet.bullet, world.myTank_T2.bullet.rect)
+
+        # 绘制敌人子弹
+        for each in world.allEnemyGroup:
+            if each.flash and each.bullet.life:
+                self._blit(each.bullet.bullet, each.bullet.rect)
+
+        # 绘制食物/道具
+        if world.prop.life:
+            self._blit(world.prop.image, world.prop.rect)
+
+    def draw_game_over(self):
+        """
+        绘制游戏结束图片
+        游戏结束后画面不再变化，脏矩形刷新时只在第一次绘制时更新该区域
+        """
+        if self.game_over_shown:
+            return
+        width, height = self.screen.get_size()
+        rect = self.screen.blit(self.gameover_image, (width/2 - self.gameover_image.get_width()/2, height/2 - self.gameover_image.get_height()/2))
+        self.rects.append(rect)
+        self.game_over_shown = self.dirty
+
+    def add_rect(self, rect):
+        """
+        把在画面上额外绘制的区域加入本帧的更新区域（例如统计信息）
+
+        参数:
+            rect: 绘制的区域
+        """
+        self.rects.append(rect)
+
+    def present(self):
+        """
+        将本帧画面刷新到窗口
+        脏矩形刷新只更新记录下来的区域，整屏刷新或需要全部重绘时调用flip()
+
+        返回:
+            int: 本帧推送到窗口的像素数
+        """
+        if self.dirty and not self.full_redraw:
+            screen_rect = self.screen.get_rect()
+            self.pixels = 0
+            for rect in self.rects:
+                rect = rect.clip(screen_rect)
+                self.pixels += rect.width * rect.height
+            pygame.display.update(self.rects)
+        else:
+            pygame.display.flip()
+            self.pixels = self.screen.get_width() * self.screen.get_height()
+            self.full_redraw = False
+        self.rects = []
+        self.total_pixels += self.pixels
+        self.frames += 1
+        return self.pixels
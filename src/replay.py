@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+录像模块
+把一局游戏记录为随机数种子加上每帧的输入位掩码，回放时按录像重新模拟
+录像文件格式：
+1. 文件头：魔数、版本、玩家人数、敌方坦克移动方式、敌方坦克上限、随机数种子，
+   之后是关卡名（1字节长度 + UTF-8），版本1的录像没有关卡名，使用默认关卡
+2. zlib压缩的记录流，每帧一条记录：输入位掩码（32位）+ 该帧结束后的状态校验和（32位）
+   重置游戏用输入值RESET表示，校验和为重置后的状态
+
+只有固定步长模式（World(seed=..., fixed_timestep=True)）的游戏可以录制
+
+用法:
+    python replay.py 录像文件              以最快速度回放并检查校验和
+    python replay.py 录像文件 --seek 帧号  跳转到指定记录
+    python replay.py 录像文件 --watch      按每秒60帧显示回放画面
+"""
+
+import sys
+import struct
+import zlib
+import array
+import time
+import argparse
+import world
+import levels
+
+# 文件头：魔数、版本、玩家人数、敌方坦克移动方式（world.ENEMY_AI_*）、敌方坦克上限、随机数种子
+HEADER = struct.Struct('<4sHBBHq')
+MAGIC = b'TWRP'
+VERSION = 2
+
+# 每帧记录：输入位掩码、校验和
+RECORD = struct.Struct('<II')
+
+# 表示重置游戏的输入值
+RESET = 0xFFFFFFFF
+
+class Recorder():
+    """
+    录像写入类
+    记录先写入缓冲区，缓冲区满后压缩并写入文件
+    """
+    def __init__(self, path, gameWorld, buffer_size=65536):
+        """
+        创建录像文件并写入文件头
+
+        参数:
+            path: 录像文件路径
+            gameWorld: 要录制的游戏世界，必须处于固定步长模式
+            buffer_size: 缓冲区大小（字节）
+        """
+        if gameWorld.seed is None or not gameWorld.fixed_timestep:
+            raise ValueError('只能录制指定了随机数种子的固定步长游戏')
+        self.file = open(path, 'wb')
+        level = gameWorld.level.encode('utf-8')
+        if len(level) > 255:
+            raise ValueError('关卡名太长: %s' % gameWorld.level)
+        self.file.write(HEADER.pack(MAGIC, VERSION, gameWorld.players, gameWorld.enemy_ai,
+                                    gameWorld.max_enemies, gameWorld.seed))
+        self.file.write(bytes((len(level),)) + level)
+        self.compressor = zlib.compressobj(9)
+        self.buffer = bytearray()
+        self.buffer_size = buffer_size
+        self.records = 0
+
+    def record(self, inputs, checksum):
+        """
+        记录一帧
+
+        参数:
+            inputs: 本帧传给World.step()的输入位掩码
+            checksum: 本帧结束后的World.checksum()
+        """
+        self.buffer += RECORD.pack(inputs, checksum)
+        self.records += 1
+        if len(self.buffer) >= self.buffer_size:
+            self._flush()
+
+    def record_reset(self, checksum):
+        """
+        记录一次游戏重置
+
+        参数:
+            checksum: 重置后的World.checksum()
+        """
+        self.record(RESET, checksum)
+
+    def _flush(self):
+        """
+        压缩缓冲区中的记录并写入文件
+        """
+        self.file.write(self.compressor.compress(bytes(self.buffer)))
+        self.buffer.clear()
+
+    def close(self):
+        """
+        写入剩余的记录并关闭文件
+        """
+        if self.file.closed:
+            return
+        self._flush()
+        self.file.write(self.compressor.flush())
+        self.file.close()
+
+class Replay():
+    """
+    录像回放类
+    按记录重新模拟游戏，回放过程中每隔一定帧数保存一个关键帧，
+    跳转时从最近的关键帧开始重新模拟
+    """
+    def __init__(self, path, keyframe_interval=600):
+        """
+        读取录像文件
+
+        参数:
+            path: 录像文件路径
+            keyframe_interval: 关键帧间隔（记录数）
+        """
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, self.players, self.enemy_ai, self.max_enemies, self.seed = HEADER.unpack_from(data)
+        if magic != MAGIC or version not in (1, VERSION):
+            raise ValueError('不是有效的录像文件: %s' % path)
+        offset = HEADER.size
+        self.level = levels.DEFAULT_LEVEL
+        if version >= 2:
+            length = data[offset]
+            self.level = data[offset + 1:offset + 1 + length].decode('utf-8')
+            offset += 1 + length
+        records = array.array('I', zlib.decompress(data[offset:]))
+        if sys.byteorder == 'big':
+            records.byteswap()
+        self.inputs = records[0::2]
+        self.checksums = records[1::2]
+        self.keyframe_interval = keyframe_interval
+        self.keyframes = {}      # 记录下标 -> 该记录之前的游戏状态
+        self.diverged_at = None  # 第一条校验和不一致的记录
+        self.world = None
+        self.position = 0        # 下一条要执行的记录
+        self.rewind()
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def rewind(self):
+        """
+        回到录像开头
+        """
+        self.world = world.World(self.players, self.max_enemies, self.seed, fixed_timestep=True,
+                                 enemy_ai=self.enemy_ai, level=self.level)
+        self.position = 0
+        self.keyframes[0] = self.world.snapshot()
+
+    def step(self):
+        """
+        执行一条记录并检查校验和
+
+        返回:
+            list: 本帧产生的音效提示
+        """
+        inputs = self.inputs[self.position]
+        if inputs == RESET:
+            self.world.reset()
+            sounds = []
+        else:
+            sounds = self.world.step(inputs)
+        if self.world.checksum() != self.checksums[self.position] and self.diverged_at is None:
+            self.diverged_at = self.position
+        self.position += 1
+        if self.position % self.keyframe_interval == 0 and self.position not in self.keyframes:
+            self.keyframes[self.position] = self.world.snapshot()
+        return sounds
+
+    def play(self, until=None):
+        """
+        以最快速度回放到指定记录
+
+        参数:
+            until: 停止的位置，默认回放到结尾
+
+        返回:
+            int: 第一条校验和不一致的记录，全部一致时返回None
+        """
+        if until is None:
+            until = len(self.inputs)
+        while self.position < until:
+            self.step()
+        return self.diverged_at
+
+    def seek(self, position):
+        """
+        跳转到指定记录之前的状态
+        从不超过目标位置的最近关键帧恢复，再重新模拟剩余的记录
+
+        参数:
+            position: 目标位置（0到len(self)）
+        """
+        position = max(0, min(position, len(self.inputs)))
+        keyframe = max(index for index in self.keyframes if index <= position)
+        if not (keyframe <= self.position <= position):
+            self.world.restore(self.keyframes[keyframe])
+            self.position = keyframe
+        self.play(position)
+
+def watch(replay):
+    """
+    按每秒60帧显示回放画面
+
+    参数:
+        replay: 录像回放对象
+    """
+    import pygame
+    import renderer
+    pygame.init()
+    screen = pygame.display.set_mode((630, 630))
+    pygame.display.set_caption("坦克大战 - 回放")
+    gameRenderer = renderer.Renderer(screen)
+    clock = pygame.time.Clock()
+    while replay.position < len(replay):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return
+        replay.step()
+        gameRenderer.draw(replay.world)
+        if replay.world.game_over:
+            gameRenderer.draw_game_over()
+        gameRenderer.present()
+        clock.tick(60)
+
+def main(argv=None):
+    """
+    录像回放命令行入口
+
+    参数:
+        argv: 参数列表，默认使用sys.argv
+    """
+    parser = argparse.ArgumentParser(description='坦克大战录像回放')
+    parser.add_argument('path', help='录像文件')
+    parser.add_argument('--seek', type=int, default=None, help='跳转到指定记录')
+    parser.add_argument('--watch', action='store_true', help='按每秒60帧显示回放画面')
+    args = parser.parse_args(argv)
+
+    if args.watch:
+        replay = Replay(args.path)
+        watch(replay)
+        return
+    world.init_headless()
+    replay = Replay(args.path)
+    start = time.perf_counter()
+    if args.seek is not None:
+        replay.seek(args.seek)
+    else:
+        replay.play()
+    elapsed = time.perf_counter() - start
+    gameWorld = replay.world
+    print('记录数: %d, 位置: %d, 用时: %.3f秒 (%.0f帧/秒)' % (
+        len(replay), replay.position, elapsed, replay.position / elapsed if elapsed else 0))
+    print('帧数: %d, 剩余敌人: %d, 基地存活: %s' % (
+        gameWorld.tick, gameWorld.enemyNumber, gameWorld.homeSurvive))
+    if replay.diverged_at is None:
+        print('校验和全部一致')
+    else:
+        print('第%d条记录的校验和不一致，回放结果与录制时不同' % replay.diverged_at)
+
+if __name__ == "__main__":
+    main()
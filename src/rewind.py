@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+回溯模块
+每帧把游戏世界的完整状态保存到预先分配的环形缓冲区中，按住回溯键时逐帧恢复到之前的状态
+
+每个快照由三部分组成：
+    记录        标量字段、道具、坦克和子弹，按savegame模块的固定格式打包，约一两百字节
+    地图        格子占用表，地图没有变化时与上一个快照共用同一个字节串
+    随机数状态  有种子时保存，没有变化时与上一个快照共用
+
+用法:
+    python rewind.py --benchmark   运行固定种子的游戏，测量每帧保存的耗时和缓冲区大小，
+                                   并检查逐帧回溯后的状态与当时相同
+"""
+
+import time
+import argparse
+import world
+import levels
+import savegame
+
+# 默认保存的帧数（按每秒60帧为30秒）
+DEFAULT_CAPACITY = 30 * world.TICKS_PER_SECOND
+
+class RewindBuffer():
+    """
+    回溯缓冲类
+    缓冲区满后新的快照覆盖最早的快照
+    """
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        """
+        参数:
+            capacity: 最多保存的快照数
+        """
+        self.capacity = capacity
+        self.records = [None] * capacity  # 打包的记录
+        self.grids = [None] * capacity    # 地图，相邻的快照可能引用同一个字节串
+        self.randoms = [None] * capacity  # 打包的随机数状态，同上，没有种子时为None
+        self.head = 0    # 下一个快照写入的位置
+        self.count = 0   # 已保存的快照数
+        # 上一个快照的地图和随机数状态，没有变化时直接共用
+        self.last_map = None
+        self.last_cursor = -1
+        self.last_grid = None
+        self.last_random = None
+        self.last_random_data = None
+        # 统计
+        self.pushes = 0
+        self.push_time = 0.0
+        self.max_push_time = 0.0
+
+    def __len__(self):
+        return self.count
+
+    def push(self, gameWorld):
+        """
+        保存游戏世界的当前状态，在每帧World.step()之后调用
+
+        参数:
+            gameWorld: 游戏世界对象
+        """
+        start = time.perf_counter()
+        bgMap = gameWorld.bgMap
+        state = gameWorld.snapshot(include_map=False)
+        # 地图只在发生变化（或重置游戏换了新地图）后复制一次
+        if bgMap is not self.last_map or bgMap.change_count != self.last_cursor:
+            self.last_map = bgMap
+            self.last_cursor = bgMap.change_count
+            self.last_grid = bgMap.get_state()
+        random_state = state['random']
+        if random_state is not None and random_state != self.last_random:
+            self.last_random = random_state
+            self.last_random_data = savegame.pack_random(random_state)
+        head = self.head
+        self.records[head] = b''.join(savegame.pack_body(state, include_map=False))
+        self.grids[head] = self.last_grid
+        self.randoms[head] = self.last_random_data if random_state is not None else None
+        self.head = (head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        elapsed = time.perf_counter() - start
+        self.pushes += 1
+        self.push_time += elapsed
+        self.max_push_time = max(self.max_push_time, elapsed)
+
+    def state(self, age=0):
+        """
+        取出一个快照
+
+        参数:
+            age: 0为最新的快照，1为它之前的一个，依此类推
+
+        返回:
+            dict: 可以传给World.restore()的游戏状态
+        """
+        if not 0 <= age < self.count:
+            raise IndexError('没有这么早的快照: %d' % age)
+        index = (self.head - 1 - age) % self.capacity
+        state, offset = savegame.unpack_body(self.records[index], include_map=False)
+        state['map'] = self.grids[index]
+        if self.randoms[index] is not None:
+            state['random'], offset = savegame.unpack_random(self.randoms[index])
+        return state
+
+    def step_back(self, gameWorld):
+        """
+        回溯一帧：丢弃最新的快照，把游戏世界恢复到它之前的快照
+        至少保留一个快照，回溯结束后从恢复的状态继续游戏
+
+        参数:
+            gameWorld: 游戏世界对象
+
+        返回:
+            bool: 是否回溯了，没有更早的快照时返回False
+        """
+        if self.count < 2:
+            return False
+        self.head = (self.head - 1) % self.capacity
+        self.records[self.head] = self.grids[self.head] = self.randoms[self.head] = None
+        self.count -= 1
+        gameWorld.restore(self.state())
+        return True
+
+    def clear(self):
+        """
+        清空缓冲区
+        """
+        for index in range(self.capacity):
+            self.records[index] = self.grids[index] = self.randoms[index] = None
+        self.head = self.count = 0
+        self.last_map = self.last_grid = self.last_random = self.last_random_data = None
+        self.last_cursor = -1
+
+    def memory(self):
+        """
+        计算缓冲区中的快照占用的字节数，共用的地图和随机数状态只计算一次
+
+        返回:
+            tuple: (总字节数, 不同的地图数, 不同的随机数状态数)
+        """
+        total = 0
+        shared = {}
+        for column in (self.grids, self.randoms):
+            for data in column:
+                if data is not None:
+                    shared[id(data)] = len(data)
+        total = sum(len(data) for data in self.records if data is not None) + sum(shared.values())
+        grids = len({id(data) for data in self.grids if data is not None})
+        randoms = len({id(data) for data in self.randoms if data is not None})
+        return total, grids, randoms
+
+    def format(self):
+        """
+        生成统计
+
+        返回:
+            str: 快照数、占用的内存和每帧保存的耗时
+        """
+        total, grids, randoms = self.memory()
+        return '回溯: %d个快照 (%.1f秒), %.1fKB (地图%d份, 随机数状态%d份), 每帧保存平均%.3fms, 最大%.3fms' % (
+            self.count, self.count / world.TICKS_PER_SECOND, total / 1024, grids, randoms,
+            self.push_time / max(self.pushes, 1) * 1000, self.max_push_time * 1000)
+
+def benchmark(ticks=3600, seed=0, level=levels.DEFAULT_LEVEL, capacity=DEFAULT_CAPACITY):
+    """
+    运行固定种子的游戏（游戏结束后重新开始），每帧保存快照，
+    然后逐帧回溯，检查每一帧恢复后的状态与当时的校验和相同
+
+    参数:
+        ticks: 运行的帧数
+        seed: 随机数种子
+        level: 关卡名
+        capacity: 缓冲区的快照数
+
+    返回:
+        dict: 回溯前的缓冲区统计、回溯的帧数和每帧回溯的平均时间（毫秒）
+    """
+    import batch
+    world.init_headless()
+    gameWorld = world.World(2, 4, seed, fixed_timestep=True, level=level)
+    bot = batch.RandomBot(seed, 2)
+    buffer = RewindBuffer(capacity)
+    checksums = []
+    for tick in range(ticks):
+        if gameWorld.game_over:
+            gameWorld.reset(seed + tick)
+        gameWorld.step(bot(gameWorld))
+        buffer.push(gameWorld)
+        checksums.append(gameWorld.checksum())
+    stats = buffer.format()
+    start = time.perf_counter()
+    steps = 0
+    while buffer.step_back(gameWorld):
+        steps += 1
+        if gameWorld.checksum() != checksums[-1 - steps]:
+            raise AssertionError('回溯%d帧后的状态不同' % steps)
+    return {
+        'stats': stats,
+        'steps': steps,
+        'step_back_ms': (time.perf_counter() - start) / max(steps, 1) * 1000,
+    }
+
+def main(argv=None):
+    """
+    回溯命令行入口
+
+    参数:
+        argv: 参数列表，默认使用sys.argv
+    """
+    parser = argparse.ArgumentParser(description='坦克大战回溯缓冲测试')
+    parser.add_argument('--benchmark', action='store_true', help='测量每帧保存的耗时和缓冲区大小')
+    parser.add_argument('--ticks', type=int, default=3600, help='运行的帧数')
+    parser.add_argument('--seed', type=int, default=0, help='随机数种子')
+    parser.add_argument('--level', default=levels.DEFAULT_LEVEL, help='关卡名')
+    args = parser.parse_args(argv)
+    if args.benchmark:
+        result = benchmark(args.ticks, args.seed, args.level)
+        print(result['stats'])
+        print('回溯%d帧, 平均每帧%.3fms' % (result['steps'], result['step_back_ms']))
+    else:
+        parser.print_help()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""
+存档模块
+把一局游戏的完整状态保存为固定格式的二进制文件，读取后用World.restore()重新创建精灵组
+
+文件格式（小端）:
+    文件头    魔数、版本、玩家人数、敌方坦克移动方式、敌方坦克上限、是否有种子、随机数种子、
+              关卡名（1字节长度 + UTF-8）
+    数量      地图格子数、我方坦克数、敌方坦克数、无主子弹数
+    标量字段  World.STATE_FIELDS，固定格式的一条记录
+    道具      一条记录
+    地图      每个格子1字节
+    我方坦克  每辆坦克一条记录（坦克和它的子弹）
+    敌方坦克  每辆坦克一条记录（坦克、它的子弹、子弹是否在敌方子弹组中）
+    无主子弹  每颗子弹一条记录
+    随机数    有种子时保存随机数生成器的状态（Mersenne Twister的625个32位整数）
+
+每种记录的格式固定，只保存数字，不序列化任何精灵对象
+
+用法:
+    python savegame.py 存档文件      显示存档的内容
+    python savegame.py --benchmark   运行固定种子的游戏，测量保存和读取的时间
+"""
+
+import os
+import time
+import array
+import struct
+import argparse
+import world
+import levels
+
+MAGIC = b'TWSV'
+VERSION = 1
+
+# 魔数、版本、玩家人数、敌方坦克移动方式、敌方坦克上限、是否有种子、随机数种子
+HEADER = struct.Struct('<4sHBBH?q')
+# 地图格子数、我方坦克数、敌方坦克数、无主子弹数
+COUNTS = struct.Struct('<IBHH')
+# World.STATE_FIELDS: tick, enemyNumber, moving, movdir, moving2, movdir2, running_T1, running_T2,
+#                     delay, enemyCouldMove, switch_R1_R2_image, homeSurvive, game_over
+FIELDS = struct.Struct('<Iiiiii??i????')
+# 道具: kind, left, top, life
+PROP = struct.Struct('<Bii?')
+
+# 各记录的字段，与get_state()的顺序相同
+# 我方坦克: left, top, level, direction, dir_x, dir_y, speed, life, bulletNotCooling
+TANK_FORMAT = 'iibbbbhh?'
+# 敌方坦克: x, kind, isred, left, top, dir_x, dir_y, direction, speed, life, flash, times,
+#           bulletNotCooling, frames
+ENEMY_FORMAT = 'BB?iibbbhh?h?B'
+# 子弹: left, top, dir_x, dir_y, speed, life, strong
+BULLET_FORMAT = 'iibbh??'
+TANK_FIELDS = len(TANK_FORMAT)
+ENEMY_FIELDS = len(ENEMY_FORMAT)
+
+PLAYER = struct.Struct('<' + TANK_FORMAT + BULLET_FORMAT)
+ENEMY = struct.Struct('<' + ENEMY_FORMAT + BULLET_FORMAT + '?')
+BULLET = struct.Struct('<' + BULLET_FORMAT)
+
+# 随机数生成器状态的版本、是否有gauss_next、gauss_next，之后是625个32位整数
+RANDOM = struct.Struct('<B?d')
+RANDOM_WORDS = 625
+
+def pack_body(state, include_map=True):
+    """
+    把游戏状态中除随机数生成器以外的部分打包为记录
+
+    参数:
+        state: World.snapshot()返回的游戏状态
+        include_map: 是否包含地图，不包含时由调用者另外保存
+
+    返回:
+        list: 依次排列的各部分字节串
+    """
+    parts = [
+        COUNTS.pack(len(state['map']) if include_map else 0, len(state['players']), len(state['enemies']), len(state['orphans'])),
+        FIELDS.pack(*state['fields']),
+        PROP.pack(*state['prop']),
+    ]
+    if include_map:
+        parts.append(state['map'])
+    parts.extend(PLAYER.pack(*(tank + bullet)) for tank, bullet in state['players'])
+    parts.extend(ENEMY.pack(*(tank + bullet + (in_group,))) for tank, bullet, in_group in state['enemies'])
+    parts.extend(BULLET.pack(*bullet) for bullet in state['orphans'])
+    return parts
+
+def unpack_body(data, offset=0, include_map=True):
+    """
+    读取pack_body()打包的记录
+
+    参数:
+        data: 包含记录的字节串
+        offset: 记录开始的位置
+        include_map: 记录中是否包含地图，不包含时游戏状态中的地图为None
+
+    返回:
+        tuple: (游戏状态, 记录结束的位置)，游戏状态中的随机数生成器状态为None
+    """
+    view = memoryview(data)
+    grid_size, player_count, enemy_count, orphan_count = COUNTS.unpack_from(data, offset)
+    offset += COUNTS.size
+    fields = FIELDS.unpack_from(data, offset)
+    offset += FIELDS.size
+    prop = PROP.unpack_from(data, offset)
+    offset += PROP.size
+    grid = None
+    if include_map:
+        grid = bytes(view[offset:offset + grid_size])
+        offset += grid_size
+
+    def records(record, count):
+        nonlocal offset
+        end = offset + record.size * count
+        result = list(record.iter_unpack(view[offset:end]))
+        offset = end
+        return result
+
+    state = {
+        'fields': fields,
+        'map': grid,
+        'prop': prop,
+        'players': [(values[:TANK_FIELDS], values[TANK_FIELDS:]) for values in records(PLAYER, player_count)],
+        'enemies': [(values[:ENEMY_FIELDS], values[ENEMY_FIELDS:-1], values[-1])
+                    for values in records(ENEMY, enemy_count)],
+        'orphans': records(BULLET, orphan_count),
+        'random': None,
+    }
+    return state, offset
+
+def pack_random(random_state):
+    """
+    打包random.Random.getstate()返回的随机数生成器状态
+
+    参数:
+        random_state: 随机数生成器状态
+
+    返回:
+        bytes: 固定长度的记录
+    """
+    version, words, gauss_next = random_state
+    return RANDOM.pack(version, gauss_next is not None, gauss_next or 0.0) + array.array('I', words).tobytes()
+
+def unpack_random(data, offset=0):
+    """
+    读取pack_random()打包的随机数生成器状态
+
+    参数:
+        data: 包含记录的字节串
+        offset: 记录开始的位置
+
+    返回:
+        tuple: (随机数生成器状态, 记录结束的位置)
+    """
+    version, has_gauss, gauss_next = RANDOM.unpack_from(data, offset)
+    offset += RANDOM.size
+    words = array.array('I')
+    words.frombytes(memoryview(data)[offset:offset + RANDOM_WORDS * words.itemsize])
+    offset += RANDOM_WORDS * words.itemsize
+    return (version, tuple(words), gauss_next if has_gauss else None), offset
+
+def dumps(gameWorld):
+    """
+    把游戏世界的状态保存为字节串
+
+    参数:
+        gameWorld: 游戏世界对象
+
+    返回:
+        bytes: 存档数据
+    """
+    state = gameWorld.snapshot()
+    level = gameWorld.level.encode('utf-8')
+    if len(level) > 255:
+        raise ValueError('关卡名太长: %s' % gameWorld.level)
+    seed = gameWorld.seed
+    parts = [
+        HEADER.pack(MAGIC, VERSION, gameWorld.players, gameWorld.enemy_ai, gameWorld.max_enemies,
+                    seed is not None, seed or 0),
+        bytes((len(level),)), level,
+    ]
+    parts.extend(pack_body(state))
+    if state['random'] is not None:
+        parts.append(pack_random(state['random']))
+    return b''.join(parts)
+
+def loads(data):
+    """
+    读取存档数据
+
+    参数:
+        data: dumps()返回的字节串
+
+    返回:
+        tuple: (对局设置, 游戏状态)，对局设置包括players、enemy_ai、max_enemies、seed、level，
+               游戏状态可以传给World.restore()
+    """
+    if len(data) < HEADER.size:
+        raise ValueError('不是有效的存档')
+    magic, version, players, enemy_ai, max_enemies, has_seed, seed = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('不是有效的存档')
+    offset = HEADER.size
+    length = data[offset]
+    level = bytes(data[offset + 1:offset + 1 + length]).decode('utf-8')
+    offset += 1 + length
+    state, offset = unpack_body(data, offset)
+    if has_seed:
+        state['random'], offset = unpack_random(data, offset)
+    if offset != len(data):
+        raise ValueError('存档长度不正确')
+    settings = {
+        'players': players,
+        'enemy_ai': enemy_ai,
+        'max_enemies': max_enemies,
+        'seed': seed if has_seed else None,
+        'level': level,
+    }
+    return settings, state
+
+def save(gameWorld, path):
+    """
+    把游戏世界的状态保存到文件
+
+    参数:
+        gameWorld: 游戏世界对象
+        path: 存档文件路径
+    """
+    with open(path, 'wb') as f:
+        f.write(dumps(gameWorld))
+
+def read(path):
+    """
+    读取存档文件
+
+    参数:
+        path: 存档文件路径
+
+    返回:
+        tuple: (对局设置, 游戏状态)，见loads()
+    """
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+def matches(gameWorld, settings):
+    """
+    判断存档能否直接恢复到游戏世界中
+
+    参数:
+        gameWorld: 游戏世界对象
+        settings: loads()返回的对局设置
+
+    返回:
+        bool: 玩家人数、敌方坦克移动方式和上限、关卡相同，并且都有或都没有随机数种子时为True
+    """
+    return all(getattr(gameWorld, name) == settings[name]
+               for name in ('players', 'enemy_ai', 'max_enemies', 'level')) \
+        and (gameWorld.seed is None) == (settings['seed'] is None)
+
+def apply(gameWorld, settings, state):
+    """
+    把存档恢复到对局设置相同的游戏世界中，重新创建所有精灵组
+
+    参数:
+        gameWorld: 游戏世界对象
+        settings: loads()返回的对局设置
+        state: loads()返回的游戏状态
+    """
+    gameWorld.seed = settings['seed']
+    gameWorld.restore(state)
+
+def load(path, gameWorld=None):
+    """
+    读取存档文件并恢复游戏
+    对局设置与gameWorld相同时直接恢复到gameWorld中，否则按存档的设置创建新的游戏世界
+
+    参数:
+        path: 存档文件路径
+        gameWorld: 要恢复到的游戏世界对象
+
+    返回:
+        World: 恢复后的游戏世界
+    """
+    settings, state = read(path)
+    if gameWorld is None or not matches(gameWorld, settings):
+        gameWorld = world.World(settings['players'], settings['max_enemies'], settings['seed'],
+                                fixed_timestep=settings['seed'] is not None,
+                                enemy_ai=settings['enemy_ai'], level=settings['level'])
+    apply(gameWorld, settings, state)
+    return gameWorld
+
+def benchmark(ticks=1800, seed=0, level=levels.DEFAULT_LEVEL, repeat=200):
+    """
+    运行固定种子的游戏（游戏结束后重新开始），每隔一段时间保存并读取一次，
+    检查读取后的状态与原来相同
+
+    参数:
+        ticks: 运行的帧数
+        seed: 随机数种子
+        level: 关卡名
+        repeat: 每次测量重复的次数
+
+    返回:
+        dict: 存档大小（字节），保存、读取、恢复的平均时间（毫秒）
+    """
+    import batch
+    world.init_headless()
+    gameWorld = world.World(2, 4, seed, fixed_timestep=True, level=level)
+    copy = world.World(2, 4, seed, fixed_timestep=True, level=level)
+    bot = batch.RandomBot(seed, 2)
+    sizes, dump_times, load_times, restore_times = [], [], [], []
+    clock = time.perf_counter
+    for tick in range(ticks):
+        if gameWorld.game_over:
+            gameWorld.reset(seed + tick)
+        gameWorld.step(bot(gameWorld))
+        if tick % 300 != 299:
+            continue
+        start = clock()
+        for number in range(repeat):
+            data = dumps(gameWorld)
+        dump_times.append((clock() - start) / repeat)
+        start = clock()
+        for number in range(repeat):
+            settings, state = loads(data)
+        load_times.append((clock() - start) / repeat)
+        start = clock()
+        for number in range(repeat):
+            apply(copy, settings, state)
+        restore_times.append((clock() - start) / repeat)
+        sizes.append(len(data))
+        if copy.checksum() != gameWorld.checksum() or dumps(copy) != data:
+            raise AssertionError('读取存档后的状态不同（第%d帧）' % gameWorld.tick)
+    return {
+        'size': max(sizes),
+        'dumps_ms': sum(dump_times) / len(dump_times) * 1000,
+        'loads_ms': sum(load_times) / len(load_times) * 1000,
+        'restore_ms': sum(restore_times) / len(restore_times) * 1000,
+    }
+
+def main(argv=None):
+    """
+    存档命令行入口
+
+    参数:
+        argv: 参数列表，默认使用sys.argv
+    """
+    parser = argparse.ArgumentParser(description='坦克大战存档')
+    parser.add_argument('path', nargs='?', help='显示存档的内容')
+    parser.add_argument('--benchmark', action='store_true', help='测量保存和读取的时间')
+    parser.add_argument('--level', default=levels.DEFAULT_LEVEL, help='测量时使用的关卡名')
+    args = parser.parse_args(argv)
+    if args.path:
+        settings, state = read(args.path)
+        print('%s: %d字节, 关卡%s, 玩家%d人, 第%d帧, 剩余敌人%d, 场上敌方坦克%d辆, 基地存活: %s' % (
+            args.path, os.path.getsize(args.path), settings['level'], settings['players'], state['fields'][0],
+            state['fields'][1], len(state['enemies']), state['fields'][11]))
+    if args.benchmark:
+        result = benchmark(level=args.level)
+        print('存档%d字节, 保存%.3fms, 解析%.3fms, 恢复精灵组%.3fms' % (
+            result['size'], result['dumps_ms'], result['loads_ms'], result['restore_ms']))
+
+if __name__ == "__main__":
+    main()
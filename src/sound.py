@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+音效模块
+统一管理游戏的音效：每个音效只加载（解码）一次，为每个音效预留固定的声道，
+并限制同一音效在一段时间内的播放次数
+
+一帧内可能多次播放同一音效，例如道具“全部消灭”对每辆敌方坦克都产生一次爆炸音效，
+直接调用Sound.play()会让几十个相同的声音叠加在混音器上；
+限制后同一音效在VOICE_WINDOW秒内最多播放预留声道数次，多出的请求直接丢弃
+
+播放由后端完成：
+    MixerBackend  使用pygame.mixer播放
+    NullBackend   不播放任何声音，也不初始化混音器，用于无界面运行或静音
+
+用法:
+    sounds = SoundManager(MixerBackend() if enabled else NullBackend())
+    sounds.load()          # 初始化混音器并加载音效，可以在后台线程中调用
+    sounds.play(world.SOUND_BANG)
+"""
+
+import os
+import time
+import collections
+import pygame
+import assets
+import world
+
+SOUND_START = 'start'
+
+MUSIC_DIR = os.path.join(assets.BASE_DIR, 'music')
+
+# 音效名 -> (文件名, 音量, 预留声道数)，音量为None时使用文件本身的音量
+SOUNDS = {
+    SOUND_START: ('start.wav', None, 1),
+    world.SOUND_BANG: ('bang.wav', 1, 3),
+    world.SOUND_FIRE: ('Gunfire.wav', None, 4),
+}
+
+# 限制播放次数的时间窗口（秒）
+VOICE_WINDOW = 0.1
+
+def headless():
+    """
+    判断是否在无界面环境中运行（SDL使用dummy视频或音频驱动）
+
+    返回:
+        bool: 无界面运行时为True
+    """
+    return os.environ.get('SDL_VIDEODRIVER') == 'dummy' or os.environ.get('SDL_AUDIODRIVER') == 'dummy'
+
+class NullBackend():
+    """
+    空后端，不初始化混音器，也不播放任何声音
+    """
+    def open(self, sounds):
+        """
+        准备播放
+
+        参数:
+            sounds: SOUNDS格式的音效表
+
+        返回:
+            bool: 总是False，表示没有可以播放的音效
+        """
+        return False
+
+    def play(self, name, voice):
+        """
+        播放音效，什么也不做
+
+        参数:
+            name: 音效名
+            voice: 使用的声道序号
+        """
+        pass
+
+class MixerBackend():
+    """
+    pygame.mixer后端
+    每个音效加载一次，预留的声道按音效分组，播放时轮流使用该音效的声道，
+    最早开始播放的声音被新的声音替换，不会占用其他音效的声道
+    """
+    def __init__(self, music_dir=MUSIC_DIR):
+        """
+        参数:
+            music_dir: 音效文件所在的目录
+        """
+        self.music_dir = music_dir
+        self.sounds = {}    # 音效名 -> pygame.mixer.Sound
+        self.channels = {}  # 音效名 -> 预留给它的pygame.mixer.Channel列表
+
+    def open(self, sounds):
+        """
+        初始化混音器，加载全部音效并预留声道
+
+        参数:
+            sounds: SOUNDS格式的音效表
+
+        返回:
+            bool: 是否成功，没有可用的音频设备时返回False
+        """
+        try:
+            pygame.mixer.init()
+        except pygame.error:
+            return False
+        reserved = sum(voices for filename, volume, voices in sounds.values())
+        if pygame.mixer.get_num_channels() < reserved:
+            pygame.mixer.set_num_channels(reserved)
+        pygame.mixer.set_reserved(reserved)
+        number = 0
+        for name, (filename, volume, voices) in sounds.items():
+            sound = pygame.mixer.Sound(os.path.join(self.music_dir, filename))
+            if volume is not None:
+                sound.set_volume(volume)
+            self.sounds[name] = sound
+            self.channels[name] = [pygame.mixer.Channel(number + voice) for voice in range(voices)]
+            number += voices
+        return True
+
+    def play(self, name, voice):
+        """
+        在音效的一个预留声道上播放，声道正在播放时打断原来的声音
+
+        参数:
+            name: 音效名
+            voice: 使用的声道序号
+        """
+        self.channels[name][voice].play(self.sounds[name])
+
+class SoundManager():
+    """
+    音效管理类
+    load()之前和加载失败时play()不发出声音，只记录统计
+    """
+    def __init__(self, backend, sounds=SOUNDS, window=VOICE_WINDOW, clock=time.perf_counter):
+        """
+        参数:
+            backend: 播放后端（MixerBackend或NullBackend）
+            sounds: 音效表，音效名 -> (文件名, 音量, 预留声道数)
+            window: 限制播放次数的时间窗口（秒），同一音效在窗口内最多播放预留声道数次
+            clock: 返回当前时间（秒）的函数
+        """
+        self.backend = backend
+        self.sounds = sounds
+        self.window = window
+        self.clock = clock
+        self.ready = False
+        self.recent = {name: collections.deque() for name in sounds}  # 音效名 -> 窗口内的播放时间
+        self.next_voice = dict.fromkeys(sounds, 0)
+        self.played = dict.fromkeys(sounds, 0)
+        self.dropped = dict.fromkeys(sounds, 0)
+
+    def load(self):
+        """
+        打开后端并加载音效
+
+        返回:
+            bool: 是否可以播放声音
+        """
+        self.ready = self.backend.open(self.sounds)
+        return self.ready
+
+    def play(self, name):
+        """
+        播放音效，同一音效在时间窗口内的播放次数已经达到上限时丢弃
+
+        参数:
+            name: 音效名（world.SOUND_*或SOUND_START），未知的音效名被忽略
+
+        返回:
+            bool: 是否播放
+        """
+        recent = self.recent.get(name)
+        if recent is None:
+            return False
+        now = self.clock()
+        while recent and now - recent[0] >= self.window:
+            recent.popleft()
+        voices = self.sounds[name][2]
+        if len(recent) >= voices:
+            self.dropped[name] += 1
+            return False
+        recent.append(now)
+        self.played[name] += 1
+        if self.ready:
+            voice = self.next_voice[name]
+            self.next_voice[name] = (voice + 1) % voices
+            self.backend.play(name, voice)
+        return True
+
+    def format(self):
+        """
+        生成播放统计
+
+        返回:
+            str: 每个音效的播放次数和丢弃次数
+        """
+        return '音效: ' + ', '.join('%s 播放%d次 丢弃%d次' % (name, self.played[name], self.dropped[name])
+                                  for name in self.sounds)
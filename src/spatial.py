@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+空间哈希模块
+把坦克按所在的网格单元登记，碰撞检测时只检查附近单元中的坦克，
+检测的代价与坦克总数无关
+"""
+
+import pygame
+
+class SpatialGroup(pygame.sprite.Group):
+    """
+    带空间哈希的精灵组
+    继承自pygame的Group类，精灵加入、移除（包括kill()）时自动更新哈希表，
+    精灵移动后需要调用reindex()更新其所在的单元
+    """
+    def __init__(self, cell_size=48, *sprites):
+        """
+        初始化精灵组
+
+        参数:
+            cell_size: 网格单元的边长（像素），默认与坦克大小相同
+            sprites: 初始加入的精灵
+        """
+        self.cell_size = cell_size
+        self.cells = {}         # 单元坐标 -> 单元内的精灵列表
+        self.sprite_cells = {}  # 精灵 -> 精灵所在的单元坐标
+        pygame.sprite.Group.__init__(self, *sprites)
+
+    def _rect_cells(self, rect):
+        """
+        获取矩形覆盖的所有单元坐标
+
+        参数:
+            rect: 像素坐标的矩形
+
+        返回:
+            tuple: 单元坐标
+        """
+        size = self.cell_size
+        return tuple((x, y)
+                     for y in range(rect.top // size, (rect.bottom - 1) // size + 1)
+                     for x in range(rect.left // size, (rect.right - 1) // size + 1))
+
+    def add_internal(self, sprite, layer=None):
+        """
+        精灵加入组时登记到其所在的单元
+        """
+        pygame.sprite.Group.add_internal(self, sprite)
+        keys = self._rect_cells(sprite.rect)
+        self.sprite_cells[sprite] = keys
+        for key in keys:
+            self.cells.setdefault(key, []).append(sprite)
+
+    def remove_internal(self, sprite):
+        """
+        精灵离开组时从其所在的单元中移除
+        """
+        pygame.sprite.Group.remove_internal(self, sprite)
+        for key in self.sprite_cells.pop(sprite, ()):
+            cell = self.cells[key]
+            cell.remove(sprite)
+            if not cell:
+                del self.cells[key]
+
+    def reindex(self, sprite):
+        """
+        精灵移动后更新其所在的单元
+        仍在原来的单元内时不做任何修改
+
+        参数:
+            sprite: 组内的精灵
+        """
+        keys = self._rect_cells(sprite.rect)
+        old = self.sprite_cells.get(sprite)
+        if old is None or old == keys:
+            return
+        for key in old:
+            cell = self.cells[key]
+            cell.remove(sprite)
+            if not cell:
+                del self.cells[key]
+        self.sprite_cells[sprite] = keys
+        for key in keys:
+            self.cells.setdefault(key, []).append(sprite)
+
+    def collide(self, rect, exclude=None):
+        """
+        查找与矩形重叠的第一个精灵
+
+        参数:
+            rect: 像素坐标的矩形
+            exclude: 不参与检测的精灵（通常是正在移动的坦克自身）
+
+        返回:
+            pygame.sprite.Sprite: 发生碰撞的精灵，没有碰撞时返回None
+        """
+        cells = self.cells
+        for key in self._rect_cells(rect):
+            for sprite in cells.get(key, ()):
+                if sprite is not exclude and rect.colliderect(sprite.rect):
+                    return sprite
+        return None
+
+    def query(self, rect, exclude=None):
+        """
+        查找与矩形重叠的所有精灵
+
+        参数:
+            rect: 像素坐标的矩形
+            exclude: 不参与检测的精灵
+
+        返回:
+            list: 发生碰撞的精灵
+        """
+        result = []
+        cells = self.cells
+        for key in self._rect_cells(rect):
+            for sprite in cells.get(key, ()):
+                if sprite is not exclude and sprite not in result and rect.colliderect(sprite.rect):
+                    result.append(sprite)
+        return result
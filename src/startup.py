@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+启动模块
+记录游戏启动各步骤的耗时，并缓存按名称查找到的系统字体路径
+
+pygame.font.SysFont()第一次调用时会扫描系统的全部字体，可能需要几百毫秒；
+查找结果保存到字体缓存文件（__fontcache__/fonts.json）后，之后启动时直接用路径打开字体，
+缓存的字体文件不存在时重新查找。查找不到的字体也会缓存，安装新字体后删除缓存文件即可
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import pygame
+import assets
+
+# 字体缓存文件
+FONT_CACHE_PATH = os.path.join(assets.BASE_DIR, '__fontcache__', 'fonts.json')
+
+class StartupTimer():
+    """
+    启动计时类
+    主线程按顺序调用step()记录每一步，后台线程用record()记录自己的步骤
+    """
+    def __init__(self, start=None):
+        """
+        参数:
+            start: 开始计时的time.perf_counter()值，默认为现在
+        """
+        self.start = self.last = start if start is not None else time.perf_counter()
+        self.steps = []  # (步骤名, 耗时秒数, 是否在后台线程)
+        self.lock = threading.Lock()
+
+    def step(self, name):
+        """
+        结束主线程的一个步骤
+
+        参数:
+            name: 步骤名
+        """
+        now = time.perf_counter()
+        with self.lock:
+            self.steps.append((name, now - self.last, False))
+        self.last = now
+
+    def skip(self):
+        """
+        跳过距离上一步的时间，不计入任何步骤（例如等待玩家操作的时间）
+        """
+        self.last = time.perf_counter()
+
+    def record(self, name, seconds):
+        """
+        记录后台线程的一个步骤
+
+        参数:
+            name: 步骤名
+            seconds: 耗时秒数
+        """
+        with self.lock:
+            self.steps.append((name, seconds, True))
+
+    def format(self):
+        """
+        生成启动耗时报告
+
+        返回:
+            str: 多行文本，后台步骤不计入总耗时
+        """
+        lines = ['启动耗时:']
+        total = 0.0
+        with self.lock:
+            steps = list(self.steps)
+        for name, seconds, background in steps:
+            if not background:
+                total += seconds
+            lines.append('  %8.1fms  %s%s' % (seconds * 1000, name, '（后台）' if background else ''))
+        lines.append('  %8.1fms  %s' % (total * 1000, '合计'))
+        return '\n'.join(lines)
+
+def _read_font_cache():
+    """
+    读取字体缓存
+
+    返回:
+        dict: 缓存键 -> 字体路径或None
+    """
+    try:
+        with open(FONT_CACHE_PATH, encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+def _write_font_cache(cache):
+    """
+    写入字体缓存，目录不可写时忽略
+    """
+    try:
+        os.makedirs(os.path.dirname(FONT_CACHE_PATH), exist_ok=True)
+        temp_path = '%s.%d.tmp' % (FONT_CACHE_PATH, os.getpid())
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(temp_path, FONT_CACHE_PATH)
+    except OSError:
+        pass
+
+def find_font(name, bold=False, italic=False):
+    """
+    查找系统字体文件的路径，结果保存在字体缓存中
+
+    参数:
+        name: 字体名，例如'SimHei'
+        bold: 是否粗体
+        italic: 是否斜体
+
+    返回:
+        str: 字体文件路径，找不到时返回None
+    """
+    key = '%s|%s|%d|%d' % (sys.platform, name.lower(), bold, italic)
+    cache = _read_font_cache()
+    if key in cache:
+        path = cache[key]
+        if path is None or os.path.exists(path):
+            return path
+    path = pygame.font.match_font(name, bold, italic)
+    cache[key] = path
+    _write_font_cache(cache)
+    return path
+
+def load_font(name, size):
+    """
+    按名称打开系统字体，找不到时使用pygame的默认字体
+    与pygame.font.SysFont(name, size)的结果相同，但不需要每次启动都扫描系统字体
+
+    参数:
+        name: 字体名
+        size: 字号
+
+    返回:
+        pygame.font.Font: 字体对象
+    """
+    path = find_font(name)
+    if path is not None:
+        try:
+            return pygame.font.Font(path, size)
+        except (OSError, pygame.error):
+            pass
+    return pygame.font.Font(None, size)
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+"""
+地形图层模块
+将背景和各种地形格子预先合成到一张Surface上，每帧只需一次blit，
+地图中的格子发生变化时只重绘对应的格子
+树林绘制在坦克上方，单独合成到一张透明的覆盖层上
+比窗口大的地图使用ChunkedTerrain，按块合成，只绘制视野内的块
+"""
+
+import collections
+import pygame
+import assets
+import wall
+
+class TerrainLayer():
+    """
+    地形图层类
+    缓存合成好的地形画面，并根据地图的变化记录增量更新
+    """
+    def __init__(self, background):
+        """
+        初始化地形图层
+
+        参数:
+            background: 背景图片
+        """
+        self.background = background
+        self.surface = background.copy()
+        self.overlay = None  # 树林覆盖层，地图上没有树林时为None
+        self.bgMap = None  # 当前合成的地图
+        self.cursor = 0    # 已处理的地图变化记录数
+        size = (wall.TILE_SIZE, wall.TILE_SIZE)
+        self.images = {kind: assets.load_tiled(name, size) for kind, name in wall.TILE_IMAGES.items()}
+
+    def _rebuild(self, bgMap):
+        """
+        重新合成整个地形画面
+
+        参数:
+            bgMap: 地图对象
+        """
+        self.bgMap = bgMap
+        self.cursor = bgMap.change_count
+        self.surface.blit(self.background, (0, 0))
+        self.overlay = None
+        images = self.images
+        width = bgMap.width
+        for index, kind in enumerate(bgMap.grid):
+            if kind == wall.TREE:
+                self._paint_overlay(index)
+            elif kind:
+                y, x = divmod(index, width)
+                self.surface.blit(images[kind], (wall.BORDER + x * wall.TILE_SIZE, wall.BORDER + y * wall.TILE_SIZE))
+
+    def _paint_overlay(self, index):
+        """
+        重绘覆盖层上的一个格子，第一次出现树林时创建覆盖层
+
+        参数:
+            index: 格子下标
+        """
+        y, x = divmod(index, self.bgMap.width)
+        rect = pygame.Rect(wall.BORDER + x * wall.TILE_SIZE, wall.BORDER + y * wall.TILE_SIZE,
+                           wall.TILE_SIZE, wall.TILE_SIZE)
+        if self.overlay is None:
+            if self.bgMap.grid[index] != wall.TREE:
+                return
+            self.overlay = pygame.Surface(self.surface.get_size(), pygame.SRCALPHA)
+        self.overlay.fill((0, 0, 0, 0), rect)
+        if self.bgMap.grid[index] == wall.TREE:
+            self.overlay.blit(self.images[wall.TREE], rect)
+
+    def _repaint(self, index):
+        """
+        重绘一个格子：先用背景覆盖，再绘制格子上现有的地形
+
+        参数:
+            index: 格子下标
+        """
+        bgMap = self.bgMap
+        y, x = divmod(index, bgMap.width)
+        rect = pygame.Rect(wall.BORDER + x * wall.TILE_SIZE, wall.BORDER + y * wall.TILE_SIZE,
+                           wall.TILE_SIZE, wall.TILE_SIZE)
+        self.surface.blit(self.background, rect, rect)
+        kind = bgMap.grid[index]
+        if kind and kind != wall.TREE:
+            self.surface.blit(self.images[kind], rect)
+        self._paint_overlay(index)
+
+    def update(self, bgMap):
+        """
+        根据地图的变化更新地形画面
+        地图对象被替换（例如重置游戏）时重新合成，否则只重绘发生变化的格子
+
+        参数:
+            bgMap: 地图对象
+
+        返回:
+            list: 本次重绘的格子下标
+        """
+        changed = bgMap.changes_since(self.cursor) if bgMap is self.bgMap else None
+        if changed is None:
+            self._rebuild(bgMap)
+            return list(range(bgMap.width * bgMap.height))
+        self.cursor = bgMap.change_count
+        for index in set(changed):
+            self._repaint(index)
+        return changed
+
+    def draw(self, screen, bgMap):
+        """
+        更新并绘制地形
+
+        参数:
+            screen: 绘制目标
+            bgMap: 地图对象
+        """
+        self.update(bgMap)
+        screen.blit(self.surface, (0, 0))
+
+    def draw_overlay(self, screen, rects=None):
+        """
+        在精灵上方绘制树林
+
+        参数:
+            screen: 绘制目标
+            rects: 只重绘这些区域，默认绘制整个覆盖层
+        """
+        if self.overlay is None:
+            return
+        if rects is None:
+            screen.blit(self.overlay, (0, 0))
+        else:
+            for rect in rects:
+                screen.blit(self.overlay, rect, rect)
+
+class ChunkedTerrain():
+    """
+    分块地形类
+    大地图无法合成到一张Surface上，按CHUNK_TILES x CHUNK_TILES个格子分块合成，
+    只有进入视野的块才会被合成和绘制，最近没有用到的块在超过上限后被丢弃
+    """
+    def __init__(self, background, chunk_tiles=16, max_chunks=64):
+        """
+        初始化分块地形
+
+        参数:
+            background: 背景图片，取其边框和地面的颜色
+            chunk_tiles: 每块的边长（格子数）
+            max_chunks: 最多缓存的块数
+        """
+        self.border_color = background.get_at((0, 0))
+        self.floor_color = background.get_at((wall.BORDER, wall.BORDER))
+        self.chunk_tiles = chunk_tiles
+        self.chunk_size = chunk_tiles * wall.TILE_SIZE  # 每块的边长（像素）
+        self.max_chunks = max_chunks
+        self.chunks = collections.OrderedDict()  # 块坐标 -> (地形Surface, 树林覆盖层或None)
+        self.bgMap = None
+        self.cursor = 0
+        size = (wall.TILE_SIZE, wall.TILE_SIZE)
+        self.images = {kind: assets.load_tiled(name, size) for kind, name in wall.TILE_IMAGES.items()}
+        self.rendered = 0  # 累计合成的块数
+
+    def _render(self, key):
+        """
+        合成一块地形
+
+        参数:
+            key: 块坐标(cx, cy)
+
+        返回:
+            tuple: (地形Surface, 树林覆盖层或None)
+        """
+        bgMap = self.bgMap
+        left, top = key[0] * self.chunk_tiles, key[1] * self.chunk_tiles
+        width = min(self.chunk_tiles, bgMap.width - left)
+        height = min(self.chunk_tiles, bgMap.height - top)
+        surface = pygame.Surface((width * wall.TILE_SIZE, height * wall.TILE_SIZE)).convert()
+        surface.fill(self.floor_color)
+        chunk = [surface, None]
+        for y in range(top, top + height):
+            row = y * bgMap.width
+            for x in range(left, left + width):
+                if bgMap.grid[row + x]:
+                    self._paint(chunk, key, x, y)
+        self.rendered += 1
+        return chunk
+
+    def _paint(self, chunk, key, x, y):
+        """
+        重绘块中的一个格子
+
+        参数:
+            chunk: [地形Surface, 树林覆盖层]
+            key: 块坐标
+            x: 格子的x坐标
+            y: 格子的y坐标
+        """
+        kind = self.bgMap.grid[y * self.bgMap.width + x]
+        pos = ((x - key[0] * self.chunk_tiles) * wall.TILE_SIZE,
+               (y - key[1] * self.chunk_tiles) * wall.TILE_SIZE)
+        rect = pygame.Rect(pos, (wall.TILE_SIZE, wall.TILE_SIZE))
+        chunk[0].fill(self.floor_color, rect)
+        if kind and kind != wall.TREE:
+            chunk[0].blit(self.images[kind], pos)
+        if chunk[1] is None and kind == wall.TREE:
+            chunk[1] = pygame.Surface(chunk[0].get_size(), pygame.SRCALPHA)
+        if chunk[1] is not None:
+            chunk[1].fill((0, 0, 0, 0), rect)
+            if kind == wall.TREE:
+                chunk[1].blit(self.images[wall.TREE], pos)
+
+    def update(self, bgMap):
+        """
+        根据地图的变化更新已合成的块，没有合成的块在进入视野时再合成
+
+        参数:
+            bgMap: 地图对象
+        """
+        changed = bgMap.changes_since(self.cursor) if bgMap is self.bgMap else None
+        if changed is None:
+            self.bgMap = bgMap
+            self.cursor = bgMap.change_count
+            self.chunks.clear()
+            return
+        self.cursor = bgMap.change_count
+        tiles = self.chunk_tiles
+        for index in set(changed):
+            y, x = divmod(index, bgMap.width)
+            key = (x // tiles, y // tiles)
+            chunk = self.chunks.get(key)
+            if chunk is not None:
+                self._paint(chunk, key, x, y)
+
+    def visible(self, camera, size):
+        """
+        获取视野内的块，需要时合成
+
+        参数:
+            camera: 视野左上角在地图上的像素坐标
+            size: 视野大小
+
+        返回:
+            list: (块在地图上的像素坐标, [地形Surface, 树林覆盖层])
+        """
+        bgMap = self.bgMap
+        chunk_size = self.chunk_size
+        left = max((camera[0] - wall.BORDER) // chunk_size, 0)
+        top = max((camera[1] - wall.BORDER) // chunk_size, 0)
+        right = min((camera[0] + size[0] - 1 - wall.BORDER) // chunk_size,
+                    (bgMap.width - 1) // self.chunk_tiles)
+        bottom = min((camera[1] + size[1] - 1 - wall.BORDER) // chunk_size,
+                     (bgMap.height - 1) // self.chunk_tiles)
+        result = []
+        chunks = self.chunks
+        for cy in range(top, bottom + 1):
+            for cx in range(left, right + 1):
+                key = (cx, cy)
+                chunk = chunks.get(key)
+                if chunk is None:
+                    chunk = chunks[key] = self._render(key)
+                else:
+                    chunks.move_to_end(key)
+                result.append(((wall.BORDER + cx * chunk_size, wall.BORDER + cy * chunk_size), chunk))
+        while len(chunks) > max(self.max_chunks, len(result)):
+            chunks.popitem(last=False)
+        return result
+
+    def draw(self, screen, bgMap, camera):
+        """
+        更新并绘制视野内的地形，视野中地图以外的部分用边框颜色填充
+
+        参数:
+            screen: 绘制目标
+            bgMap: 地图对象
+            camera: 视野左上角在地图上的像素坐标
+        """
+        self.update(bgMap)
+        screen.fill(self.border_color)
+        for (x, y), chunk in self.visible(camera, screen.get_size()):
+            screen.blit(chunk[0], (x - camera[0], y - camera[1]))
+
+    def draw_overlay(self, screen, camera):
+        """
+        在精灵上方绘制视野内的树林
+
+        参数:
+            screen: 绘制目标
+            camera: 视野左上角在地图上的像素坐标
+        """
+        for (x, y), chunk in self.visible(camera, screen.get_size()):
+            if chunk[1] is not None:
+                screen.blit(chunk[1], (x - camera[0], y - camera[1]))
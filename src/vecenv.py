@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+批量训练环境模块
+提供类似Gym的reset()/step(actions)接口，管理N局相互独立的无界面对局，
+观测值是直接由地图状态生成的NumPy数组，而不是渲染出来的像素
+
+游戏规则由每局各自的World.step()执行，每帧仍然依次推进N个World；
+动作解码、统计值的读取、观测值、奖励和结束标志对所有对局整批完成，
+读取坐标和统计值时用map()和operator.attrgetter()在C层遍历所有对局的物体，
+不为每个对局或物体执行Python代码
+
+观测值形状为(N, CHANNELS, 26, 26)的uint8数组，每个通道对应一种物体，
+按24像素的地图格子标记：
+    CH_BRICK, CH_IRON      砖块、铁块（直接来自wall.Map的格子）
+    CH_HOME                存活的基地
+    CH_PLAYER, CH_ENEMY    我方、敌方坦克覆盖的格子
+    CH_PLAYER_BULLET       我方子弹
+    CH_ENEMY_BULLET        敌方子弹
+    CH_PROP                地图上的食物/道具
+
+动作形状为(N, 玩家人数)的整数数组，每个玩家的动作是0-9：
+    移动 = action % 5（0不动，1上，2下，3左，4右），射击 = action >= 5
+
+依赖NumPy，游戏本身不需要这个模块
+"""
+
+import operator
+import itertools
+import numpy as np
+import world
+import wall
+
+# 观测值通道
+CH_BRICK         = 0
+CH_IRON          = 1
+CH_HOME          = 2
+CH_PLAYER        = 3
+CH_ENEMY         = 4
+CH_PLAYER_BULLET = 5
+CH_ENEMY_BULLET  = 6
+CH_PROP          = 7
+CHANNELS = 8
+
+# 每个玩家的动作数
+ACTIONS = 10
+
+# 动作 -> 玩家一的输入位掩码，玩家二的位掩码左移5位
+ACTION_INPUTS = np.array(
+    [move | fire
+     for fire in (0, world.P1_FIRE)
+     for move in (0,) + world.P1_MOVES], dtype=np.int64)
+P2_SHIFT = 5
+
+# 奖励
+REWARD_KILL = 1.0        # 每消灭一辆敌方坦克
+REWARD_HOME_LOST = -10.0  # 基地被摧毁
+
+# 批量读取属性
+_get_rect = operator.attrgetter('rect')
+_get_life = operator.attrgetter('life')
+_get_bullet = operator.attrgetter('bullet')
+_get_prop = operator.attrgetter('prop')
+_get_home = operator.attrgetter('homeSurvive')
+_get_tick = operator.attrgetter('tick')
+_get_kills = operator.attrgetter('kills')
+_get_grid = operator.attrgetter('bgMap.grid')
+# 直接读取精灵组保存精灵的字典spritedict，以免每组调用一次Python实现的__len__()和__iter__()
+_get_players = operator.attrgetter('mytankGroup.spritedict')
+_get_enemies = operator.attrgetter('allEnemyGroup.spritedict')
+_get_enemy_bullets = operator.attrgetter('enemyBulletGroup.spritedict')
+
+class VecEnv():
+    """
+    批量训练环境类
+    每帧依次调用N个World的step()推进游戏，其余部分对所有对局整批完成：
+    统计值和坦克、子弹、道具的坐标各用一次map()读出，
+    动作解码、观测值、奖励和结束标志都以整批数组计算
+    """
+    def __init__(self, num_envs, players=1, max_enemies=4, seed=0, max_ticks=36000):
+        """
+        创建N局对局
+
+        参数:
+            num_envs: 对局数N
+            players: 每局的玩家人数（1或2）
+            max_enemies: 敌方坦克上限
+            seed: 第一局的随机数种子，第i局使用seed + i，
+                  每局结束后自动以seed + N、seed + N + 1……重新开始
+            max_ticks: 每局最大帧数，达到后按超时结束
+        """
+        world.init_headless()
+        self.num_envs = num_envs
+        self.players = players
+        self.max_ticks = max_ticks
+        self.next_seed = seed + num_envs
+        self.worlds = [world.World(players, max_enemies, seed + i, fixed_timestep=True)
+                       for i in range(num_envs)]
+
+        bgMap = self.worlds[0].bgMap
+        self.observation_shape = (CHANNELS, bgMap.height, bgMap.width)
+        self.obs = np.zeros((num_envs,) + self.observation_shape, dtype=np.uint8)
+        # 基地所在的格子
+        home_x, home_y = bgMap.home
+        self._home_cells = (slice(home_y, home_y + 2), slice(home_x, home_x + 2))
+        self._kills = np.zeros(num_envs, dtype=np.int64)
+
+    def reset(self):
+        """
+        以新的种子重新开始所有对局
+
+        返回:
+            np.ndarray: 观测值，形状(N, CHANNELS, 26, 26)
+        """
+        for gameWorld in self.worlds:
+            gameWorld.reset(self.next_seed)
+            self.next_seed += 1
+        self._kills[:] = 0
+        return self._observe()
+
+    def step(self, actions):
+        """
+        所有对局推进一帧
+        结束的对局自动重新开始，返回的观测值是新一局的初始状态
+
+        参数:
+            actions: 整数数组，形状(N,)或(N, 玩家人数)，取值0-9
+
+        返回:
+            tuple: (观测值, 奖励(N,), 结束标志(N,), 信息字典)
+                   信息字典中'timeout'表示超时结束，
+                   'ticks'是结束时的帧数（未结束的对局为0）
+        """
+        actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs, -1)
+        inputs = ACTION_INPUTS[actions[:, 0]]
+        if self.players == 2:
+            inputs |= ACTION_INPUTS[actions[:, 1]] << P2_SHIFT
+
+        # 推进游戏，每个World执行自己的游戏规则
+        worlds = self.worlds
+        for gameWorld, value in zip(worlds, inputs.tolist()):
+            gameWorld.step(value)
+
+        # 整批读出统计值
+        num_envs = self.num_envs
+        kills = np.array(list(map(_get_kills, worlds)), dtype=np.int64).sum(axis=1)
+        lost = ~np.fromiter(map(_get_home, worlds), dtype=bool, count=num_envs)
+        ticks = np.fromiter(map(_get_tick, worlds), dtype=np.int64, count=num_envs)
+
+        rewards = (kills - self._kills) * REWARD_KILL + lost * REWARD_HOME_LOST
+        timeout = ~lost & (ticks >= self.max_ticks)
+        dones = lost | timeout
+        self._kills = kills
+
+        # 自动重新开始结束的对局
+        for index in np.flatnonzero(dones).tolist():
+            worlds[index].reset(self.next_seed)
+            self.next_seed += 1
+            self._kills[index] = 0
+
+        info = {'timeout': timeout, 'ticks': np.where(dones, ticks, 0)}
+        return self._observe(), rewards.astype(np.float32), dones, info
+
+    def _observe(self):
+        """
+        生成所有对局的观测值
+
+        返回:
+            np.ndarray: 观测值，形状(N, CHANNELS, 26, 26)，每次调用复用同一个数组
+        """
+        obs = self.obs
+        obs.fill(0)
+        worlds = self.worlds
+        num_envs = self.num_envs
+        chain = itertools.chain.from_iterable
+
+        # 地形和基地：所有地图的格子拼接后一次转换为数组
+        grids = np.frombuffer(b''.join(map(_get_grid, worlds)),
+                              dtype=np.uint8).reshape((num_envs,) + self.observation_shape[1:])
+        obs[:, CH_BRICK] = grids == wall.BRICK
+        obs[:, CH_IRON] = grids == wall.IRON
+        home = np.fromiter(map(_get_home, worlds), dtype=bool, count=num_envs)
+        obs[(slice(None), CH_HOME) + self._home_cells] = home[:, None, None]
+
+        # 收集坐标：每种物体读出所有对局的物体，记录所在对局、是否存活和矩形
+        # 我方坦克和敌方坦克总是存活，子弹和道具只标记存活的
+        players = list(map(_get_players, worlds))
+        player_tanks = list(chain(players))
+        player_bullets = list(map(_get_bullet, player_tanks))
+        enemies = list(map(_get_enemies, worlds))
+        enemy_bullets = list(map(_get_enemy_bullets, worlds))
+        props = list(map(_get_prop, worlds))
+        player_counts = np.fromiter(map(len, players), dtype=np.int64, count=num_envs)
+        enemy_counts = np.fromiter(map(len, enemies), dtype=np.int64, count=num_envs)
+        kinds = (
+            # (通道, 物体, 每局的物体数, 是否检查存活)
+            (CH_PLAYER, player_tanks, player_counts, False),
+            (CH_PLAYER_BULLET, player_bullets, player_counts, True),
+            (CH_ENEMY, list(chain(enemies)), enemy_counts, False),
+            (CH_ENEMY_BULLET, list(chain(enemy_bullets)),
+             np.fromiter(map(len, enemy_bullets), dtype=np.int64, count=num_envs), True),
+            (CH_PROP, props, np.ones(num_envs, dtype=np.int64), True),
+        )
+        env_ids = np.arange(num_envs)
+        envs, channels, boxes = [], [], []
+        for channel, sprites, counts, check_life in kinds:
+            if not sprites:
+                continue
+            owners = np.repeat(env_ids, counts)
+            rects = np.fromiter(chain(map(_get_rect, sprites)), dtype=np.int64,
+                                count=4 * len(sprites)).reshape(-1, 4)
+            if check_life:
+                alive = np.fromiter(map(_get_life, sprites), dtype=bool, count=len(sprites))
+                owners, rects = owners[alive], rects[alive]
+            envs.append(owners)
+            channels.append(np.full(len(owners), channel, dtype=np.int64))
+            boxes.append(rects)
+
+        # 坦克、子弹和道具：标记矩形覆盖的格子
+        # 物体不超过两个格子大，左边、中间、右边（上、中、下）三个点就能覆盖它跨过的所有格子
+        if envs:
+            boxes = np.concatenate(boxes)
+            left = boxes[:, 0] - wall.BORDER
+            top = boxes[:, 1] - wall.BORDER
+            xs = np.stack([left, left + boxes[:, 2] // 2, left + boxes[:, 2] - 1]) // wall.TILE_SIZE
+            ys = np.stack([top, top + boxes[:, 3] // 2, top + boxes[:, 3] - 1]) // wall.TILE_SIZE
+            height, width = self.observation_shape[1:]
+            xs = np.clip(xs, 0, width - 1)[:, None]
+            ys = np.clip(ys, 0, height - 1)[None, :]
+            envs = np.concatenate(envs)
+            channels = np.concatenate(channels)
+            obs[envs, channels, ys, xs] = 1
+        return obs
@@ -2,18 +2,36 @@
 """
 墙壁类模块
 定义了游戏中的砖块、铁块和地图类
+地图布局保存在maps目录的地图文件中，由levels模块加载
 """
 
 import pygame
-import os
+import assets
 
-# 获取项目根目录
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-IMAGE_DIR = os.path.join(BASE_DIR, 'image')
+# 地图格子的大小和地图边框宽度（像素）
+TILE_SIZE = 24
+BORDER = 3
 
-# 墙壁图片路径
-brickImage = os.path.join(IMAGE_DIR, 'brick.png')
-ironImage = os.path.join(IMAGE_DIR, 'iron.png')
+# 地图默认大小（格子数）
+MAP_WIDTH = 26
+MAP_HEIGHT = 26
+
+# 格子类型
+EMPTY = 0  # 空地
+BRICK = 1  # 砖块
+IRON  = 2  # 铁块
+RIVER = 3  # 河流：挡住坦克，子弹可以飞过
+ICE   = 4  # 冰面：坦克和子弹都可以通过
+TREE  = 5  # 树林：坦克和子弹都可以通过，绘制在坦克上方
+
+# 各类型格子是否挡住坦克，下标为格子类型
+TANK_SOLID = (False, True, True, True, False, False)
+
+# 各类型格子的图片名，小于格子的图片平铺绘制
+TILE_IMAGES = {BRICK: 'brick', IRON: 'iron', RIVER: 'river1', ICE: 'ice', TREE: 'tree'}
+
+# 变化记录最多保留的条数，超过时丢弃较早的一半
+MAX_CHANGES = 4096
 
 class Brick(pygame.sprite.Sprite):
     """
@@ -23,10 +41,10 @@ class Brick(pygame.sprite.Sprite):
     def __init__(self):
         """
         初始化砖块对象
-        加载砖块图片并设置其矩形区域
+        获取砖块图片（共享缓存）并设置其矩形区域
         """
         pygame.sprite.Sprite.__init__(self)
-        self.image = pygame.image.load(brickImage)
+        self.image = assets.load_image('brick')
         self.rect = self.image.get_rect()
 
 class Iron(pygame.sprite.Sprite):
@@ -37,92 +55,265 @@ class Iron(pygame.sprite.Sprite):
     def __init__(self):
         """
         初始化铁块对象
-        加载铁块图片并设置其矩形区域
+        获取铁块图片（共享缓存）并设置其矩形区域
         """
         pygame.sprite.Sprite.__init__(self)
-        self.image = pygame.image.load(ironImage)
+        self.image = assets.load_image('iron')
         self.rect = self.image.get_rect()
 
 class Map():
     """
     地图类
-    用于创建和管理游戏地图中的砖块和铁块
+    按格子存放格子类型的占用表，坦克和子弹的碰撞检测只需查询矩形覆盖的几个格子
+    格子不再对应单独的精灵，绘制由terrain模块根据格子类型完成
     """
-    def __init__(self):
+    def __init__(self, width=MAP_WIDTH, height=MAP_HEIGHT, grid=None):
         """
         初始化地图对象
-        创建砖块组和铁块组，并在地图上放置相应的障碍物
-        """
-        # 创建精灵组
-        self.brickGroup = pygame.sprite.Group()  # 砖块组
-        self.ironGroup  = pygame.sprite.Group()  # 铁块组
         
-        # 定义地图布局
-        # 第一、三、七、九列砖块的位置
-        X1379 = [2, 3, 6, 7, 18, 19, 22, 23]
-        Y1379 = [2, 3, 4, 5, 6, 7, 8, 9, 10, 17, 18, 19, 20, 21, 22, 23]
-        # 第二、八列砖块的位置
-        X28 = [10, 11, 14, 15]
-        Y28 = [2, 3, 4, 5, 6, 7, 8, 11, 12, 15, 16, 17, 18, 19, 20]
-        # 第四、六列砖块的位置
-        X46 = [4, 5, 6, 7, 18, 19, 20, 21]
-        Y46 = [13, 14]
-        # 第五列砖块的位置
-        X5  = [12, 13]
-        Y5  = [16, 17]
-        # 基地周围的砖块位置
-        X0Y0 = [(11,23),(12,23),(13,23),(14,23),(11,24),(14,24),(11,25),(14,25)]
-
-        # 放置第一、三、七、九列的砖块
-        for x in X1379:
-            for y in Y1379:
-                self._place_brick(x, y)
-        
-        # 放置第二、八列的砖块
-        for x in X28:
-            for y in Y28:
-                self._place_brick(x, y)
-        
-        # 放置第四、六列的砖块
-        for x in X46:
-            for y in Y46:
-                self._place_brick(x, y)
-        
-        # 放置第五列的砖块
-        for x in X5:
-            for y in Y5:
-                self._place_brick(x, y)
-        
-        # 放置基地周围的砖块
-        for x, y in X0Y0:
-            self._place_brick(x, y)
+        参数:
+            width: 地图宽度（格子数）
+            height: 地图高度（格子数）
+            grid: 初始的格子类型（长度为width * height的bytes），默认为空地图，
+                  地图文件的加载见levels.load_map()
+        """
+        # 创建格子占用表
+        # 使用者各自记录读到的位置（从地图创建起的变化总数），通过changes_since()只处理新发生变化的格子
+        # 记录超过MAX_CHANGES条时丢弃较早的一半，落后太多的使用者需要重新处理整张地图
+        self.width = width
+        self.height = height
+        # 坦克和子弹可以活动的区域，以及包括边框在内的整个地图的像素大小
+        self.rect = pygame.Rect(BORDER, BORDER, width * TILE_SIZE, height * TILE_SIZE)
+        self.size = (width * TILE_SIZE + 2 * BORDER, height * TILE_SIZE + 2 * BORDER)
+        # 基地在底部中间，左上角所在的格子；26x26的地图中为(12, 24)
+        self.home = (width // 2 - 1, height - 2)
+        self.home_rect = self.cell_rect(self.home[0], self.home[1], 2, 2)  # 基地的像素矩形
+        if grid is None:
+            self.grid = bytearray(width * height)  # 每个格子的类型
+        else:
+            if len(grid) != width * height:
+                raise ValueError('地图大小不匹配: %d != %d x %d' % (len(grid), width, height))
+            self.grid = bytearray(grid)
+        self.changes = []  # 按发生顺序记录发生变化的格子下标
+        self.changes_base = 0  # 已丢弃的变化记录数，changes[0]是第changes_base次变化
+
+    def cell_rect(self, x, y, width=1, height=1):
+        """
+        获取格子的像素矩形
+
+        参数:
+            x: x坐标
+            y: y坐标
+            width: 宽度（格子数）
+            height: 高度（格子数）
+
+        返回:
+            pygame.Rect: 像素坐标的矩形
+        """
+        return pygame.Rect(BORDER + x * TILE_SIZE, BORDER + y * TILE_SIZE,
+                           width * TILE_SIZE, height * TILE_SIZE)
+
+    def home_wall(self):
+        """
+        获取基地周围墙壁的格子
+
+        返回:
+            list: (x, y)坐标列表
+        """
+        x, y = self.home
+        return [(x - 1, y - 1), (x, y - 1), (x + 1, y - 1), (x + 2, y - 1),
+                (x - 1, y), (x + 2, y), (x - 1, y + 1), (x + 2, y + 1)]
+
+    def player_start(self, number):
+        """
+        获取我方坦克的出生位置：基地左右两侧各4格
+
+        参数:
+            number: 玩家编号（1或2）
+
+        返回:
+            tuple: 坦克左上角的像素坐标
+        """
+        x, y = self.home
+        return self.cell_rect(x - 4 if number == 1 else x + 4, y).topleft
+
+    def enemy_start(self, x):
+        """
+        获取敌方坦克的出生位置：地图顶部的左、中、右三处
+
+        参数:
+            x: 出生位置编号（0-2）
+
+        返回:
+            tuple: 坦克左上角的像素坐标
+        """
+        return self.cell_rect((0, self.width // 2 - 1, self.width - 2)[x], 0).topleft
+
+    def place_tile(self, x, y, kind):
+        """
+        在指定位置放置指定类型的格子，替换原有的格子；已经是该类型时不做任何改变
         
-        # 放置铁块
-        iron_positions = [(0,14),(1,14),(12,6),(13,6),(12,7),(13,7),(24,14),(25,14)]
-        for x, y in iron_positions:
-            self._place_iron(x, y)
+        参数:
+            x: x坐标
+            y: y坐标
+            kind: 格子类型
+        """
+        index = y * self.width + x
+        if self.grid[index] != kind:
+            self._set_tile(index, kind)
 
-    def _place_brick(self, x, y):
+    def place_brick(self, x, y):
         """
         在指定位置放置砖块
+        如果该位置已经有砖块或铁块，则将其替换；已经是砖块时不做任何改变
         
         参数:
             x: x坐标
             y: y坐标
         """
-        self.brick = Brick()
-        self.brick.rect.left, self.brick.rect.top = 3 + x * 24, 3 + y * 24
-        self.brickGroup.add(self.brick)
+        index = y * self.width + x
+        if self.grid[index] != BRICK:
+            self._set_tile(index, BRICK)
 
-    def _place_iron(self, x, y):
+    def place_iron(self, x, y):
         """
         在指定位置放置铁块
+        如果该位置已经有砖块或铁块，则将其替换；已经是铁块时不做任何改变
         
         参数:
             x: x坐标
             y: y坐标
         """
-        self.iron = Iron()
-        self.iron.rect.left, self.iron.rect.top = 3 + x * 24, 3 + y * 24
-        self.ironGroup.add(self.iron)
+        index = y * self.width + x
+        if self.grid[index] != IRON:
+            self._set_tile(index, IRON)
+
+    def remove_tile(self, x, y):
+        """
+        移除指定位置的格子
+        
+        参数:
+            x: x坐标
+            y: y坐标
+        """
+        index = y * self.width + x
+        if self.grid[index] != EMPTY:
+            self._set_tile(index, EMPTY)
+
+    @property
+    def change_count(self):
+        """
+        从地图创建起发生变化的总次数，作为使用者读到的位置
+        """
+        return self.changes_base + len(self.changes)
+
+    def changes_since(self, cursor):
+        """
+        获取某个位置之后发生变化的格子
+
+        参数:
+            cursor: 上次读到的位置（当时的change_count）
+
+        返回:
+            list: 格子下标，按发生顺序排列；较早的记录已经丢弃时返回None，
+                  使用者需要重新处理整张地图
+        """
+        start = cursor - self.changes_base
+        if start < 0:
+            return None
+        return self.changes[start:]
+
+    def get_state(self):
+        """
+        获取地图的状态，用于保存和恢复游戏
+        
+        返回:
+            bytes: 格子占用表的副本
+        """
+        return bytes(self.grid)
+
+    def set_state(self, state):
+        """
+        恢复get_state()返回的地图状态
+        只更新与当前地图不同的格子
+        
+        参数:
+            state: 格子占用表
+        """
+        grid = self.grid
+        for index, kind in enumerate(state):
+            if grid[index] != kind:
+                self._set_tile(index, kind)
+
+    def _set_tile(self, index, kind):
+        """
+        更新格子占用表中的一个格子
+        
+        参数:
+            index: 格子下标
+            kind: 格子类型
+        """
+        self.grid[index] = kind
+        changes = self.changes
+        changes.append(index)
+        if len(changes) > MAX_CHANGES:
+            del changes[:MAX_CHANGES // 2]
+            self.changes_base += MAX_CHANGES // 2
+
+    def rect_cells(self, rect):
+        """
+        获取矩形覆盖的所有格子
+        只计算矩形所在的几个格子，超出地图的部分被忽略
+        
+        参数:
+            rect: 像素坐标的矩形
+            
+        返回:
+            list: 格子下标列表
+        """
+        left = max((rect.left - BORDER) // TILE_SIZE, 0)
+        right = min((rect.right - 1 - BORDER) // TILE_SIZE, self.width - 1)
+        top = max((rect.top - BORDER) // TILE_SIZE, 0)
+        bottom = min((rect.bottom - 1 - BORDER) // TILE_SIZE, self.height - 1)
+        width = self.width
+        return [y * width + x for y in range(top, bottom + 1) for x in range(left, right + 1)]
+
+    def collide(self, rect):
+        """
+        检查矩形是否与砖块或铁块重叠，用于坦克的碰撞检测
+        
+        参数:
+            rect: 像素坐标的矩形
+            
+        返回:
+            bool: 是否发生碰撞
+        """
+        grid = self.grid
+        for index in self.rect_cells(rect):
+            if TANK_SOLID[grid[index]]:
+                return True
+        return False
+
+    def hit(self, rect, strong=False):
+        """
+        处理子弹与墙壁的碰撞
+        子弹覆盖的砖块被摧毁，铁块只有在子弹具有穿墙能力时才被摧毁
+        
+        参数:
+            rect: 子弹的矩形
+            strong: 子弹是否具有穿墙能力
+            
+        返回:
+            bool: 是否发生碰撞
+        """
+        grid = self.grid
+        hit = False
+        for index in self.rect_cells(rect):
+            kind = grid[index]
+            if kind == BRICK or (kind == IRON and strong):
+                self._set_tile(index, EMPTY)
+                hit = True
+            elif kind == IRON:
+                hit = True
+        return hit
 
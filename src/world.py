@@ -0,0 +1,809 @@
+# -*- coding: utf-8 -*-
+"""
+游戏世界模块
+将游戏的全部状态和每一帧的逻辑从main()中抽离出来，包括：
+1. 我方坦克的移动和射击
+2. 敌方坦克的出现、移动和射击
+3. 子弹的碰撞检测
+4. 道具系统
+5. 基地和游戏结束状态
+
+World.step()只推进一帧的游戏逻辑，不涉及显示、音效和帧率控制，
+因此既可以被main.py的界面循环驱动，也可以在无界面环境下以最快速度运行
+"""
+
+import os
+import random
+import zlib
+import array
+import pygame
+import myTank
+import enemyTank
+import food
+import bulletClass
+import spatial
+import flowfield
+import levels
+import pool
+import profiler
+
+# 默认地图中基地的位置和大小，其他大小的地图见wall.Map.home_rect
+HOME_RECT = (3 + 12 * 24, 3 + 24 * 24, 48, 48)
+
+# 默认地图中基地周围墙壁的位置，其他大小的地图见wall.Map.home_wall()
+HOME_WALL = [(11,23),(12,23),(13,23),(14,23),(11,24),(14,24),(11,25),(14,25)]
+
+# 离所有我方坦克都很远的敌方坦克降低更新频率：
+# 每FAR_INTERVAL帧移动一次，每次移动FAR_INTERVAL帧的距离
+# 距离按横向、纵向距离中较大的一个计算，默认地图中任意两辆坦克的距离都小于FAR_DISTANCE
+FAR_DISTANCE = 720
+FAR_INTERVAL = 4
+
+# 玩家输入位掩码
+# 玩家一：WASD移动，J射击
+P1_UP    = 1 << 0
+P1_DOWN  = 1 << 1
+P1_LEFT  = 1 << 2
+P1_RIGHT = 1 << 3
+P1_FIRE  = 1 << 4
+# 玩家二：方向键移动，小键盘0射击
+P2_UP    = 1 << 5
+P2_DOWN  = 1 << 6
+P2_LEFT  = 1 << 7
+P2_RIGHT = 1 << 8
+P2_FIRE  = 1 << 9
+# 单次触发的命令（对应main.py中的按键）
+CMD_P1_LEVEL_UP   = 1 << 10  # E键升级一号坦克
+CMD_P1_LEVEL_DOWN = 1 << 11  # Q键降级一号坦克
+CMD_P1_LEVEL_MAX  = 1 << 12  # 3键直接升到3级
+CMD_P1_SPEED      = 1 << 13  # 2键切换一号坦克速度
+CMD_BRICK_HOME    = 1 << 14  # 1键创建砖墙
+CMD_IRON_HOME     = 1 << 15  # 4键创建铁墙
+CMD_P2_LEVEL_UP   = 1 << 16  # 小键盘1升级二号坦克
+CMD_P2_LEVEL_DOWN = 1 << 17  # 小键盘2降级二号坦克
+CMD_P2_LEVEL_MAX  = 1 << 18  # 小键盘3直接升到3级
+CMD_P2_SPEED      = 1 << 19  # 小键盘4切换二号坦克速度
+
+# 各玩家的方向输入，顺序即按键优先级（上、下、左、右）
+P1_MOVES = (P1_UP, P1_DOWN, P1_LEFT, P1_RIGHT)
+P2_MOVES = (P2_UP, P2_DOWN, P2_LEFT, P2_RIGHT)
+
+# 定时事件
+EVENT_SPAWN         = 0  # 创建敌方坦克（原DELAYEVENT）
+EVENT_ENEMY_RELOAD  = 1  # 敌方子弹冷却结束（原ENEMYBULLETNOTCOOLINGEVENT）
+EVENT_PLAYER_RELOAD = 2  # 我方子弹冷却结束（原MYBULLETNOTCOOLINGEVENT）
+EVENT_UNFREEZE      = 3  # 敌方坦克恢复移动（原NOTMOVEEVENT）
+
+# 固定步长模式下的帧率，以及各定时事件的间隔（帧数）
+# 间隔由原来的毫秒数按每秒60帧换算
+TICKS_PER_SECOND = 60
+EVENT_TICKS = [
+    (EVENT_SPAWN, 12),          # 200毫秒
+    (EVENT_ENEMY_RELOAD, 60),   # 1000毫秒
+    (EVENT_PLAYER_RELOAD, 12),  # 200毫秒
+    (EVENT_UNFREEZE, 480),      # 8000毫秒
+]
+
+# 敌方坦克的移动方式
+ENEMY_AI_RANDOM = 0  # 碰撞时随机改变方向（原版）
+ENEMY_AI_FLOW   = 1  # 沿共用的流场朝基地前进
+
+# 快照中保存的World标量属性
+STATE_FIELDS = ('tick', 'enemyNumber', 'moving', 'movdir', 'moving2', 'movdir2',
+                'running_T1', 'running_T2', 'delay', 'enemyCouldMove',
+                'switch_R1_R2_image', 'homeSurvive', 'game_over')
+
+# 音效提示
+SOUND_BANG = 'bang'
+SOUND_FIRE = 'fire'
+
+
+def init_headless():
+    """
+    初始化无界面运行环境
+    使用SDL的dummy视频驱动创建一个1x1的窗口，
+    使精灵在没有显示器的环境中也能加载和转换图片
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.display.init()
+    if pygame.display.get_surface() is None:
+        pygame.display.set_mode((1, 1))
+
+
+class World():
+    """
+    游戏世界类
+    保存一局游戏的全部状态，并通过step()逐帧推进
+    """
+    def __init__(self, players=1, max_enemies=4, seed=None, fixed_timestep=False,
+                 enemy_ai=ENEMY_AI_RANDOM, level=levels.DEFAULT_LEVEL):
+        """
+        初始化游戏世界
+        指定seed并开启fixed_timestep后，一局游戏的结果只由种子和每帧的输入决定，
+        与实际运行的帧率无关
+
+        参数:
+            players: 玩家人数（1或2）
+            max_enemies: 场上敌方坦克的数量上限
+            seed: 随机数种子，指定后所有随机数都来自本局独立的生成器，
+                  否则使用全局的random模块
+            fixed_timestep: 是否按帧数触发定时事件，
+                            否则由调用者通过step()的events参数传入
+            enemy_ai: 敌方坦克的移动方式（ENEMY_AI_*）
+            level: 关卡名，见levels模块
+        """
+        self.players = players
+        self.max_enemies = max_enemies
+        self.seed = seed
+        self.fixed_timestep = fixed_timestep
+        self.enemy_ai = enemy_ai
+        self.level = level
+        self.random = random.Random(seed) if seed is not None else random
+
+        # 定义精灵组
+        self.allTankGroup = spatial.SpatialGroup()     # 所有坦克组（带空间哈希）
+        self.mytankGroup = pygame.sprite.Group()       # 我方坦克组
+        self.allEnemyGroup = pygame.sprite.Group()     # 所有敌方坦克组
+        self.redEnemyGroup = pygame.sprite.Group()     # 红色敌方坦克组
+        self.greenEnemyGroup = pygame.sprite.Group()   # 绿色敌方坦克组
+        self.otherEnemyGroup = pygame.sprite.Group()   # 其他敌方坦克组
+        self.enemyBulletGroup = pygame.sprite.Group()  # 敌方子弹组
+
+        # 对象池：被消灭的敌方坦克、用完的子弹和上一局的道具放回池中，之后重置后复用
+        self.enemyPool = pool.Pool(enemyTank.EnemyTank, 'enemy')
+        self.bulletPool = pool.Pool(bulletClass.Bullet, 'bullet')
+        self.foodPool = pool.Pool(food.Food, 'food')
+        self.orphans = set()  # 坦克已被消灭但仍在敌方子弹组中的子弹
+        self.prop = None
+        # 分阶段计时（profiler.Profiler），为None时不计时
+        self.profiler = None
+
+        self.reset()
+
+    def reset(self, seed=None):
+        """
+        重置游戏状态
+        清空所有精灵组，重新初始化游戏对象
+        
+        参数:
+            seed: 新一局的随机数种子，默认继续使用当前的随机数生成器
+        """
+        if seed is not None:
+            self.seed = seed
+            self.random = random.Random(seed)
+
+        # 回收上一局的对象并清空所有精灵组
+        self._recycle()
+        if self.prop is not None:
+            self.foodPool.release(self.prop)
+
+        # 重置地图和食物/道具
+        self.bgMap = levels.load_map(self.level)
+        self.prop = self.foodPool.acquire(self.random)
+        # 流场由地图计算，地图变化时在step()中更新，不属于需要保存的状态
+        self.flowField = flowfield.FlowField(self.bgMap) if self.enemy_ai == ENEMY_AI_FLOW else None
+
+        # 重置我方坦克
+        self.myTank_T1 = myTank.MyTank(1)
+        self.myTank_T1.rect.topleft = self.bgMap.player_start(1)
+        self.allTankGroup.add(self.myTank_T1)
+        self.mytankGroup.add(self.myTank_T1)
+        self.myTank_T2 = None
+        if self.players == 2:  # 双人模式才创建二号坦克
+            self.myTank_T2 = myTank.MyTank(2)
+            self.myTank_T2.rect.topleft = self.bgMap.player_start(2)
+            self.allTankGroup.add(self.myTank_T2)
+            self.mytankGroup.add(self.myTank_T2)
+
+        # 玩家控制变量
+        self.moving = 0    # 玩家1移动控制
+        self.movdir = 0    # 玩家1移动方向
+        self.moving2 = 0   # 玩家2移动控制
+        self.movdir2 = 0   # 玩家2移动方向
+        self.running_T1 = True  # 玩家1坦克动画状态
+        self.running_T2 = True  # 玩家2坦克动画状态
+
+        # 其他游戏变量
+        self.delay = 100  # 动画延迟
+        self.enemyCouldMove = True  # 敌方坦克是否可以移动
+        self.switch_R1_R2_image = True  # 坦克动画切换
+        self.homeSurvive = True  # 基地是否存活
+        self.game_over = False  # 游戏是否结束
+        self.tick = 0  # 已推进的帧数
+        self.sounds = []  # 本帧产生的音效
+
+        # 本局统计，不属于游戏状态，不保存在快照中
+        self.kills = [0] * 5    # 按类型统计消灭的敌方坦克，下标为坦克类型
+        self.spawned = [0] * 5  # 按类型统计出现的敌方坦克
+        self.redSpawned = 0     # 出现的红色（携带道具）敌方坦克
+        self.pickups = [0] * 8  # 按类型统计拾取的道具，下标为道具类型
+
+        # 创建敌方坦克
+        self.enemyNumber = 3
+        for i in range(1, 4):
+            self._spawn_enemy(self._new_enemy(i))
+
+    def snapshot(self, include_map=True):
+        """
+        获取游戏世界的完整状态
+        快照只包含数字、布尔值和字节串，不引用任何精灵对象，
+        可以用restore()恢复到同一个或另一个World对象
+
+        参数:
+            include_map: 是否复制地图，为False时快照中的地图为None，由调用者另外保存
+
+        返回:
+            dict: 游戏状态
+        """
+        players = [(tank.get_state(), tank.bullet.get_state())
+                   for tank in (self.myTank_T1, self.myTank_T2) if tank is not None]
+        enemies = []
+        owned = set()
+        for each in self.allEnemyGroup:
+            enemies.append((each.get_state(), each.bullet.get_state(),
+                            self.enemyBulletGroup.has(each.bullet)))
+            owned.add(each.bullet)
+        # 坦克被消灭后仍留在敌方子弹组中的子弹，组内顺序不影响游戏逻辑，排序后保存
+        orphans = sorted(each.get_state() for each in self.enemyBulletGroup if each not in owned)
+        return {
+            'fields': tuple(getattr(self, name) for name in STATE_FIELDS),
+            'map': self.bgMap.get_state() if include_map else None,
+            'prop': self.prop.get_state(),
+            'players': players,
+            'enemies': enemies,
+            'orphans': orphans,
+            'random': self.random.getstate() if self.seed is not None else None,
+        }
+
+    def restore(self, state):
+        """
+        恢复snapshot()返回的游戏状态
+        地图只更新不同的格子，坦克、子弹和道具按快照重新创建
+
+        参数:
+            state: 游戏状态
+        """
+        self._recycle()
+
+        for name, value in zip(STATE_FIELDS, state['fields']):
+            setattr(self, name, value)
+        self.bgMap.set_state(state['map'])
+        self.prop.set_state(state['prop'])
+        if state['random'] is not None:
+            self.random.setstate(state['random'])
+
+        # 恢复我方坦克
+        tanks = []
+        for number, (tank_state, bullet_state) in enumerate(state['players'], 1):
+            tank = myTank.MyTank(number)
+            tank.set_state(tank_state)
+            tank.bullet.set_state(bullet_state)
+            self.allTankGroup.add(tank)
+            self.mytankGroup.add(tank)
+            tanks.append(tank)
+        self.myTank_T1 = tanks[0]
+        self.myTank_T2 = tanks[1] if len(tanks) > 1 else None
+
+        # 恢复敌方坦克和子弹
+        for tank_state, bullet_state, in_group in state['enemies']:
+            enemy = self._new_enemy(tank_state[0] + 1, tank_state[1], bool(tank_state[2]))
+            enemy.set_state(tank_state)
+            enemy.bullet.set_state(bullet_state)
+            self._add_enemy(enemy)
+            if in_group:
+                self.enemyBulletGroup.add(enemy.bullet)
+        for bullet_state in state['orphans']:
+            bullet = self.bulletPool.acquire()
+            bullet.set_state(bullet_state)
+            self.enemyBulletGroup.add(bullet)
+            self.orphans.add(bullet)
+        self.sounds = []
+
+    def checksum(self):
+        """
+        计算当前状态的校验和
+        用于回放时检查重新模拟的结果是否与录制时一致
+
+        返回:
+            int: 32位校验和
+        """
+        values = [self.tick, self.enemyNumber, self.homeSurvive, self.game_over,
+                  self.enemyCouldMove, self.moving, self.moving2, self.delay]
+        values.extend(self.prop.get_state())
+        for tank in self.mytankGroup:
+            values.extend((tank.rect.left, tank.rect.top, tank.level, tank.speed,
+                           tank.bullet.rect.left, tank.bullet.rect.top, tank.bullet.life))
+        for tank in self.allEnemyGroup:
+            values.extend((tank.rect.left, tank.rect.top, tank.dir_x, tank.dir_y, tank.life,
+                           tank.bullet.rect.left, tank.bullet.rect.top, tank.bullet.life))
+        return zlib.crc32(array.array('i', values).tobytes(), zlib.crc32(self.bgMap.grid))
+
+    def _recycle(self):
+        """
+        把场上的敌方坦克和子弹放回对象池，并清空所有精灵组
+        """
+        for enemy in self.allEnemyGroup:
+            self.enemyPool.release(enemy)
+            self.bulletPool.release(enemy.bullet)
+        for bullet in self.orphans:
+            self.bulletPool.release(bullet)
+        self.orphans.clear()
+
+        self.allTankGroup.empty()
+        self.mytankGroup.empty()
+        self.allEnemyGroup.empty()
+        self.redEnemyGroup.empty()
+        self.greenEnemyGroup.empty()
+        self.otherEnemyGroup.empty()
+        self.enemyBulletGroup.empty()
+
+    def _new_enemy(self, x=None, kind=None, isred=None):
+        """
+        从对象池获取一辆敌方坦克，参数与enemyTank.EnemyTank相同
+
+        返回:
+            enemyTank.EnemyTank: 新的或重置后的敌方坦克
+        """
+        return self.enemyPool.acquire(x, kind, isred, rng=self.random, bullet=self.bulletPool.acquire())
+
+    def _release_enemy(self, enemy):
+        """
+        把已经离开精灵组的敌方坦克放回对象池
+        坦克的子弹如果还在敌方子弹组中，等它离开子弹组后再回收
+
+        参数:
+            enemy: 敌方坦克对象
+        """
+        self.enemyPool.release(enemy)
+        if self.enemyBulletGroup.has(enemy.bullet):
+            self.orphans.add(enemy.bullet)
+        else:
+            self.bulletPool.release(enemy.bullet)
+
+    def pool_stats(self):
+        """
+        获取各对象池的统计信息
+
+        返回:
+            dict: 对象池名称 -> pool.Pool.stats()
+        """
+        return {each.name: each.stats() for each in (self.enemyPool, self.bulletPool, self.foodPool)}
+
+    def _add_enemy(self, enemy):
+        """
+        将敌方坦克加入对应的精灵组
+
+        参数:
+            enemy: 敌方坦克对象
+        """
+        self.allTankGroup.add(enemy)
+        self.allEnemyGroup.add(enemy)
+        if enemy.isred:
+            self.redEnemyGroup.add(enemy)
+        elif enemy.kind == 3:
+            self.greenEnemyGroup.add(enemy)
+        else:
+            self.otherEnemyGroup.add(enemy)
+
+    def _spawn_enemy(self, enemy):
+        """
+        新出现一辆敌方坦克：放到出生位置，加入精灵组并计入本局统计
+
+        参数:
+            enemy: 敌方坦克对象
+        """
+        enemy.rect.topleft = self.bgMap.enemy_start(enemy.x)
+        self._add_enemy(enemy)
+        self.spawned[enemy.kind] += 1
+        self.redSpawned += enemy.isred
+
+    def step(self, inputs=0, events=()):
+        """
+        推进一帧游戏逻辑
+
+        参数:
+            inputs: 本帧的玩家输入位掩码（P1_*、P2_*和CMD_*的组合）
+            events: 本帧触发的定时事件（EVENT_*），固定步长模式下由World自己产生
+
+        返回:
+            list: 本帧产生的音效提示（SOUND_*）
+        """
+        self.sounds = []
+        if self.game_over:
+            return self.sounds
+
+        if self.fixed_timestep:
+            events = [event for event, ticks in EVENT_TICKS if (self.tick + 1) % ticks == 0]
+        for event in events:
+            self._handle_event(event)
+        if inputs:
+            self._handle_commands(inputs)
+
+        # 上一帧已经显示过一次移动动画，本帧重新移动时才再次显示
+        if self.switch_R1_R2_image:
+            self.running_T1 = self.running_T2 = False
+        self._update_player1(inputs)
+        if self.myTank_T2 is not None:
+            self._update_player2(inputs)
+        if self.profiler is not None:
+            self.profiler.mark(profiler.PHASE_PLAYERS)
+
+        # 坦克动画切换
+        if not (self.delay % 5):
+            self.switch_R1_R2_image = not self.switch_R1_R2_image
+
+        self._update_enemies()
+        if self.profiler is not None:
+            self.profiler.mark(profiler.PHASE_ENEMIES)
+        self._update_player1_bullet()
+        if self.myTank_T2 is not None:
+            self._update_player2_bullet()
+        self._update_enemy_bullets()
+        if self.profiler is not None:
+            self.profiler.mark(profiler.PHASE_BULLETS)
+        self._update_food()
+        if self.profiler is not None:
+            self.profiler.mark(profiler.PHASE_FOOD)
+
+        # 更新动画延迟
+        self.delay -= 1
+        if not self.delay:
+            self.delay = 100
+        self.tick += 1
+        return self.sounds
+
+    def _handle_event(self, event):
+        """
+        处理定时事件
+
+        参数:
+            event: 定时事件（EVENT_*）
+        """
+        if event == EVENT_PLAYER_RELOAD:  # 我方子弹冷却
+            self.myTank_T1.bulletNotCooling = True
+        elif event == EVENT_ENEMY_RELOAD:  # 敌方子弹冷却
+            for each in self.allEnemyGroup:
+                each.bulletNotCooling = True
+        elif event == EVENT_UNFREEZE:  # 敌方坦克恢复移动
+            self.enemyCouldMove = True
+        elif event == EVENT_SPAWN:  # 创建敌方坦克
+            if self.enemyNumber < self.max_enemies:
+                enemy = self._new_enemy()
+                enemy.rect.topleft = self.bgMap.enemy_start(enemy.x)
+                if self.allTankGroup.collide(enemy.rect):
+                    # 出生位置被占用，坦克直接放回对象池
+                    self.enemyPool.release(enemy)
+                    self.bulletPool.release(enemy.bullet)
+                    return
+                self._spawn_enemy(enemy)
+                self.enemyNumber += 1
+
+    def _handle_commands(self, inputs):
+        """
+        处理单次触发的按键命令
+
+        参数:
+            inputs: 本帧的玩家输入位掩码
+        """
+        tank = self.myTank_T1
+        if inputs & CMD_P1_LEVEL_UP:
+            tank.levelUp()
+        if inputs & CMD_P1_LEVEL_DOWN:
+            tank.levelDown()
+        if inputs & CMD_P1_LEVEL_MAX:
+            tank.levelUp()
+            tank.levelUp()
+            tank.level = 3
+        if inputs & CMD_P1_SPEED:
+            tank.speed = 6 if tank.speed == 3 else 3
+        if inputs & CMD_BRICK_HOME:
+            for x, y in self.bgMap.home_wall():
+                self.bgMap.place_brick(x, y)
+        if inputs & CMD_IRON_HOME:
+            for x, y in self.bgMap.home_wall():
+                self.bgMap.place_iron(x, y)
+
+        # 二号坦克控制
+        tank = self.myTank_T2
+        if tank is None:
+            return
+        if inputs & CMD_P2_LEVEL_UP:
+            tank.levelUp()
+        if inputs & CMD_P2_LEVEL_DOWN:
+            tank.levelDown()
+        if inputs & CMD_P2_LEVEL_MAX:
+            tank.levelUp()
+            tank.levelUp()
+            tank.level = 3
+        if inputs & CMD_P2_SPEED:
+            tank.speed = 6 if tank.speed == 3 else 3
+
+    def _move_tank(self, tank, movdir):
+        """
+        按方向移动我方坦克，并更新坦克在空间哈希中的位置
+
+        参数:
+            tank: 我方坦克对象
+            movdir: 移动方向（0:上, 1:下, 2:左, 3:右）
+
+        返回:
+            bool: 是否发生碰撞
+        """
+        if movdir == 0:
+            blocked = tank.moveUp(self.allTankGroup, self.bgMap)
+        elif movdir == 1:
+            blocked = tank.moveDown(self.allTankGroup, self.bgMap)
+        elif movdir == 2:
+            blocked = tank.moveLeft(self.allTankGroup, self.bgMap)
+        else:
+            blocked = tank.moveRight(self.allTankGroup, self.bgMap)
+        self.allTankGroup.reindex(tank)
+        return blocked
+
+    def _update_player1(self, inputs):
+        """
+        处理玩家一的移动和射击
+
+        参数:
+            inputs: 本帧的玩家输入位掩码
+        """
+        tank = self.myTank_T1
+        if self.moving:
+            self.moving -= 1
+            if self._move_tank(tank, self.movdir):
+                self.moving += 1
+            self.running_T1 = True
+
+        if not self.moving:
+            for movdir, key in enumerate(P1_MOVES):
+                if inputs & key:
+                    self.moving = 7
+                    self.movdir = movdir
+                    self.running_T1 = True
+                    if self._move_tank(tank, movdir):
+                        self.moving = 0
+                    break
+
+        if inputs & P1_FIRE:  # 发射子弹
+            if not tank.bullet.life and tank.bulletNotCooling:
+                self.sounds.append(SOUND_FIRE)
+                tank.shoot()
+                tank.bulletNotCooling = False
+
+    def _update_player2(self, inputs):
+        """
+        处理玩家二的移动和射击（仅在双人模式下）
+
+        参数:
+            inputs: 本帧的玩家输入位掩码
+        """
+        tank = self.myTank_T2
+        if self.moving2:
+            self.moving2 -= 1
+            self._move_tank(tank, self.movdir2)
+            self.running_T2 = True
+
+        if not self.moving2:
+            for movdir, key in enumerate(P2_MOVES):
+                if inputs & key:
+                    self._move_tank(tank, movdir)
+                    self.moving2 = 7
+                    self.movdir2 = movdir
+                    self.running_T2 = True
+                    break
+
+        if inputs & P2_FIRE:  # 发射子弹
+            if not tank.bullet.life:
+                tank.shoot()
+
+    def _update_enemies(self):
+        """
+        处理敌方坦克的出现动画和移动
+        """
+        flowField = self.flowField
+        if flowField is not None:
+            flowField.update(self.bgMap)
+        players = [tank.rect for tank in self.mytankGroup]
+        far_tick = self.tick % FAR_INTERVAL == 0
+        for each in self.allEnemyGroup:
+            if each.flash:
+                if self.enemyCouldMove:
+                    rect = each.rect
+                    if all(max(abs(rect.x - other.x), abs(rect.y - other.y)) > FAR_DISTANCE for other in players):
+                        # 远处的坦克隔几帧才移动一次
+                        if not far_tick:
+                            continue
+                        each.move(self.allTankGroup, self.bgMap, flowField, FAR_INTERVAL)
+                    else:
+                        each.move(self.allTankGroup, self.bgMap, flowField)
+                    self.allTankGroup.reindex(each)
+            else:
+                # 出现动画计时
+                if each.times > 0:
+                    each.times -= 1
+                if each.times == 0:
+                    each.flash = True
+
+    def _count_kills(self, killed):
+        """
+        按类型统计被消灭的敌方坦克，并把它们放回对象池
+
+        参数:
+            killed: 被消灭的敌方坦克列表
+
+        返回:
+            list: 原样返回killed，便于在条件判断中使用
+        """
+        for each in killed:
+            self.kills[each.kind] += 1
+            self._release_enemy(each)
+        return killed
+
+    def _hit_walls(self, bullet):
+        """
+        处理子弹与砖块、铁块的碰撞
+
+        参数:
+            bullet: 子弹对象
+
+        返回:
+            bool: 是否发生碰撞
+        """
+        if self.bgMap.hit(bullet.rect, bullet.strong):
+            bullet.life = False
+            return True
+        return False
+
+    def _hit_home(self, bullet):
+        """
+        处理子弹与基地的碰撞
+
+        参数:
+            bullet: 子弹对象
+        """
+        if self.homeSurvive and bullet.rect.colliderect(self.bgMap.home_rect):
+            self.homeSurvive = False
+            bullet.life = False
+            self.game_over = True
+            self.sounds.append(SOUND_BANG)
+
+    def _update_player1_bullet(self):
+        """
+        移动玩家一的子弹并处理碰撞
+        """
+        bullet = self.myTank_T1.bullet
+        if not bullet.life:
+            return
+        bullet.move(self.bgMap.rect)
+
+        # 子弹与子弹碰撞
+        for each in self.enemyBulletGroup:
+            if each.life:
+                if pygame.sprite.collide_rect(bullet, each):
+                    bullet.life = False
+                    each.life = False
+                    for hit in pygame.sprite.spritecollide(bullet, self.enemyBulletGroup, True, None):
+                        if hit in self.orphans:
+                            self.orphans.discard(hit)
+                            self.bulletPool.release(hit)
+
+        # 子弹与敌方坦克碰撞
+        killed = pygame.sprite.spritecollide(bullet, self.redEnemyGroup, True, None)
+        if killed:
+            self._count_kills(killed)
+            self.prop.change()
+            self.sounds.append(SOUND_BANG)
+            self.enemyNumber -= 1
+            bullet.life = False
+        elif pygame.sprite.spritecollide(bullet, self.greenEnemyGroup, False, None):
+            for each in self.greenEnemyGroup:
+                if pygame.sprite.collide_rect(bullet, each):
+                    if each.life == 1:
+                        self._count_kills(pygame.sprite.spritecollide(bullet, self.greenEnemyGroup, True, None))
+                        self.sounds.append(SOUND_BANG)
+                        self.enemyNumber -= 1
+                    elif each.life == 2:
+                        each.life -= 1
+                        each.tank = each.enemy_3_0
+                    elif each.life == 3:
+                        each.life -= 1
+                        each.tank = each.enemy_3_2
+            bullet.life = False
+        elif self._count_kills(pygame.sprite.spritecollide(bullet, self.otherEnemyGroup, True, None)):
+            self.sounds.append(SOUND_BANG)
+            self.enemyNumber -= 1
+            bullet.life = False
+
+        # 子弹与砖块、铁块碰撞
+        if self._hit_walls(bullet):
+            bullet.rect.left, bullet.rect.right = 3 + 12 * 24, 3 + 24 * 24
+
+        # 子弹与基地碰撞
+        self._hit_home(bullet)
+
+    def _update_player2_bullet(self):
+        """
+        移动玩家二的子弹并处理碰撞
+        """
+        bullet = self.myTank_T2.bullet
+        if not bullet.life:
+            return
+        bullet.move(self.bgMap.rect)
+
+        # 子弹与敌方坦克碰撞
+        if self._count_kills(pygame.sprite.spritecollide(bullet, self.allEnemyGroup, True, None)):
+            self.sounds.append(SOUND_BANG)
+            self.enemyNumber -= 1
+            bullet.life = False
+
+        # 子弹与砖块、铁块碰撞
+        if self._hit_walls(bullet):
+            bullet.rect.left, bullet.rect.right = 3 + 12 * 24, 3 + 24 * 24
+
+        # 子弹与基地碰撞
+        self._hit_home(bullet)
+
+    def _update_enemy_bullets(self):
+        """
+        处理敌方坦克的射击、子弹移动和碰撞
+        """
+        for each in self.allEnemyGroup:
+            # 如果子弹没有生命，则赋予子弹生命
+            if not each.bullet.life and each.bulletNotCooling and self.enemyCouldMove:
+                self.enemyBulletGroup.remove(each.bullet)
+                each.shoot()
+                self.enemyBulletGroup.add(each.bullet)
+                each.bulletNotCooling = False
+
+            # 出现动画播放完毕且子弹存活时才移动子弹
+            if not (each.flash and each.bullet.life):
+                continue
+            if self.enemyCouldMove:
+                each.bullet.move(self.bgMap.rect)
+
+            # 子弹与我方坦克碰撞
+            if pygame.sprite.collide_rect(each.bullet, self.myTank_T1):
+                self.sounds.append(SOUND_BANG)
+                self.myTank_T1.rect.topleft = self.bgMap.player_start(1)
+                self.allTankGroup.reindex(self.myTank_T1)
+                each.bullet.life = False
+                self.moving = 0  # 重置移动控制参数
+                for i in range(self.myTank_T1.level + 1):
+                    self.myTank_T1.levelDown()
+            if self.myTank_T2 is not None and pygame.sprite.collide_rect(each.bullet, self.myTank_T2):
+                self.sounds.append(SOUND_BANG)
+                self.myTank_T2.rect.topleft = self.bgMap.player_start(2)
+                self.allTankGroup.reindex(self.myTank_T2)
+                each.bullet.life = False
+
+            # 子弹与砖块、铁块碰撞
+            self._hit_walls(each.bullet)
+
+            # 子弹与基地碰撞
+            self._hit_home(each.bullet)
+
+    def _update_food(self):
+        """
+        处理我方坦克拾取食物/道具
+        """
+        prop = self.prop
+        if not prop.life or not pygame.sprite.collide_rect(self.myTank_T1, prop):
+            return
+        self.pickups[prop.kind] += 1
+        if prop.kind == 1:  # 敌人全毁
+            for each in self.allEnemyGroup:
+                if self._count_kills(pygame.sprite.spritecollide(each, self.allEnemyGroup, True, None)):
+                    self.sounds.append(SOUND_BANG)
+                    self.enemyNumber -= 1
+        elif prop.kind == 2:  # 敌人静止
+            self.enemyCouldMove = False
+        elif prop.kind == 3:  # 子弹增强
+            self.myTank_T1.bullet.strong = True
+        elif prop.kind == 4:  # 家得到保护
+            for x, y in self.bgMap.home_wall():
+                self.bgMap.place_iron(x, y)
+        elif prop.kind == 6:  # 坦克升级
+            self.myTank_T1.levelUp()
+        elif prop.kind == 7:  # 坦克生命+1
+            self.myTank_T1.life += 1
+        prop.life = False